@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from tempfile import mkdtemp
+
+from linpgtoolbox.builder import Builder
+
+# Compare the compile engines on a synthetic package
+# Usage: python benchmarks/compile_engines.py [number of modules] [workers]
+
+# Number of modules in the synthetic package
+MODULES: int = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+# Number of workers used by both engines
+WORKERS: int = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+# Engines to compare
+ENGINES: tuple[str, ...] = ("per_file", "batch")
+
+# Content of each synthetic module
+MODULE_TEMPLATE: str = '''import math
+
+
+def distance_{i}(x: float, y: float) -> float:
+    """Distance from the origin."""
+    return math.sqrt(x * x + y * y)
+
+
+def fibonacci_{i}(n: int) -> int:
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+class Vector{i}:
+    def __init__(self, x: float, y: float) -> None:
+        self.x = x
+        self.y = y
+
+    def length(self) -> float:
+        return distance_{i}(self.x, self.y)
+'''
+
+
+# Create a synthetic project that uses the given engine
+def create_project(path: str, engine: str) -> None:
+    package_path: str = os.path.join(path, "synthetic")
+    os.makedirs(package_path)
+    with open(os.path.join(path, "pyproject.toml"), "w", encoding="utf-8") as f:
+        f.write(
+            "[project]\n"
+            'name = "synthetic"\n'
+            'version = "0.0.1"\n'
+            "\n"
+            "[tool.linpgtoolbox.options]\n"
+            f'engine = "{engine}"\n'
+            f"workers = {WORKERS}\n"
+        )
+    with open(os.path.join(package_path, "__init__.py"), "w", encoding="utf-8") as f:
+        f.writelines(f"from .module{i} import *\n" for i in range(MODULES))
+    for i in range(MODULES):
+        with open(
+            os.path.join(package_path, f"module{i}.py"), "w", encoding="utf-8"
+        ) as f:
+            f.write(MODULE_TEMPLATE.format(i=i))
+
+
+results: dict[str, float] = {}
+for engine in ENGINES:
+    project_path: str = mkdtemp(prefix=f"linpgtoolbox_bench_{engine}_")
+    try:
+        create_project(project_path, engine)
+        start_time: float = time.perf_counter()
+        Builder.compile(project_path, show_success_message=False, no_cache=True)
+        results[engine] = time.perf_counter() - start_time
+    finally:
+        Builder.remove(project_path)
+
+print(f"\nCompiled {MODULES} modules with {WORKERS} worker(s):")
+for engine, seconds in results.items():
+    print(f"  {engine:>8}: {seconds:8.2f}s ({results[ENGINES[0]] / seconds:.2f}x)")
@@ -0,0 +1,771 @@
+import ast
+import os
+import re
+import shutil
+from typing import Final, Iterable, TypeAlias
+
+# A name that is imported: its module (None for "import name"), the name itself and its alias
+_ImportedName: TypeAlias = tuple[str | None, str, str | None]
+# A function, class, lambda or comprehension, which has its own scope
+_Scope: TypeAlias = (
+    ast.FunctionDef
+    | ast.AsyncFunctionDef
+    | ast.ClassDef
+    | ast.Lambda
+    | ast.ListComp
+    | ast.SetComp
+    | ast.DictComp
+    | ast.GeneratorExp
+)
+
+
+# The source code of a module, which is changed by replacing the text of its nodes,
+# so that everything else (including the comments) stays as it is
+class _Source:
+    # Compiler directives that only take effect in the header of a file
+    __MAGIC_COMMENT: Final[re.Pattern[str]] = re.compile(r"#\s*(cython|distutils)\s*:")
+
+    def __init__(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            self.__text: str = f.read()
+        self.tree: ast.Module = ast.parse(self.__text, path)
+        self.__lines: list[str] = self.__text.split("\n")
+        # the offset of the beginning of each line
+        self.__starts: list[int] = [0]
+        for _line in self.__lines:
+            self.__starts.append(self.__starts[-1] + len(_line) + 1)
+        # the start and end offset of each text that is replaced, along with the new text
+        self.__edits: list[tuple[int, int, str]] = []
+
+    # Get the offset of given position, the column of ast nodes is counted in utf-8 bytes
+    def __offset(self, lineno: int, col_offset: int) -> int:
+        return self.__starts[lineno - 1] + len(
+            self.__lines[lineno - 1].encode("utf-8")[:col_offset].decode("utf-8")
+        )
+
+    # Get the start and end offset of given node
+    def __span(self, node: ast.stmt | ast.expr) -> tuple[int, int]:
+        assert node.end_lineno is not None and node.end_col_offset is not None
+        return self.__offset(node.lineno, node.col_offset), self.__offset(
+            node.end_lineno, node.end_col_offset
+        )
+
+    # The offset where the line of given node begins
+    def line_start(self, node: ast.stmt) -> int:
+        return self.__starts[node.lineno - 1]
+
+    # The comment lines that come before the first statement and configure the compiler
+    def magic_comments(self) -> list[int]:
+        return [
+            i
+            for i, _line in enumerate(
+                self.__lines[: self.tree.body[0].lineno - 1]
+                if len(self.tree.body) > 0
+                else self.__lines
+            )
+            if self.__MAGIC_COMMENT.match(_line) is not None
+        ]
+
+    # Get a line of the source code
+    def line(self, index: int) -> str:
+        return self.__lines[index]
+
+    # Replace the text between given offsets
+    def insert(self, offset: int, text: str, end: int | None = None) -> None:
+        self.__edits.append((offset, offset if end is None else end, text))
+
+    # Replace the text of given node
+    def replace(self, node: ast.stmt | ast.expr, text: str) -> None:
+        _start, _end = self.__span(node)
+        self.insert(_start, text, _end)
+
+    # Replace the name of given function or class definition
+    def rename_definition(
+        self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef, name: str
+    ) -> None:
+        _start: int = self.__offset(node.lineno, node.col_offset)
+        _keyword: re.Match[str] | None = re.compile(r"(async\s+)?(def|class)\s+").match(
+            self.__text, _start
+        )
+        assert _keyword is not None
+        self.insert(_keyword.end(), name, _keyword.end() + len(node.name))
+
+    # Remove given top level statement, along with its lines if nothing else is on them
+    def remove(self, node: ast.stmt) -> None:
+        _start, _end = self.__span(node)
+        assert node.end_lineno is not None
+        _line_start: int = self.__starts[node.lineno - 1]
+        _line_end: int = self.__starts[node.end_lineno]
+        _before: str = self.__text[_line_start:_start].strip()
+        _after: str = self.__text[_end : _line_end - 1].strip()
+        if _before == "" and (_after == "" or _after.startswith("#")):
+            self.insert(_line_start, "", _line_end)
+        # the statement shares a line with another one, e.g. "import os; import sys"
+        else:
+            _semicolon: re.Match[str] | None = re.compile(r"[ \t]*;[ \t]*").match(
+                self.__text, _end
+            )
+            self.insert(_start, "", _end if _semicolon is None else _semicolon.end())
+
+    # Remove given line
+    def remove_line(self, index: int) -> None:
+        self.insert(self.__starts[index], "", self.__starts[index + 1])
+
+    # Get the source code with all the changes
+    def render(self) -> str:
+        _text: str = self.__text
+        _end: int = len(_text) + 1
+        # an insertion before a removal at the same offset still comes first
+        for _start, _stop, _new in sorted(
+            self.__edits, key=lambda _edit: (_edit[0], _edit[1]), reverse=True
+        ):
+            if _stop > _end:
+                raise ValueError("Overlapping changes to the same source code")
+            _text = _text[:_start] + _new + _text[_stop:]
+            _end = _start
+        return _text if _text.endswith("\n") else _text + "\n"
+
+
+# Rename the module level names of a module, the local names that shadow them are kept
+class _GlobalRenamer(ast.NodeVisitor):
+    def __init__(self, source: _Source, renames: dict[str, str]) -> None:
+        self.__source: _Source = source
+        self.__renames: dict[str, str] = renames
+        # the names that do not refer to the module level ones in current scope
+        self.__shadowed: frozenset[str] = frozenset()
+        # the names of current scope that the nested functions cannot see (class scope)
+        self.__enclosing: frozenset[str] = frozenset()
+
+    # Get the names that are bound in given scope, and the ones that are declared global
+    @staticmethod
+    def __scope_names(nodes: Iterable[ast.AST]) -> tuple[set[str], set[str]]:
+        _bound: set[str] = set()
+        _global: set[str] = set()
+        _stack: list[ast.AST] = list(nodes)
+        while len(_stack) > 0:
+            _node: ast.AST = _stack.pop()
+            if isinstance(_node, ast.Global):
+                _global.update(_node.names)
+            elif isinstance(_node, ast.Nonlocal):
+                _bound.update(_node.names)
+            elif isinstance(_node, ast.Name) and not isinstance(_node.ctx, ast.Load):
+                _bound.add(_node.id)
+            elif isinstance(_node, (ast.Import, ast.ImportFrom)):
+                _bound.update(
+                    (_alias.asname or _alias.name).split(".")[0]
+                    for _alias in _node.names
+                    if _alias.name != "*"
+                )
+            elif isinstance(
+                _node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)
+            ) and isinstance(_node.name, str):
+                _bound.add(_node.name)
+            elif isinstance(_node, ast.MatchMapping) and _node.rest is not None:
+                _bound.add(_node.rest)
+            # a nested scope only binds its own name here
+            if isinstance(_node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                _bound.add(_node.name)
+            elif not isinstance(
+                _node,
+                (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp),
+            ):
+                _stack.extend(ast.iter_child_nodes(_node))
+        return _bound - _global, _global
+
+    # Visit the code of a nested scope
+    def __visit_scope(
+        self, node: _Scope, code: Iterable[ast.AST], arguments: Iterable[str] = ()
+    ) -> None:
+        _code: list[ast.AST] = list(code)
+        _bound, _global = self.__scope_names(_code)
+        _previous: tuple[frozenset[str], frozenset[str]] = (
+            self.__shadowed,
+            self.__enclosing,
+        )
+        self.__shadowed = frozenset(
+            (self.__enclosing | _bound | set(arguments)) - _global
+        )
+        # the names of a class body are not visible to the functions it defines
+        if not isinstance(node, ast.ClassDef):
+            self.__enclosing = self.__shadowed
+        for _child in _code:
+            self.visit(_child)
+        self.__shadowed, self.__enclosing = _previous
+
+    def __rename_definition(
+        self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef
+    ) -> None:
+        if node.name in self.__renames and node.name not in self.__shadowed:
+            self.__source.rename_definition(node, self.__renames[node.name])
+
+    def __visit_function(
+        self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.Lambda
+    ) -> None:
+        # the decorators, default values and annotations belong to the enclosing scope
+        _args: ast.arguments = node.args
+        _arguments: list[ast.arg] = [
+            *_args.posonlyargs,
+            *_args.args,
+            *([_args.vararg] if _args.vararg is not None else []),
+            *_args.kwonlyargs,
+            *([_args.kwarg] if _args.kwarg is not None else []),
+        ]
+        for _child in (*_args.defaults, *_args.kw_defaults):
+            if _child is not None:
+                self.visit(_child)
+        if isinstance(node, ast.Lambda):
+            self.__visit_scope(node, [node.body], (_arg.arg for _arg in _arguments))
+            return
+        for _child in (
+            *node.decorator_list,
+            *(_arg.annotation for _arg in _arguments),
+            node.returns,
+        ):
+            if _child is not None:
+                self.visit(_child)
+        self.__rename_definition(node)
+        self.__visit_scope(node, node.body, (_arg.arg for _arg in _arguments))
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.__visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self.__visit_function(node)
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self.__visit_function(node)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        for _child in (*node.decorator_list, *node.bases, *node.keywords):
+            self.visit(_child)
+        self.__rename_definition(node)
+        self.__visit_scope(node, node.body)
+
+    def __visit_comprehension(
+        self, node: ast.ListComp | ast.SetComp | ast.DictComp | ast.GeneratorExp
+    ) -> None:
+        # the first iterable is evaluated in the enclosing scope
+        self.visit(node.generators[0].iter)
+        self.__visit_scope(
+            node,
+            [
+                *(_child.target for _child in node.generators),
+                *(_child.iter for _child in node.generators[1:]),
+                *(_if for _child in node.generators for _if in _child.ifs),
+                *(
+                    (node.key, node.value)
+                    if isinstance(node, ast.DictComp)
+                    else (node.elt,)
+                ),
+            ],
+        )
+
+    def visit_ListComp(self, node: ast.ListComp) -> None:
+        self.__visit_comprehension(node)
+
+    def visit_SetComp(self, node: ast.SetComp) -> None:
+        self.__visit_comprehension(node)
+
+    def visit_DictComp(self, node: ast.DictComp) -> None:
+        self.__visit_comprehension(node)
+
+    def visit_GeneratorExp(self, node: ast.GeneratorExp) -> None:
+        self.__visit_comprehension(node)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        if any(_name in self.__renames for _name in node.names):
+            self.__source.replace(
+                node,
+                ast.unparse(
+                    ast.Global(
+                        [self.__renames.get(_name, _name) for _name in node.names]
+                    )
+                ),
+            )
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id in self.__renames and node.id not in self.__shadowed:
+            self.__source.replace(node, self.__renames[node.id])
+
+
+# Combine the modules that a package imports with "from .module import *" into its __init__.py
+class ModuleCombiner:
+
+    # Get the name of the sibling module that given statement imports from, None if it is not one
+    @staticmethod
+    def __sibling(node: ast.stmt) -> str | None:
+        if (
+            isinstance(node, ast.ImportFrom)
+            and node.level == 1
+            and node.module is not None
+            and "." not in node.module
+        ):
+            return node.module
+        return None
+
+    # Whether given statement is "from .module import *"
+    @classmethod
+    def __is_star_import(cls, node: ast.stmt) -> bool:
+        return (
+            cls.__sibling(node) is not None
+            and isinstance(node, ast.ImportFrom)
+            and len(node.names) == 1
+            and node.names[0].name == "*"
+        )
+
+    # Whether given statement is a docstring
+    @staticmethod
+    def __is_docstring(node: ast.stmt) -> bool:
+        return (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        )
+
+    # Whether given statement is an "__all__" assignment
+    @staticmethod
+    def __is_all(node: ast.stmt) -> bool:
+        _targets: list[ast.expr]
+        if isinstance(node, ast.Assign):
+            _targets = node.targets
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+            _targets = [node.target]
+        else:
+            return False
+        return (
+            len(_targets) == 1
+            and isinstance(_targets[0], ast.Name)
+            and _targets[0].id == "__all__"
+        )
+
+    # Whether given name is private to the module that defines it
+    @staticmethod
+    def __is_private(name: str) -> bool:
+        return name.startswith("_") and not (
+            name.startswith("__") and name.endswith("__")
+        )
+
+    # Get the names that given top level statement binds, along with how it binds them
+    @classmethod
+    def __bindings(cls, node: ast.stmt) -> dict[str, str]:
+        _names: dict[str, str] = {}
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            _names[node.name] = "definition"
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for _from, _imported, _asname in cls.__imported_names(node):
+                if _imported != "*":
+                    _alias: ast.alias = ast.alias(_imported, _asname)
+                    # the same import in multiple modules binds the same object
+                    _names[_asname or _imported.split(".")[0]] = ast.unparse(
+                        ast.ImportFrom(module=_from, names=[_alias], level=node.level)
+                        if isinstance(node, ast.ImportFrom)
+                        else ast.Import(names=[_alias])
+                    )
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            for _target in (
+                node.targets if isinstance(node, ast.Assign) else [node.target]
+            ):
+                for _name in ast.walk(_target):
+                    if isinstance(_name, ast.Name):
+                        _names[_name.id] = "definition"
+        return _names
+
+    # Get the names that given import statement imports, an alias that is the same as
+    # the name is left out, since it binds the same name
+    @staticmethod
+    def __imported_names(node: ast.Import | ast.ImportFrom) -> list[_ImportedName]:
+        return [
+            (
+                node.module if isinstance(node, ast.ImportFrom) else None,
+                _alias.name,
+                _alias.asname if _alias.asname != _alias.name else None,
+            )
+            for _alias in node.names
+        ]
+
+    # Get the import statements of given names, the names imported from the same module
+    # are merged into one statement
+    @staticmethod
+    def __import_statements(names: Iterable[_ImportedName]) -> list[ast.stmt]:
+        _statements: list[ast.stmt] = []
+        _from_imports: dict[str, ast.ImportFrom] = {}
+        for _module, _name, _asname in names:
+            _alias: ast.alias = ast.alias(_name, _asname)
+            if _module is None:
+                _statements.append(ast.Import(names=[_alias]))
+            # a star import cannot be merged with other names
+            elif _name == "*":
+                _statements.append(ast.ImportFrom(_module, [_alias], 0))
+            elif _module in _from_imports:
+                _from_imports[_module].names.append(_alias)
+            else:
+                _from_imports[_module] = ast.ImportFrom(_module, [_alias], 0)
+                _statements.append(_from_imports[_module])
+        return _statements
+
+    # Get the __future__ features and compiler directives that given module declares,
+    # which apply to the whole file once the modules are combined
+    @staticmethod
+    def __header(source: _Source) -> tuple[frozenset[str], frozenset[str]]:
+        return frozenset(
+            _alias.name
+            for _node in source.tree.body
+            if isinstance(_node, ast.ImportFrom) and _node.module == "__future__"
+            for _alias in _node.names
+        ), frozenset(source.line(i).strip() for i in source.magic_comments())
+
+    # Order the modules so that each module comes after the ones it imports from
+    @staticmethod
+    def __sort(
+        package: str, modules: list[str], dependencies: dict[str, list[str]]
+    ) -> list[str]:
+        _ordered: list[str] = []
+        _visiting: list[str] = []
+
+        def _visit(_module: str) -> None:
+            if _module in _ordered:
+                return
+            if _module in _visiting:
+                _cycle: list[str] = _visiting[_visiting.index(_module) :] + [_module]
+                raise ValueError(
+                    f'Cannot combine package "{package}", circular import: '
+                    + " -> ".join(_cycle)
+                )
+            _visiting.append(_module)
+            for _dependency in dependencies[_module]:
+                _visit(_dependency)
+            _visiting.pop()
+            _ordered.append(_module)
+
+        for _module in modules:
+            _visit(_module)
+        return _ordered
+
+    # Combine given package and all of its sub packages
+    @classmethod
+    def combine(cls, _dir_path: str) -> None:
+        init_file_path: str = os.path.join(_dir_path, "__init__.py")
+        if not os.path.isdir(_dir_path) or not os.path.exists(init_file_path):
+            return
+        # Combine the sub packages first, so that they can be combined into this one
+        for _name in sorted(os.listdir(_dir_path)):
+            cls.combine(os.path.join(_dir_path, _name))
+        package: str = os.path.basename(_dir_path)
+        init: _Source = _Source(init_file_path)
+        # Modules that are imported with "from .module import *"
+        _modules: list[str] = []
+        for node in init.tree.body:
+            if (
+                cls.__is_star_import(node)
+                and (_module := cls.__sibling(node)) not in _modules
+                and os.path.isfile(os.path.join(_dir_path, f"{_module}.py"))
+            ):
+                _modules.append(str(_module))
+        if len(_modules) <= 0:
+            return
+        _sources: dict[str, _Source] = {
+            _module: _Source(os.path.join(_dir_path, f"{_module}.py"))
+            for _module in _modules
+        }
+        # Find out which of the combined modules each module imports from
+        _dependencies: dict[str, list[str]] = {}
+        for _module, _source in _sources.items():
+            for _node in ast.walk(_source.tree):
+                if (
+                    isinstance(_node, ast.ImportFrom)
+                    and _node.level == 1
+                    and _node.module is None
+                    and any(_alias.name in _sources for _alias in _node.names)
+                ) or (
+                    isinstance(_node, ast.Import)
+                    and any(
+                        _alias.name.split(".")[-1] in _sources
+                        and f".{package}." in f".{_alias.name}"
+                        for _alias in _node.names
+                    )
+                ):
+                    raise ValueError(
+                        f'Cannot combine package "{package}": {_module}.py imports a combined '
+                        f'module as an object ("{ast.unparse(_node)}")'
+                    )
+            # imports inside functions are lazy, so they do not affect the order
+            _dependencies[_module] = list(
+                dict.fromkeys(
+                    str(_sibling)
+                    for node in _source.tree.body
+                    if (_sibling := cls.__sibling(node)) in _sources
+                )
+            )
+        _order: list[str] = cls.__sort(package, _modules, _dependencies)
+        # The __future__ imports and compiler directives of one module would apply to all
+        # the others once combined, so the modules can only be combined if they agree
+        _headers: set[tuple[frozenset[str], frozenset[str]]] = {
+            cls.__header(_sources[_module]) for _module in _order
+        }
+        _init_header: tuple[frozenset[str], frozenset[str]] = cls.__header(init)
+        if len(_headers) > 1 or (
+            _init_header != (frozenset(), frozenset()) and _init_header not in _headers
+        ):
+            print(
+                f'Package "{package}" is not combined, since its modules do not declare '
+                "the same __future__ imports and compiler directives"
+            )
+            return
+        _future, _magic_comments = _headers.pop()
+        # __init__.py goes first, since its names are the ones the package exposes
+        _labels: dict[str, str] = {
+            "": "__init__.py",
+            **{_module: f"{_module}.py" for _module in _order},
+        }
+        _all_sources: dict[str, _Source] = {
+            "": init,
+            **{_module: _sources[_module] for _module in _order},
+        }
+        # The statements of each module that are combined, the docstring of __init__.py
+        # stays where it is, while the ones of the modules no longer mean anything
+        _statements: dict[str, list[ast.stmt]] = {
+            _key: [
+                node
+                for i, node in enumerate(_source.tree.body)
+                if not (i == 0 and cls.__is_docstring(node))
+                and not (
+                    cls.__is_all(node)
+                    if _key != ""
+                    else cls.__is_star_import(node) and cls.__sibling(node) in _sources
+                )
+            ]
+            for _key, _source in _all_sources.items()
+        }
+        # The names that each module binds, along with how it binds them
+        _defined: dict[str, dict[str, str]] = {_key: {} for _key in _all_sources}
+        for _key, _nodes in _statements.items():
+            for node in _nodes:
+                _bindings: dict[str, str] = (
+                    # names imported from a combined module with an alias are assigned
+                    {
+                        str(_alias.asname): "definition"
+                        for _alias in node.names
+                        if _alias.asname is not None and _alias.asname != _alias.name
+                    }
+                    if isinstance(node, ast.ImportFrom)
+                    and cls.__sibling(node) in _sources
+                    else cls.__bindings(node)
+                )
+                for _name, _how in _bindings.items():
+                    _defined[_key][_name] = (
+                        _how
+                        if _defined[_key].get(_name, _how) == _how
+                        else "definition"
+                    )
+        # Names that are used anywhere, which a renamed name must not collide with
+        _used: set[str] = {
+            _name
+            for _source in _all_sources.values()
+            for _node in ast.walk(_source.tree)
+            for _name in (
+                getattr(_node, "id", None),
+                getattr(_node, "name", None),
+                getattr(_node, "arg", None),
+                getattr(_node, "asname", None),
+            )
+            if isinstance(_name, str)
+        }
+        # A name that is bound by more than one module is a conflict, unless it is private,
+        # in which case all but the first module get their own name for it
+        _renames: dict[str, dict[str, str]] = {_key: {} for _key in _all_sources}
+        _owners: dict[str, tuple[str, str]] = {}
+        for _key in _all_sources:
+            for _name, _how in _defined[_key].items():
+                if _name not in _owners:
+                    _owners[_name] = (_key, _how)
+                elif _how == "definition" or _owners[_name][1] != _how:
+                    if not cls.__is_private(_name):
+                        raise ValueError(
+                            f'Cannot combine package "{package}": "{_name}" is defined in '
+                            f"both {_labels[_owners[_name][0]]} and {_labels[_key]}"
+                        )
+                    _new_name: str = f"_{_key.lstrip('_')}{_name}"
+                    i: int = 1
+                    while _new_name in _used:
+                        _new_name = f"_{_key.lstrip('_')}{_name}_{i}"
+                        i += 1
+                    _used.add(_new_name)
+                    _renames[_key][_name] = _new_name
+        # A name imported from a combined module refers to the name that module ends up with
+        for _key in (*_order, ""):
+            for node in _statements[_key]:
+                if (
+                    isinstance(node, ast.ImportFrom)
+                    and (_sibling := cls.__sibling(node)) in _sources
+                ):
+                    for _alias in node.names:
+                        _target: str = _renames[str(_sibling)].get(
+                            _alias.name, _alias.name
+                        )
+                        if (
+                            _alias.asname in (None, _alias.name)
+                            and _target != _alias.name
+                        ):
+                            _renames[_key].setdefault(_alias.name, _target)
+
+        # The statements that an import from a combined module becomes
+        def _inline(_key: str, _node: ast.ImportFrom) -> str:
+            _assigns: list[str] = []
+            for _alias in _node.names:
+                _name: str = _alias.asname or _alias.name
+                _value: str = _renames[str(cls.__sibling(_node))].get(
+                    _alias.name, _alias.name
+                )
+                # a module level alias may be renamed as well
+                if _node in _statements[_key]:
+                    _name = _renames[_key].get(_name, _name)
+                if _name != _value:
+                    _assigns.append(f"{_name} = {_value}")
+            return "; ".join(_assigns) if len(_assigns) > 0 else "pass"
+
+        # If only __init__.py remains in the module folder, convert the folder to a python file
+        _to_file: bool = (
+            len(
+                [
+                    f
+                    for f in os.listdir(_dir_path)
+                    if f != "__pycache__" and f[:-3] not in _modules
+                ]
+            )
+            <= 1
+        )
+        # The imports that are hoisted to the top, so that each name is only imported once
+        _hoisted: dict[_ImportedName, None] = {}
+        for _key in (*_order, ""):
+            _source = _all_sources[_key]
+            for i, node in enumerate(_source.tree.body):
+                if node not in _statements[_key] and not (
+                    _key == "" and i == 0 and cls.__is_docstring(node)
+                ):
+                    _source.remove(node)
+            for node in _statements[_key]:
+                if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+                    _source.remove(node)
+                elif isinstance(node, ast.Import) or (
+                    isinstance(node, ast.ImportFrom) and node.level == 0
+                ):
+                    _hoisted.update(
+                        dict.fromkeys(
+                            (
+                                _from,
+                                _imported,
+                                _renames[_key].get(_asname or _imported, _asname),
+                            )
+                            for _from, _imported, _asname in cls.__imported_names(node)
+                        )
+                    )
+                    _source.remove(node)
+                elif (
+                    isinstance(node, ast.ImportFrom) and cls.__sibling(node) in _sources
+                ):
+                    _source.replace(node, _inline(_key, node))
+                elif len(_renames[_key]) > 0:
+                    _GlobalRenamer(_source, _renames[_key]).visit(node)
+            # the imports inside functions and blocks
+            for node in _statements[_key]:
+                for _node in ast.walk(node):
+                    if not isinstance(_node, (ast.Import, ast.ImportFrom)) or (
+                        _node in _statements[_key]
+                        and (
+                            isinstance(_node, ast.Import)
+                            or _node.level == 0
+                            or cls.__sibling(_node) in _sources
+                        )
+                    ):
+                        continue
+                    # the names are global once combined, so nested imports are not needed
+                    if cls.__sibling(_node) in _sources:
+                        assert isinstance(_node, ast.ImportFrom)
+                        _source.replace(_node, _inline(_key, _node))
+                        continue
+                    _renamed: list[ast.alias] = [
+                        ast.alias(
+                            _alias.name,
+                            (
+                                _renames[_key].get(
+                                    _alias.asname or _alias.name, _alias.asname
+                                )
+                                if _node in _statements[_key]
+                                else _alias.asname
+                            ),
+                        )
+                        for _alias in _node.names
+                    ]
+                    # the parent package is one level closer to a module than to a package
+                    _level: int = (
+                        _node.level - 1
+                        if isinstance(_node, ast.ImportFrom)
+                        and _to_file
+                        and _node.level > 1
+                        else getattr(_node, "level", 0)
+                    )
+                    if [(_alias.name, _alias.asname) for _alias in _renamed] != [
+                        (_alias.name, _alias.asname) for _alias in _node.names
+                    ] or _level != getattr(_node, "level", 0):
+                        _source.replace(
+                            _node,
+                            ast.unparse(
+                                ast.ImportFrom(_node.module, _renamed, _level)
+                                if isinstance(_node, ast.ImportFrom)
+                                else ast.Import(_renamed)
+                            ),
+                        )
+            # the compiler directives are put in the header of the combined file
+            if _key != "":
+                for i in _source.magic_comments():
+                    _source.remove_line(i)
+        # Put the combined modules where the first of them was imported
+        _star_imports: list[ast.stmt] = [
+            node
+            for node in init.tree.body
+            if cls.__is_star_import(node) and cls.__sibling(node) in _sources
+        ]
+        init.insert(
+            init.line_start(_star_imports[0]),
+            "\n".join(_sources[_module].render() for _module in _order),
+        )
+        # The docstring has to stay at the very beginning, followed by future imports
+        _first: list[ast.stmt] = [
+            node
+            for i, node in enumerate(init.tree.body)
+            if not (i == 0 and cls.__is_docstring(node))
+        ]
+        init.insert(
+            init.line_start(_first[0]),
+            "".join(
+                ast.unparse(_node) + "\n"
+                for _node in cls.__import_statements(
+                    (
+                        *(("__future__", _name, None) for _name in sorted(_future)),
+                        *_hoisted,
+                    )
+                )
+            ),
+        )
+        # The directives only take effect before any code
+        if len(_magic_comments) > 0 and len(init.magic_comments()) <= 0:
+            init.insert(
+                0,
+                "".join(
+                    _sources[_order[0]].line(i) + "\n"
+                    for i in _sources[_order[0]].magic_comments()
+                ),
+            )
+        # Generate the code before touching any file, so that nothing is lost on error
+        _content: str = init.render()
+        ast.parse(_content, init_file_path)
+        for _module in _modules:
+            os.remove(os.path.join(_dir_path, f"{_module}.py"))
+        if _to_file:
+            with open(f"{_dir_path}.py", "w", encoding="utf-8") as f:
+                f.write(_content)
+            shutil.rmtree(_dir_path)
+        # Otherwise write content directly to original __init__.py file
+        else:
+            with open(init_file_path, "w", encoding="utf-8") as f:
+                f.write(_content)
@@ -0,0 +1,345 @@
+import ast
+import hashlib
+import os
+import platform
+import shutil
+import sys
+import sysconfig
+import threading
+from subprocess import DEVNULL, check_output
+from typing import Any, Final
+
+# NOTE: this module is imported by _compiler.py, which may run under a different python
+# version than linpgtoolbox itself, so it must only depend on the standard library
+
+
+# Persistent, content-addressed cache of compiled modules
+class CompileCache:
+    # Bump this whenever the way modules are compiled changes
+    __VERSION: Final[int] = 1
+    # Suffixes of the files that are generated alongside a compiled module
+    __ARTIFACT_SUFFIXES: Final[tuple[str, ...]] = (".pyi", ".c", ".cpp", ".html")
+    # Name of the file that marks the last time an entry was used
+    __STAMP: Final[str] = ".stamp"
+
+    def __init__(self, cache_dir: str, size_limit_mb: int) -> None:
+        self.__dir: str = cache_dir
+        self.__size_limit: int = max(size_limit_mb, 0) * 1024 * 1024
+        self.__environment: str = ""
+        self.hits: int = 0
+        self.misses: int = 0
+
+    # Get default root directory of all caches
+    @staticmethod
+    def default_dir() -> str:
+        if sys.platform.startswith("win"):
+            _root: str = os.environ.get(
+                "LOCALAPPDATA",
+                os.path.join(os.path.expanduser("~"), "AppData", "Local"),
+            )
+        else:
+            _root = os.environ.get(
+                "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+            )
+        return os.path.join(_root, "linpgtoolbox")
+
+    # Get version information of the c compiler
+    @staticmethod
+    def compiler_version() -> str:
+        _cc: str | None = sysconfig.get_config_var("CC")
+        if _cc:
+            try:
+                return (
+                    check_output([*_cc.split(), "--version"], stderr=DEVNULL, text=True)
+                    .strip()
+                    .splitlines()[0]
+                )
+            except Exception:
+                pass
+        return platform.python_compiler()
+
+    # Get version of given library, empty string if not installed
+    @staticmethod
+    def library_version(name: str) -> str:
+        try:
+            import importlib.metadata
+
+            return importlib.metadata.version(name)
+        except Exception:
+            return ""
+
+    # Get the suffix of compiled extension modules
+    @staticmethod
+    def extension_suffix() -> str:
+        return str(sysconfig.get_config_var("EXT_SUFFIX") or ".so")
+
+    # Set up the build environment that all keys depend on
+    def setup(self, options: dict[str, Any]) -> None:
+        self.__environment = repr(
+            (
+                self.__VERSION,
+                sys.version,
+                sysconfig.get_platform(),
+                self.extension_suffix(),
+                self.library_version("cython"),
+                self.library_version("mypy"),
+                self.compiler_version(),
+                sorted(options.items()),
+            )
+        )
+
+    # Calculate the key of given module, along with the options that only apply to it
+    def key(
+        self, source_folder: str, path: str, options: dict[str, Any] | None = None
+    ) -> str:
+        _hash = hashlib.sha256(self.__environment.encode())
+        if options:
+            _hash.update(repr(sorted(options.items())).encode())
+        # the module name is part of the compiled output
+        _hash.update(os.path.relpath(path, os.path.dirname(source_folder)).encode())
+        with open(path, "rb") as f:
+            _hash.update(f.read())
+        # cython declaration file that shares the same name
+        _pxd_file: str = os.path.splitext(path)[0] + ".pxd"
+        if os.path.exists(_pxd_file):
+            with open(_pxd_file, "rb") as f:
+                _hash.update(f.read())
+        return _hash.hexdigest()
+
+    # Get the folder of given cache entry
+    def __entry(self, key: str) -> str:
+        return os.path.join(self.__dir, key[:2], key)
+
+    # Get all files that are generated for given module
+    def __artifacts(self, path: str) -> list[str]:
+        _stem: str = os.path.splitext(path)[0]
+        return [
+            _stem + suffix
+            for suffix in (self.extension_suffix(), *self.__ARTIFACT_SUFFIXES)
+            if os.path.exists(_stem + suffix)
+        ]
+
+    # Restore compiled module from cache, return whether it succeeds
+    def restore(self, key: str, path: str) -> bool:
+        _entry: str = self.__entry(key)
+        if not os.path.exists(os.path.join(_entry, self.__STAMP)):
+            self.misses += 1
+            return False
+        _stem: str = os.path.splitext(path)[0]
+        for file_name in os.listdir(_entry):
+            if file_name != self.__STAMP:
+                shutil.copy2(
+                    os.path.join(_entry, file_name),
+                    _stem + file_name[file_name.index(".") :],
+                )
+        # mark as recently used
+        os.utime(os.path.join(_entry, self.__STAMP))
+        self.hits += 1
+        return True
+
+    # Save the compiled module into cache
+    def store(self, key: str, path: str) -> None:
+        _entry: str = self.__entry(key)
+        # only cache the modules that have been compiled into the expected place
+        if os.path.exists(_entry) or not os.path.exists(
+            os.path.splitext(path)[0] + self.extension_suffix()
+        ):
+            return
+        _temp: str = f"{_entry}.{os.getpid()}.tmp"
+        os.makedirs(_temp, exist_ok=True)
+        for _artifact in self.__artifacts(path):
+            shutil.copy2(_artifact, _temp)
+        with open(os.path.join(_temp, self.__STAMP), "w"):
+            pass
+        # another build may have stored the same entry in the meantime
+        try:
+            os.rename(_temp, _entry)
+        except OSError:
+            shutil.rmtree(_temp, ignore_errors=True)
+
+    # Remove the least recently used entries until cache is within the size limit
+    def evict(self) -> None:
+        if not os.path.isdir(self.__dir):
+            return
+        _entries: list[tuple[float, int, str]] = []
+        _total: int = 0
+        for _bucket in os.scandir(self.__dir):
+            if not _bucket.is_dir():
+                continue
+            for _entry in os.scandir(_bucket.path):
+                _stamp: str = os.path.join(_entry.path, self.__STAMP)
+                if not _entry.is_dir() or not os.path.exists(_stamp):
+                    continue
+                _size: int = sum(f.stat().st_size for f in os.scandir(_entry.path))
+                _entries.append((os.path.getmtime(_stamp), _size, _entry.path))
+                _total += _size
+        _entries.sort()
+        for _, _size, _path in _entries:
+            if _total <= self.__size_limit:
+                break
+            shutil.rmtree(_path, ignore_errors=True)
+            _total -= _size
+
+    # Summary of cache usage
+    def summary(self) -> str:
+        return f"Compile cache: {self.hits} hit(s), {self.misses} miss(es)"
+
+
+# Cache of generated stubs, which can be reused as long as the interface of a module stays the same
+class StubCache:
+    def __init__(self, cache_dir: str, stubgen_args: list[str]) -> None:
+        self.__dir: str = cache_dir
+        self.__environment: str = repr(
+            (CompileCache.library_version("mypy"), stubgen_args)
+        )
+        self.__fingerprints: dict[str, str] = {}
+        self.hits: int = 0
+
+    # Summarize the body of a function to the facts that stubgen takes into account
+    @staticmethod
+    def __summarize(node: ast.FunctionDef | ast.AsyncFunctionDef) -> list[ast.stmt]:
+        _facts: set[str] = set()
+        _pending: list[ast.AST] = list(node.body)
+        while len(_pending) > 0:
+            _node: ast.AST = _pending.pop()
+            # nested scopes do not contribute to the signature
+            if isinstance(
+                _node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+            ):
+                continue
+            if isinstance(_node, ast.Return) and _node.value is not None:
+                _facts.add("return")
+            elif isinstance(_node, (ast.Yield, ast.YieldFrom)):
+                _facts.add("yield")
+            elif isinstance(_node, ast.Raise):
+                _facts.add(f"raise {ast.dump(_node.exc) if _node.exc else ''}")
+            # attributes that are defined in methods become part of the class
+            elif isinstance(_node, ast.Attribute) and isinstance(_node.ctx, ast.Store):
+                _facts.add(f"attribute {ast.dump(_node)}")
+            elif isinstance(_node, ast.AnnAssign):
+                _facts.add(
+                    f"annotated {ast.dump(_node.target)} {ast.dump(_node.annotation)}"
+                )
+            _pending.extend(ast.iter_child_nodes(_node))
+        _body: list[ast.stmt] = []
+        if ast.get_docstring(node, clean=False) is not None:
+            _body.append(node.body[0])
+        _body.append(ast.Expr(ast.Constant(repr(sorted(_facts)))))
+        return _body
+
+    # Calculate the fingerprint of the interface of given module
+    def fingerprint(self, source_folder: str, path: str) -> str:
+        with open(path, "rb") as f:
+            _tree: ast.Module = ast.parse(f.read(), path)
+        for _node in ast.walk(_tree):
+            if isinstance(_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                _node.body = self.__summarize(_node)
+        _hash = hashlib.sha256(self.__environment.encode())
+        _hash.update(os.path.relpath(path, os.path.dirname(source_folder)).encode())
+        _hash.update(ast.dump(_tree).encode())
+        return _hash.hexdigest()
+
+    # Get the path of the stub with given fingerprint in cache
+    def __entry(self, fingerprint: str) -> str:
+        return os.path.join(self.__dir, fingerprint[:2], fingerprint + ".pyi")
+
+    # Restore the stub of given module from cache, return whether it succeeds
+    def restore(self, source_folder: str, path: str) -> bool:
+        try:
+            _fingerprint: str = self.fingerprint(source_folder, path)
+        except SyntaxError:
+            return False
+        self.__fingerprints[path] = _fingerprint
+        if not os.path.exists(_entry := self.__entry(_fingerprint)):
+            return False
+        shutil.copyfile(_entry, os.path.splitext(path)[0] + ".pyi")
+        self.hits += 1
+        return True
+
+    # Save the generated stub of given module into cache
+    def store(self, path: str) -> None:
+        _stub: str = os.path.splitext(path)[0] + ".pyi"
+        if path in self.__fingerprints and os.path.exists(_stub):
+            _entry: str = self.__entry(self.__fingerprints[path])
+            os.makedirs(os.path.dirname(_entry), exist_ok=True)
+            _temp: str = f"{_entry}.{os.getpid()}.tmp"
+            shutil.copyfile(_stub, _temp)
+            os.replace(_temp, _entry)
+
+
+# Cache of extension modules keyed by their preprocessed c code, can be shared between machines
+class ObjectCache:
+    # Bump this whenever the way extension modules are built changes
+    __VERSION: Final[int] = 1
+
+    def __init__(self, cache_dir: str, size_limit_mb: int) -> None:
+        self.__dir: str = cache_dir
+        self.__size_limit: int = max(size_limit_mb, 0) * 1024 * 1024
+        self.__environment: str = repr(
+            (
+                self.__VERSION,
+                sys.version,
+                sysconfig.get_platform(),
+                CompileCache.extension_suffix(),
+                CompileCache.compiler_version(),
+            )
+        )
+
+    # Calculate the key of an extension module built from given c code with given flags
+    def key(self, flags: Any, code: list[bytes]) -> str:
+        _hash = hashlib.sha256(self.__environment.encode())
+        _hash.update(repr(flags).encode())
+        for _code in code:
+            _hash.update(hashlib.sha256(_code).digest())
+        return _hash.hexdigest()
+
+    # Get the path of the extension module with given key in cache
+    def __entry(self, key: str) -> str:
+        return os.path.join(self.__dir, key[:2], key + CompileCache.extension_suffix())
+
+    # Copy the cached extension module to target path, return whether it succeeds
+    def restore(self, key: str, target: str) -> bool:
+        if not os.path.exists(_entry := self.__entry(key)):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        shutil.copy(_entry, target)
+        # mark as recently used
+        try:
+            os.utime(_entry)
+        except OSError:
+            pass
+        return True
+
+    # Save the extension module into cache
+    def store(self, key: str, source: str) -> None:
+        if os.path.exists(_entry := self.__entry(key)):
+            return
+        os.makedirs(os.path.dirname(_entry), exist_ok=True)
+        # the cache may be shared by processes on other machines
+        _temp: str = (
+            f"{_entry}.{platform.node()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        shutil.copy(source, _temp)
+        os.replace(_temp, _entry)
+
+    # Remove the least recently used modules until cache is within the size limit
+    def evict(self) -> None:
+        if not os.path.isdir(self.__dir):
+            return
+        _files: list[tuple[float, int, str]] = []
+        for _bucket in os.scandir(self.__dir):
+            if _bucket.is_dir():
+                for _file in os.scandir(_bucket.path):
+                    if _file.is_file() and not _file.name.endswith(".tmp"):
+                        _stat: os.stat_result = _file.stat()
+                        _files.append((_stat.st_mtime, _stat.st_size, _file.path))
+        _files.sort()
+        _total: int = sum(_size for _, _size, _ in _files)
+        for _, _size, _path in _files:
+            if _total <= self.__size_limit:
+                break
+            try:
+                os.remove(_path)
+            except OSError:
+                pass
+            _total -= _size
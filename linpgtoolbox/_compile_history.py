@@ -0,0 +1,130 @@
+import json
+import os
+from typing import Final
+
+# NOTE: this module is imported by _compiler.py, which may run under a different python
+# version than linpgtoolbox itself, so it must only depend on the standard library
+
+
+# On-disk history of how long each stage of compiling a module took
+class CompileHistory:
+    # Stages of compiling a module
+    STAGES: Final[tuple[str, ...]] = ("cythonize", "compile", "stubgen")
+    # Estimated seconds per byte of source code when there is no history at all
+    __DEFAULT_SECONDS_PER_BYTE: Final[float] = 1e-4
+    # Estimated bytes of generated c code per byte of source code
+    __C_BYTES_PER_BYTE: Final[int] = 50
+    # Estimated peak memory of the c compiler, in MB per MB of c code on top of a baseline
+    __MEMORY_PER_C_MB: Final[float] = 200.0
+    __BASELINE_MEMORY_MB: Final[float] = 128.0
+
+    def __init__(self, path: str) -> None:
+        self.__path: str = path
+        self.__records: dict[str, dict[str, float]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.__records.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        # durations that have been recorded in current build
+        self.__current: dict[str, dict[str, float]] = {}
+
+    # Record the duration of given stage of a module
+    def record(self, module: str, stage: str, seconds: float) -> None:
+        self.__current.setdefault(module, {})[stage] = round(seconds, 4)
+        self.__records.setdefault(module, {})[stage] = round(seconds, 4)
+
+    # Get the recorded duration of given stages of a module, None if none of them has
+    # ever been recorded (a record may only have the memory usage, for instance)
+    def get(self, module: str, *stages: str) -> float | None:
+        _record: dict[str, float] = self.__records.get(module, {})
+        _recorded: list[str] = [
+            stage for stage in (stages or self.STAGES) if stage in _record
+        ]
+        if len(_recorded) <= 0:
+            return None
+        return sum(_record[stage] for stage in _recorded)
+
+    # Record the size of the generated c code and the peak memory (if known) of a module
+    def record_memory(self, module: str, c_size: int, peak_memory_mb: float) -> None:
+        _record: dict[str, float] = self.__records.setdefault(module, {})
+        _record["c_size"] = c_size
+        if peak_memory_mb > 0:
+            _record["peak_memory"] = round(peak_memory_mb, 1)
+
+    # Estimate the peak memory in MB that compiling each module takes
+    def estimate_memory(self, paths: dict[str, str]) -> dict[str, float]:
+        _estimates: dict[str, float] = {}
+        for module, path in paths.items():
+            _record: dict[str, float] = self.__records.get(module, {})
+            if "peak_memory" in _record:
+                _estimates[module] = _record["peak_memory"]
+                continue
+            _c_size: float = _record.get(
+                "c_size",
+                (os.path.getsize(path) if os.path.exists(path) else 0)
+                * self.__C_BYTES_PER_BYTE,
+            )
+            _estimates[module] = (
+                self.__BASELINE_MEMORY_MB
+                + _c_size / 1024 / 1024 * self.__MEMORY_PER_C_MB
+            )
+        return _estimates
+
+    # Estimate how long given stages of the modules will take, using file size as fallback
+    def estimate(self, paths: dict[str, str], *stages: str) -> dict[str, float]:
+        _known: dict[str, float] = {}
+        _size: dict[str, int] = {}
+        for module, path in paths.items():
+            _size[module] = os.path.getsize(path) if os.path.exists(path) else 0
+            if (_seconds := self.get(module, *stages)) is not None:
+                _known[module] = _seconds
+        # convert file size into seconds based on the modules we already know
+        _known_size: int = sum(_size[module] for module in _known)
+        _seconds_per_byte: float = (
+            sum(_known.values()) / _known_size
+            if _known_size > 0 and sum(_known.values()) > 0
+            else self.__DEFAULT_SECONDS_PER_BYTE
+        )
+        return {
+            module: _known.get(module, _size[module] * _seconds_per_byte)
+            for module in paths
+        }
+
+    # Save history to disk
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+        _temp: str = f"{self.__path}.{os.getpid()}.tmp"
+        with open(_temp, "w", encoding="utf-8") as f:
+            json.dump(self.__records, f, indent=4, sort_keys=True)
+        os.replace(_temp, self.__path)
+
+    # Summary of the slowest modules of current build
+    def summary(self, top: int) -> str:
+        _slowest: list[tuple[float, str]] = sorted(
+            (
+                (sum(stages.get(stage, 0.0) for stage in self.STAGES), module)
+                for module, stages in self.__current.items()
+            ),
+            reverse=True,
+        )[:top]
+        if len(_slowest) <= 0:
+            return ""
+        _width: int = max(len(module) for _, module in _slowest)
+        _lines: list[str] = [
+            f"Slowest {len(_slowest)} module(s):",
+            f"  {'module'.ljust(_width)}  "
+            + "  ".join(f"{stage:>9}" for stage in self.STAGES)
+            + f"  {'total':>9}",
+        ]
+        for total, module in _slowest:
+            _lines.append(
+                f"  {module.ljust(_width)}  "
+                + "  ".join(
+                    f"{self.__current[module].get(stage, 0.0):>8.2f}s"
+                    for stage in self.STAGES
+                )
+                + f"  {total:>8.2f}s"
+            )
+        return "\n".join(_lines)
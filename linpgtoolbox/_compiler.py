@@ -1,114 +1,537 @@
 import os
 import sys
-from typing import IO, TYPE_CHECKING
+import shutil
+import time
+from contextlib import contextmanager
+from tempfile import TemporaryFile, mkdtemp
+from typing import IO, TYPE_CHECKING, Any, Final, Iterator
 
 if TYPE_CHECKING:
-    from multiprocessing.sharedctypes import Synchronized
+    from multiprocessing.context import ForkServerContext, SpawnContext
+    from multiprocessing.queues import SimpleQueue
+    from multiprocessing.sharedctypes import Synchronized, SynchronizedArray
 
 import mypy.stubgen
 from Cython.Build import cythonize  # type: ignore
 
 # setuptools.setup import cannot be after Cython.Build
 from setuptools import setup
+from setuptools.command.build_ext import build_ext
+
+from linpgtoolbox._compile_cache import ObjectCache
+
+# Extra arguments for stubgen
+_STUBGEN_ARGS: Final[tuple[str, ...]] = ("--include-docstrings", "--include-private")
+# Estimated peak memory in MB of a stubgen run
+_STUBGEN_MEMORY_MB: Final[float] = 512.0
+
+# Shared progress counter of current worker process
+_progress_counter: "Synchronized[int] | None" = None
+# Shared object cache hits, misses and uncacheable modules of current worker process
+_object_cache_stats: "SynchronizedArray[int] | None" = None
+# Object cache of current worker process, None if disabled
+_object_cache: ObjectCache | None = None
+
+
+# Initialize a compile worker process
+def _init_worker(
+    _counter: "Synchronized[int]",
+    _stats: "SynchronizedArray[int]",
+    _object_cache_dir: str | None,
+    _pids: "SimpleQueue[int] | None" = None,
+) -> None:
+    global _progress_counter, _object_cache_stats, _object_cache
+    # the main process keeps track of its workers, so that it can stop them on failure
+    if _pids is not None:
+        _pids.put(os.getpid())
+    _progress_counter = _counter
+    _object_cache_stats = _stats
+    # eviction is done by the main process, so the size limit does not matter here
+    _object_cache = (
+        ObjectCache(_object_cache_dir, 0) if _object_cache_dir is not None else None
+    )
+
+
+# Build extension modules, reusing the ones built from the same preprocessed c code
+class _CachedBuildExt(build_ext):
+    # Get the c code of given source file after preprocessing, None if it cannot be preprocessed
+    def __preprocess(self, _source: str, _ext: Any) -> bytes | None:
+        _macros: list[Any] = [*_ext.define_macros, *((_m,) for _m in _ext.undef_macros)]
+        _temp: str = mkdtemp()
+        _output: str = os.path.join(_temp, "preprocessed.i")
+        try:
+            self.compiler.preprocess(
+                _source,
+                _output,
+                macros=_macros,
+                include_dirs=_ext.include_dirs,
+                # line markers contain absolute paths, which would make the key depend on location
+                extra_postargs=[
+                    *(["-P"] if self.compiler.compiler_type == "unix" else []),
+                    *_ext.extra_compile_args,
+                ],
+            )
+            # some compilers (e.g. msvc) do nothing when asked to preprocess
+            if not os.path.exists(_output):
+                raise NotImplementedError(
+                    f'the "{self.compiler.compiler_type}" compiler cannot preprocess'
+                )
+            with open(_output, "rb") as f:
+                return f.read()
+        except Exception as e:
+            # without the preprocessed code, changes of the included headers would go unnoticed
+            print(
+                f"Object cache is skipped for {_ext.name}, since {_source} cannot be"
+                f" preprocessed: {type(e).__name__}: {e}"
+            )
+            return None
+        finally:
+            shutil.rmtree(_temp, ignore_errors=True)
+
+    # Count an object cache hit, miss or a module that cannot be cached
+    @staticmethod
+    def __count(_index: int) -> None:
+        if _object_cache_stats is not None:
+            with _object_cache_stats.get_lock():
+                _object_cache_stats[_index] += 1
+
+    def build_extension(self, ext: Any) -> None:
+        if _object_cache is None:
+            super().build_extension(ext)
+            return
+        _code: list[bytes | None] = [
+            self.__preprocess(_source, ext) for _source in ext.sources
+        ]
+        _preprocessed: list[bytes] = [_c for _c in _code if _c is not None]
+        if len(_preprocessed) < len(_code):
+            self.__count(2)
+            super().build_extension(ext)
+            return
+        _flags: tuple[Any, ...] = (
+            self.compiler.compiler_type,
+            getattr(self.compiler, "compiler_so", None),
+            getattr(self.compiler, "linker_so", None),
+            self.debug,
+            ext.language,
+            ext.define_macros,
+            ext.undef_macros,
+            ext.extra_compile_args,
+            ext.extra_link_args,
+            ext.extra_objects,
+            ext.libraries,
+            ext.library_dirs,
+            ext.runtime_library_dirs,
+        )
+        _key: str = _object_cache.key(_flags, _preprocessed)
+        _ext_path: str = self.get_ext_fullpath(ext.name)
+        if _object_cache.restore(_key, _ext_path):
+            self.__count(0)
+            return
+        self.__count(1)
+        super().build_extension(ext)
+        if os.path.exists(_ext_path):
+            _object_cache.store(_key, _ext_path)
+
+
+# Error of a compile job, with the output of the job if it has been captured
+class _JobError(Exception):
+    def __init__(self, message: str, output: str = "", exit_code: int = 1) -> None:
+        super().__init__(message, output, exit_code)
+        self.message: str = message
+        self.output: str = output
+        self.exit_code: int = exit_code
+
+    def __str__(self) -> str:
+        return self.message
+
+
+# Capture stdout and stderr if needed and update the progress counter once done
+@contextmanager
+def _job(_silent: bool) -> Iterator[None]:
+    # If silent mode, capture stdout and stderr (including the output of the c compiler)
+    # on file descriptor level, since workers are reused and loggers keep the streams
+    _captured: IO[str] | None = None
+    _original_fds: tuple[int, int] = (-1, -1)
+    if _silent:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        _captured = TemporaryFile("w+", encoding="utf-8", errors="replace")
+        _original_fds = (os.dup(1), os.dup(2))
+        os.dup2(_captured.fileno(), 1)
+        os.dup2(_captured.fileno(), 2)
+    try:
+        yield
+    except KeyboardInterrupt:
+        raise
+    except BaseException as e:
+        # setuptools exits with the status of the failed command
+        _exit_code: int = (
+            e.code
+            if isinstance(e, SystemExit) and isinstance(e.code, int) and e.code != 0
+            else 1
+        )
+        _output: str = ""
+        if _captured is not None:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _captured.seek(0)
+            _output = _captured.read()
+        raise _JobError(f"{type(e).__name__}: {e}", _output, _exit_code) from None
+    finally:
+        # Update progress counter
+        if _progress_counter is not None:
+            with _progress_counter.get_lock():
+                _progress_counter.value += 1
+        # Restore stdout and stderr
+        if _captured is not None:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(_original_fds[0], 1)
+            os.dup2(_original_fds[1], 2)
+            os.close(_original_fds[0])
+            os.close(_original_fds[1])
+            _captured.close()
+
+
+# Get the c/cpp file generated for given file, None if it does not exist
+def _find_c_file(_path: str) -> str | None:
+    file_path_without_ext: str = _path[: _path.rfind(".")]
+    for _suffix in (".c", ".cpp"):
+        if os.path.exists(file_path_without_ext + _suffix):
+            return file_path_without_ext + _suffix
+    return None
+
+
+# Delete the c/cpp file generated for given file
+def _remove_c_file(_path: str) -> None:
+    if (_c_file := _find_c_file(_path)) is not None:
+        os.remove(_c_file)
+
+
+# Get the size of the c/cpp file generated for given file
+def _c_file_size(_path: str) -> int:
+    _c_file: str | None = _find_c_file(_path)
+    return os.path.getsize(_c_file) if _c_file is not None else 0
+
+
+# Get the peak memory in MB of the largest child process (the c compiler) so far
+def _children_peak_memory() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    _max_rss: int = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return _max_rss / 1024 / 1024 if sys.platform == "darwin" else _max_rss / 1024
+
+
+# Add the c compiler and linker flags of the build profile to given extensions
+def _apply_settings(_extensions: list[Any], _settings: dict[str, Any]) -> None:
+    for _extension in _extensions:
+        _extension.extra_compile_args = [
+            *_extension.extra_compile_args,
+            *_settings.get("extra_compile_args", []),
+        ]
+        _extension.extra_link_args = [
+            *_extension.extra_link_args,
+            *_settings.get("extra_link_args", []),
+        ]
 
 
 # Compile method
 def _compile_file(
-    _source_folder: str,
     _path: str,
     _keep_c: bool,
     _debug_mode: bool,
+    _annotate: bool,
+    _settings: dict[str, Any],
+    _script_args: list[str],
     _silent: bool = False,
-    _progress_counter: "Synchronized[int] | None" = None,
-) -> None:
-    # If silent mode, redirect stdout and stderr to devnull
-    _original_stdout = sys.stdout
-    _original_stderr = sys.stderr
-    _devnull_out: IO[str] | None = None
-    _devnull_err: IO[str] | None = None
-    if _silent:
-        _devnull_out = open(os.devnull, "w")
-        _devnull_err = open(os.devnull, "w")
-        sys.stdout = _devnull_out
-        sys.stderr = _devnull_err
-    try:
+) -> tuple[float, float, int, float]:
+    with _job(_silent):
+        _start: float = time.perf_counter()
+        _extensions = cythonize(  # type: ignore
+            _path,
+            show_all_warnings=_debug_mode,
+            annotate=_annotate,
+            compiler_directives=_settings.get("directives", {}),
+        )
+        _apply_settings(_extensions, _settings)
+        _cythonized: float = time.perf_counter()
+        _c_size: int = _c_file_size(_path)
+        _peak_memory: float = _children_peak_memory()
         setup(
-            ext_modules=cythonize(  # type: ignore
-                _path, show_all_warnings=_debug_mode, annotate=_debug_mode
-            )
+            ext_modules=_extensions,
+            script_args=_script_args,
+            cmdclass={"build_ext": _CachedBuildExt},
         )
+        _compiled: float = time.perf_counter()
+        _compiler_peak_memory: float = _children_peak_memory()
         # Delete c/cpp files
         if not _keep_c:
-            file_path_without_ext: str = _path[: _path.rfind(".")]
-            _c_file: str = file_path_without_ext + ".c"
-            _cpp_file: str = file_path_without_ext + ".cpp"
-            if os.path.exists(_c_file):
-                os.remove(_c_file)
-            elif os.path.exists(_cpp_file):
-                os.remove(_cpp_file)
-        # Generate .pyi typing hint files
-        if _path.endswith(".py"):
-            mypy.stubgen.main(
-                [
-                    _path,
-                    "-o",
-                    os.path.dirname(_source_folder),
-                    "--include-docstrings",
-                    "--include-private",
-                ]
+            _remove_c_file(_path)
+        # Return how long cythonize and c compilation took, the size of the c code
+        # and the peak memory of the c compiler (0 if it cannot be told apart
+        # from the previous jobs of this worker)
+        return (
+            _cythonized - _start,
+            _compiled - _cythonized,
+            _c_size,
+            _compiler_peak_memory if _compiler_peak_memory > _peak_memory else 0.0,
+        )
+
+
+# Compile all given files with a single cythonize and a single parallel build_ext run
+def _compile_files(
+    _paths: list[str],
+    _keep_c: bool,
+    _debug_mode: bool,
+    _annotate: bool,
+    _settings: list[dict[str, Any]],
+    _script_args: list[str],
+    _threads: int,
+    _silent: bool = False,
+) -> tuple[float, float, int, float]:
+    with _job(_silent):
+        _start: float = time.perf_counter()
+        # cythonize takes the same directives for all files, so the files that share
+        # the same settings are cythonized together
+        _groups: dict[str, tuple[dict[str, Any], list[str]]] = {}
+        for _path, _setting in zip(_paths, _settings):
+            _groups.setdefault(repr(_setting), (_setting, []))[1].append(_path)
+        _extensions: list[Any] = []
+        for _setting, _group in _groups.values():
+            _group_extensions = cythonize(  # type: ignore
+                _group,
+                nthreads=_threads,
+                show_all_warnings=_debug_mode,
+                annotate=_annotate,
+                compiler_directives=_setting.get("directives", {}),
             )
-        # Delete original py file (only executed after all above steps succeed)
-        os.remove(_path)
-    finally:
-        # Update progress counter
-        if _progress_counter is not None:
-            with _progress_counter.get_lock():
-                _progress_counter.value += 1
-        # Restore stdout and stderr
-        if _silent:
-            sys.stdout = _original_stdout
-            sys.stderr = _original_stderr
-            if _devnull_out is not None:
-                _devnull_out.close()
-            if _devnull_err is not None:
-                _devnull_err.close()
+            _apply_settings(_group_extensions, _setting)
+            _extensions.extend(_group_extensions)
+        _cythonized: float = time.perf_counter()
+        _c_size: int = sum(_c_file_size(_path) for _path in _paths)
+        _peak_memory: float = _children_peak_memory()
+        setup(
+            ext_modules=_extensions,
+            script_args=[*_script_args, "--parallel", str(_threads)],
+            cmdclass={"build_ext": _CachedBuildExt},
+        )
+        _compiled: float = time.perf_counter()
+        _compiler_peak_memory: float = _children_peak_memory()
+        # Delete c/cpp files
+        if not _keep_c:
+            for _path in _paths:
+                _remove_c_file(_path)
+        # Return how long cythonize and c compilation took, the size of the c code
+        # and the peak memory of the c compiler (0 if unknown)
+        return (
+            _cythonized - _start,
+            _compiled - _cythonized,
+            _c_size,
+            _compiler_peak_memory if _compiler_peak_memory > _peak_memory else 0.0,
+        )
+
+
+# Get the pending jobs (indexes of given memory estimates) to start next: the longest ones
+# that fit into the budget, and when the next one does not, the smaller ones that do so that
+# idle workers are kept busy; a job always starts when nothing else is running
+def _admit(
+    _pending: list[int],
+    _memory: list[float],
+    _running: list[float],
+    _budget: float | None,
+    _max_workers: int,
+) -> list[int]:
+    _admitted: list[int] = []
+    _used: list[float] = list(_running)
+    for i in _pending:
+        if len(_used) >= _max_workers:
+            break
+        if _budget is None or len(_used) <= 0 or sum(_used) + _memory[i] <= _budget:
+            _admitted.append(i)
+            _used.append(_memory[i])
+    return _admitted
+
+
+# Generate .pyi typing hint files for given modules with a single stubgen run
+def _generate_stubs(_paths: list[str], _output: str, _silent: bool = False) -> float:
+    with _job(_silent):
+        _start: float = time.perf_counter()
+        mypy.stubgen.main([*_paths, "-o", _output, *_STUBGEN_ARGS])
+        return time.perf_counter() - _start
 
 
 if __name__ == "__main__":
     import json
     import re
-    import time
+    import signal
+    from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+    from functools import partial
+    from fnmatch import fnmatchcase
     from glob import glob
-    from multiprocessing import Process, Value
-    from tempfile import gettempdir
-    from typing import Any
+    from multiprocessing import get_all_start_methods, get_context
+    from typing import Callable
+
+    from linpgtoolbox._compile_cache import CompileCache, StubCache
+    from linpgtoolbox._compile_history import CompileHistory
+    from linpgtoolbox._gitignore import GitIgnore
+    from linpgtoolbox._profile_data import ProfileData
+
+    # Arguments for setuptools (the options of this script itself are excluded)
+    _script_args: list[str] = sys.argv[1:]
+
+    # Whether to show compile messages (enabled via command line argument, default off for multiprocessing, shows progress bar)
+    _show_compile_messages: bool = "--show-compile-messages" in _script_args
+    if _show_compile_messages:
+        _script_args.remove("--show-compile-messages")
 
-    # Load global parameters
-    _data_path: str = os.path.join(gettempdir(), "linpgtoolbox_builder_cache.json")
+    # Load global parameters from the configuration file of current build
+    _data_path: str = _script_args.pop(_script_args.index("--config") + 1)
+    _script_args.remove("--config")
     with open(_data_path, "r", encoding="utf-8") as f:
         _data: dict[str, Any] = json.load(f)
         # Whether to enable debug mode
         _debug_mode: bool = bool(_data["debug_mode"])
+        # Whether to generate the html annotation of each module (always on in debug mode)
+        _annotate: bool = _debug_mode or bool(_data.get("annotate", False))
         # Whether to keep c files
         _keep_c: bool = bool(_data["keep_c"])
         # Whether to enable multiprocessing
         _enable_multiprocessing: bool = bool(_data["enable_multiprocessing"])
+        # Maximum number of worker processes (default to the number of cpu cores)
+        _workers: int = max(int(_data.get("workers") or os.cpu_count() or 1), 1)
         # Path to store source code files
         _source_folder: str = str(_data["source_folder"])
         # Keywords of files to ignore
         _ignores: tuple[str, ...] = tuple(_data["ignores"])
-
-    # Whether to show compile messages (enabled via command line argument, default off for multiprocessing, shows progress bar)
-    _show_compile_messages: bool = "--show-compile-messages" in sys.argv
+        # Files that are ignored by the gitignore files of the project are not compiled
+        _gitignore: GitIgnore | None = (
+            GitIgnore(_data["gitignore_root"], list(_data.get("gitignore_rules", [])))
+            if _data.get("gitignore_root")
+            else None
+        )
+        # Whether to reuse the modules compiled by previous builds
+        _enable_cache: bool = bool(_data.get("enable_cache", True))
+        # Folder of compile cache
+        _cache_dir: str = str(_data.get("cache_dir") or CompileCache.default_dir())
+        # Size limit of compile cache in MB
+        _cache_size_limit: int = int(_data.get("cache_size_limit", 2048))
+        # Whether to reuse the extension modules built from the same preprocessed c code
+        _enable_object_cache: bool = _enable_cache and bool(
+            _data.get("enable_object_cache", True)
+        )
+        # Folder of object cache, which can be shared by multiple machines
+        _object_cache_dir: str = str(
+            _data.get("object_cache_dir") or os.path.join(_cache_dir, "objects")
+        )
+        # Size limit of object cache in MB
+        _object_cache_size_limit: int = int(_data.get("object_cache_size_limit", 2048))
+        # Number of stubgen runs that typing hint files are generated by
+        _stubgen_shards: int = max(int(_data.get("stubgen_shards", 1)), 1)
+        # Whether to reuse the typing hint files of modules whose interface has not changed
+        _skip_unchanged_stubs: bool = _enable_cache and bool(
+            _data.get("skip_unchanged_stubs", False)
+        )
+        # Compile each file in its own job ("per_file") or all files at once ("batch")
+        _engine: str = str(_data.get("engine", "per_file"))
+        if _engine not in ("per_file", "batch"):
+            raise ValueError(f'Unknown compile engine "{_engine}"!')
+        # Whether to cancel all remaining jobs once a job fails
+        _fail_fast: bool = bool(_data.get("fail_fast", False))
+        # Number of slowest modules to report at the end of the build
+        _slowest_modules_report: int = int(_data.get("slowest_modules_report", 10))
+        # Memory in MB that all running jobs may use together (0 to derive it from available memory)
+        _memory_budget_mb: float = float(_data.get("memory_budget", 0))
+        # Fraction of the available memory that all running jobs may use together
+        _memory_fraction: float = float(_data.get("memory_fraction", 0.8))
+        # Rules (module glob and settings) of the selected build profile
+        _build_profile: list[tuple[str, dict[str, Any]]] = [
+            (str(_pattern), dict(_settings))
+            for _pattern, _settings in _data.get("build_profile", [])
+        ]
+        # Profile of a real workload, only the modules that take most of its time are compiled
+        _profile: ProfileData | None = (
+            ProfileData(str(_data["profile"])) if _data.get("profile") else None
+        )
+        # Share of the time spent in the package that the compiled modules shall hold
+        _profile_share: float = min(max(float(_data.get("profile_share", 0.9)), 0), 1)
 
     # Remove parameter file
     os.remove(_data_path)
 
+    # stubgen writes a mypy cache into the working directory, which is the project that
+    # other builds may be compiling at the same time, so it goes into the build directory
+    if "--build-temp" in _script_args:
+        os.environ["MYPY_CACHE_DIR"] = os.path.join(
+            _script_args[_script_args.index("--build-temp") + 1], ".mypy_cache"
+        )
+
     # Whether silent mode (enabled when multiprocessing and compile messages are not requested)
     _silent: bool = _enable_multiprocessing and not _show_compile_messages
 
+    # Workers are forked from a server that has already imported the heavy libraries
+    # so that each compile job does not need to pay for a cold interpreter start
+    _context: "ForkServerContext | SpawnContext"
+    if "forkserver" in get_all_start_methods():
+        _context = get_context("forkserver")
+        _context.set_forkserver_preload(["Cython.Build", "setuptools", "mypy.stubgen"])
+    else:
+        _context = get_context("spawn")
+
     # Shared progress counter
-    _progress_counter = Value("i", 0)
+    _shared_progress_counter = _context.Value("i", 0)
+    # Shared object cache hits, misses and the modules that cannot be cached
+    _shared_object_cache_stats = _context.Array("i", 3)
+    # Arguments for initializing worker processes (and current process)
+    _worker_args: tuple[Any, ...] = (
+        _shared_progress_counter,
+        _shared_object_cache_stats,
+        _object_cache_dir if _enable_object_cache else None,
+    )
+    _init_worker(*_worker_args)
+    # Process ids of the workers, reported by the workers themselves once started
+    _worker_pids: "SimpleQueue[int]" = _context.SimpleQueue()
+
+    # Compile cache, only options that affect the compiled output shall be part of the key
+    _cache: CompileCache = CompileCache(
+        os.path.join(_cache_dir, "compile"), _cache_size_limit
+    )
+    if _enable_cache:
+        _cache.setup(
+            {"debug_mode": _debug_mode, "annotate": _annotate, "keep_c": _keep_c}
+        )
+
+    # Stub cache, used to skip generating stubs for modules whose interface has not changed
+    _stub_cache: StubCache = StubCache(
+        os.path.join(_cache_dir, "stubs"), list(_STUBGEN_ARGS)
+    )
+
+    # Durations of each module in previous builds, used to start the slowest jobs first
+    _history: CompileHistory = CompileHistory(
+        os.path.join(_cache_dir, "history", os.path.basename(_source_folder) + ".json")
+    )
+
+    # Get the memory in MB that all running jobs may use together, None if unlimited
+    def _memory_budget() -> float | None:
+        if _memory_budget_mb > 0:
+            return _memory_budget_mb
+        try:
+            with open("/proc/meminfo", "r", encoding="utf-8") as f:
+                for _line in f:
+                    if _line.startswith("MemAvailable:"):
+                        return int(_line.split()[1]) / 1024 * _memory_fraction
+        except (OSError, ValueError):
+            pass
+        return None
+
+    # Whether the job has finished without error
+    def _succeeded(_future: Future[Any]) -> bool:
+        return (
+            _future.done() and not _future.cancelled() and _future.exception() is None
+        )
 
     # Show progress bar
     def _print_progress_bar(completed: int, total: int) -> None:
@@ -125,83 +548,462 @@ if __name__ == "__main__":
 
     # Compile process management module
     class _CompileProcessManager:
-        # List to store processes
-        __processes: list[Process] = []
+        # List to store the files that need to be compiled
+        __files: list[str] = []
+        # List to store the python files that need typing hint files
+        __stubs: list[str] = []
+        # Compile job of each file
+        __compile_jobs: dict[str, Future[tuple[float, float, int, float]]] = {}
+        # Stub job of each python file
+        __stub_jobs: dict[str, Future[float]] = {}
+        # Files of each job
+        __jobs: dict[Future[Any], list[str]] = {}
+        # List to store the files that have been restored from cache
+        __restored: list[str] = []
+        # List to store the files that have been compiled successfully
+        __succeeded: list[str] = []
+        # Cache keys of the files that need to be compiled
+        __keys: dict[str, str] = {}
 
         # Whether to ignore file
         @classmethod
         def __if_ignore(cls, _path: str) -> bool:
-            return any(re.match(pattern, _path) for pattern in _ignores)
+            return any(re.match(pattern, _path) for pattern in _ignores) or (
+                _gitignore is not None
+                and _gitignore.is_ignored(cls.module(_path), os.path.isdir(_path))
+            )
 
-        # Create compile process
+        # Collect files that need to be compiled
         @classmethod
-        def __generate_process(cls, _path: str) -> None:
+        def __collect(cls, _path: str) -> None:
             if not os.path.isdir(_path):
                 if (
                     _path.endswith(".py") or _path.endswith(".pyx")
                 ) and not cls.__if_ignore(_path):
-                    # If using multiprocessing
-                    if _enable_multiprocessing is True:
-                        cls.__processes.append(
-                            Process(
-                                target=_compile_file,
-                                args=(
-                                    _source_folder,
-                                    _path,
-                                    _keep_c,
-                                    _debug_mode,
-                                    _silent,
-                                    _progress_counter,
-                                ),
-                            )
-                        )
-                    # If not using multiprocessing
-                    else:
-                        _compile_file(_source_folder, _path, _keep_c, _debug_mode)
+                    cls.__files.append(_path)
             elif "pyinstaller" not in _path and "pycache" not in _path:
                 if not cls.__if_ignore(_path):
                     for file_in_dir in glob(os.path.join(_path, "*")):
-                        cls.__generate_process(file_in_dir)
+                        cls.__collect(file_in_dir)
 
-        # Get total number of processes
+        # Only compile the modules that hold most of the time of the profiled workload,
+        # the others are kept as python source (cython source files are always compiled)
+        @classmethod
+        def __select_hot(cls) -> None:
+            assert _profile is not None
+            _candidates: dict[str, str] = {
+                cls.module(_path): _path
+                for _path in cls.__files
+                if _path.endswith(".py")
+            }
+            _times: dict[str, float] = _profile.times(list(_candidates))
+            _hot: list[str] = ProfileData.hottest(_times, _profile_share)
+            _total: float = sum(_times.values())
+            _cold: set[str] = {
+                _candidates[_module] for _module in _candidates if _module not in _hot
+            }
+            cls.__files = [_path for _path in cls.__files if _path not in _cold]
+            print(
+                f"Profile: compiling {len(_hot)} of {len(_candidates)} python module(s),"
+                f" {len(_cold)} kept as python source"
+            )
+            if len(_hot) > 0:
+                _width: int = max(len(_module) for _module in _hot)
+                for _module in _hot:
+                    print(
+                        f"  {_module.ljust(_width)}  {_times[_module]:>8.3f}s"
+                        f"  {100 * _times[_module] / _total:>5.1f}%"
+                    )
+                print(
+                    f"  {'total'.ljust(_width)}  {sum(_times[_m] for _m in _hot):>8.3f}s"
+                    f"  {100 * sum(_times[_m] for _m in _hot) / _total:>5.1f}%"
+                    f" of {_total:.3f}s spent in the package"
+                )
+
+        # Get total number of jobs
         @classmethod
         def total(cls) -> int:
-            return len(cls.__processes)
+            return (
+                (min(len(cls.__files), 1) if _engine == "batch" else len(cls.__files))
+            ) + min(len(cls.__stubs), _stubgen_shards)
 
-        # Initialize compile processes
+        # Initialize compile jobs
         @classmethod
         def init(cls) -> None:
             if os.path.exists(_source_folder):
-                cls.__generate_process(_source_folder)
+                cls.__collect(_source_folder)
             else:
                 _source_file: str = _source_folder + ".py"
                 if os.path.exists(_source_file):
-                    cls.__generate_process(_source_file)
+                    cls.__collect(_source_file)
+            if _profile is not None:
+                cls.__select_hot()
+            # typing hint files that come with the source code are kept as they are
+            cls.__stubs = [
+                _path
+                for _path in cls.__files
+                if _path.endswith(".py") and not os.path.exists(_path[:-3] + ".pyi")
+            ]
 
-        # Start all processes
+        # Restore the modules that have not changed since they were cached
         @classmethod
-        def start(cls) -> None:
-            for _process in cls.__processes:
-                _process.start()
+        def restore(cls) -> None:
+            _remaining: list[str] = []
+            for _path in cls.__files:
+                cls.__keys[_path] = _cache.key(
+                    _source_folder, _path, cls.settings(_path)
+                )
+                if _cache.restore(cls.__keys[_path], _path):
+                    # cython needs the __init__ files to determine the module names,
+                    # so original files can only be deleted once everything is done
+                    cls.__restored.append(_path)
+                else:
+                    _remaining.append(_path)
+            cls.__files = _remaining
+            cls.__stubs = [_path for _path in cls.__stubs if _path in cls.__files]
 
-        # Ensure all processes finish before exiting
+        # Reuse the stubs of the modules whose interface has not changed
         @classmethod
-        def join(cls) -> None:
-            for _process in cls.__processes:
-                _process.join()
+        def restore_stubs(cls) -> None:
+            cls.__stubs = [
+                _path
+                for _path in cls.__stubs
+                if not _stub_cache.restore(_source_folder, _path)
+            ]
+            if _stub_cache.hits > 0:
+                print(f"Reused {_stub_cache.hits} unchanged typing hint file(s)")
 
-    # Initialize, create processes
+        # Save the newly compiled modules into cache
+        @classmethod
+        def store(cls) -> None:
+            for _path in cls.__succeeded:
+                if _enable_cache:
+                    _cache.store(cls.__keys[_path], _path)
+                if _skip_unchanged_stubs and _path in cls.__stubs:
+                    _stub_cache.store(_path)
+            if _enable_cache:
+                _cache.evict()
+                print(_cache.summary())
+            if _object_cache is not None:
+                ObjectCache(_object_cache_dir, _object_cache_size_limit).evict()
+                print(
+                    f"Object cache: {_shared_object_cache_stats[0]} hit(s), {_shared_object_cache_stats[1]} miss(es)"
+                    + (
+                        f", {_shared_object_cache_stats[2]} module(s) not cached since they cannot be preprocessed"
+                        if _shared_object_cache_stats[2] > 0
+                        else ""
+                    )
+                )
+
+        # Delete the original files of the modules that have been compiled successfully
+        @classmethod
+        def finalize(cls) -> None:
+            for _path in cls.__files:
+                _compile_job: Future[tuple[float, float, int, float]] | None = (
+                    cls.__compile_jobs.get(_path)
+                )
+                _stub_job: Future[float] | None = cls.__stub_jobs.get(_path)
+                if (
+                    _compile_job is not None
+                    and _succeeded(_compile_job)
+                    and (_stub_job is None or _succeeded(_stub_job))
+                ):
+                    cls.__succeeded.append(_path)
+            # Only executed after all steps of the module succeed
+            for _path in (*cls.__restored, *cls.__succeeded):
+                os.remove(_path)
+
+        # Print the errors of the failed jobs, return the exit status of the build
+        @classmethod
+        def report(cls) -> int:
+            _failed: list[tuple[Future[Any], BaseException]] = []
+            _cancelled: int = 0
+            for _future in cls.__jobs:
+                if not _future.done() or _future.cancelled():
+                    _cancelled += 1
+                elif (_exception := _future.exception()) is not None:
+                    # jobs that were still running when the pool was stopped
+                    if isinstance(_exception, BrokenProcessPool):
+                        _cancelled += 1
+                    else:
+                        _failed.append((_future, _exception))
+            if len(_failed) <= 0 and _cancelled <= 0:
+                return 0
+            print(f"\n{'=' * 20} {len(_failed)} job(s) failed {'=' * 20}")
+            for _future, _exception in _failed:
+                _paths: list[str] = cls.__jobs[_future]
+                if cls.__stub_jobs.get(_paths[0]) is _future:
+                    print(f"\n---- stubgen of {len(_paths)} module(s) ----")
+                elif len(_paths) > 1:
+                    print(f"\n---- batch compile of {len(_paths)} module(s) ----")
+                else:
+                    print(f"\n---- {cls.module(_paths[0])} ----")
+                if isinstance(_exception, _JobError) and len(_exception.output) > 0:
+                    print(_exception.output.rstrip())
+                print(_exception)
+            if _cancelled > 0:
+                print(f"\n{_cancelled} job(s) cancelled")
+            return next(
+                (
+                    _exception.exit_code
+                    for _, _exception in _failed
+                    if isinstance(_exception, _JobError)
+                ),
+                1,
+            )
+
+        # Get the settings of given file from the build profile, directives of later rules
+        # override the ones of earlier rules and compiler flags are appended
+        @classmethod
+        def settings(cls, _path: str) -> dict[str, Any]:
+            _name: str = os.path.splitext(cls.module(_path))[0].replace("/", ".")
+            _name = _name.removesuffix(".__init__")
+            _settings: dict[str, Any] = {}
+            for _pattern, _rule in _build_profile:
+                if not fnmatchcase(_name, _pattern):
+                    continue
+                for _key, _value in _rule.items():
+                    if _key == "directives":
+                        _settings[_key] = {**_settings.get(_key, {}), **_value}
+                    else:
+                        _settings[_key] = [*_settings.get(_key, []), *_value]
+            return _settings
+
+        # Get the module name of given file
+        @staticmethod
+        def module(_path: str) -> str:
+            return os.path.relpath(_path, os.path.dirname(_source_folder)).replace(
+                os.sep, "/"
+            )
+
+        # Record how long each stage of the finished jobs took
+        @classmethod
+        def record(cls) -> None:
+            for _future, _paths in cls.__jobs.items():
+                if not _succeeded(_future):
+                    continue
+                if cls.__stub_jobs.get(_paths[0]) is _future:
+                    # the duration of a stubgen run is shared by all of its modules
+                    for _path in _paths:
+                        _history.record(
+                            cls.module(_path), "stubgen", _future.result() / len(_paths)
+                        )
+                # the durations of a batch are meaningless for a single module
+                elif len(_paths) == 1:
+                    _cythonize_time, _compile_time, _c_size, _peak_memory = (
+                        _future.result()
+                    )
+                    _history.record(cls.module(_paths[0]), "cythonize", _cythonize_time)
+                    _history.record(cls.module(_paths[0]), "compile", _compile_time)
+                    _history.record_memory(cls.module(_paths[0]), _c_size, _peak_memory)
+            _history.save()
+            if _slowest_modules_report > 0:
+                _summary: str = _history.summary(_slowest_modules_report)
+                if len(_summary) > 0:
+                    print(_summary)
+
+        # Create all jobs, from the longest to the shortest estimated duration,
+        # along with the estimated peak memory of each job
+        @classmethod
+        def __schedule(
+            cls, _budget: float | None
+        ) -> list[tuple[list[str], Callable[..., Any], tuple[Any, ...], float]]:
+            _jobs: list[
+                tuple[float, list[str], Callable[..., Any], tuple[Any, ...], float]
+            ] = []
+            _modules: dict[str, str] = {
+                cls.module(_path): _path for _path in cls.__files
+            }
+            _estimates: dict[str, float] = _history.estimate(
+                _modules, "cythonize", "compile"
+            )
+            _memory: dict[str, float] = _history.estimate_memory(_modules)
+            # A single job compiles everything, parallelized by cython and build_ext
+            if _engine == "batch" and len(cls.__files) > 0:
+                # run as many compilers in parallel as the memory budget allows
+                _threads: int = _workers
+                if _budget is not None:
+                    _threads = max(
+                        min(int(_budget / max(_memory.values())), _workers), 1
+                    )
+                _jobs.append(
+                    (
+                        sum(_estimates.values()),
+                        list(cls.__files),
+                        _compile_files,
+                        (
+                            cls.__files,
+                            _keep_c,
+                            _debug_mode,
+                            _annotate,
+                            [cls.settings(_path) for _path in cls.__files],
+                            _script_args,
+                            _threads,
+                        ),
+                        max(_memory.values()) * _threads,
+                    )
+                )
+            # Otherwise each file is compiled by its own job
+            elif _engine == "per_file":
+                for _path in cls.__files:
+                    _jobs.append(
+                        (
+                            _estimates[cls.module(_path)],
+                            [_path],
+                            _compile_file,
+                            (
+                                _path,
+                                _keep_c,
+                                _debug_mode,
+                                _annotate,
+                                cls.settings(_path),
+                                _script_args,
+                            ),
+                            _memory[cls.module(_path)],
+                        )
+                    )
+            # Split the modules into shards so that stubs can be generated in parallel
+            _estimates = _history.estimate(
+                {cls.module(_path): _path for _path in cls.__stubs}, "stubgen"
+            )
+            for i in range(min(len(cls.__stubs), _stubgen_shards)):
+                _shard: list[str] = cls.__stubs[i::_stubgen_shards]
+                _jobs.append(
+                    (
+                        sum(_estimates[cls.module(_path)] for _path in _shard),
+                        _shard,
+                        _generate_stubs,
+                        (_shard, os.path.dirname(_source_folder)),
+                        _STUBGEN_MEMORY_MB,
+                    )
+                )
+            _jobs.sort(key=lambda _job: _job[0], reverse=True)
+            return [_job[1:] for _job in _jobs]
+
+        # Keep track of the given job of the files
+        @classmethod
+        def __track(
+            cls, _paths: list[str], _function: Callable[..., Any], _future: Future[Any]
+        ) -> None:
+            (
+                cls.__stub_jobs if _function is _generate_stubs else cls.__compile_jobs
+            ).update({_path: _future for _path in _paths})
+            cls.__jobs[_future] = _paths
+
+        # Pass the outcome of a job to the future that tracks it
+        @staticmethod
+        def __forward(_source: Future[Any], _target: Future[Any]) -> None:
+            if _source.cancelled():
+                _target.cancel()
+            elif (_exception := _source.exception()) is not None:
+                _target.set_exception(_exception)
+            else:
+                _target.set_result(_source.result())
+
+        # Compile all files, using at most the given number of workers and
+        # starting a job only if the memory of all running jobs stays within budget
+        @classmethod
+        def run(cls) -> None:
+            _budget: float | None = _memory_budget()
+            _jobs: list[
+                tuple[list[str], Callable[..., Any], tuple[Any, ...], float]
+            ] = cls.__schedule(_budget)
+            # Every job is tracked before it starts, so that the jobs that never
+            # start can be reported as cancelled
+            _futures: list[Future[Any]] = []
+            for _paths, _function, _, _ in _jobs:
+                _futures.append(Future())
+                cls.__track(_paths, _function, _futures[-1])
+            # If not using multiprocessing
+            if not _enable_multiprocessing or cls.total() <= 0:
+                for _future, (_, _function, _args, _) in zip(_futures, _jobs):
+                    try:
+                        _future.set_result(_function(*_args))
+                    except Exception as e:
+                        _future.set_exception(e)
+                        if _fail_fast:
+                            break
+                # Jobs that have not been started are cancelled
+                for _future in _futures:
+                    _future.cancel()
+                return
+            _max_workers: int = min(_workers, cls.total())
+            with ProcessPoolExecutor(
+                max_workers=_max_workers,
+                mp_context=_context,
+                initializer=_init_worker,
+                initargs=(*_worker_args, _worker_pids),
+            ) as _executor:
+                # Jobs that have not been started yet, from the longest to the shortest
+                _pending: list[int] = list(range(len(_jobs)))
+                # Estimated peak memory of the running jobs
+                _running: dict[Future[Any], float] = {}
+                # If silent mode, show progress bar
+                _total: int = cls.total()
+                if _silent:
+                    _print_progress_bar(0, _total)
+                while len(_pending) > 0 or len(_running) > 0:
+                    for i in _admit(
+                        _pending,
+                        [_job[3] for _job in _jobs],
+                        list(_running.values()),
+                        _budget,
+                        _max_workers,
+                    ):
+                        _, _function, _args, _memory = _jobs[i]
+                        _submitted: Future[Any] = _executor.submit(
+                            _function, *_args, _silent
+                        )
+                        _submitted.add_done_callback(
+                            partial(cls.__forward, _target=_futures[i])
+                        )
+                        _running[_futures[i]] = _memory
+                        _pending.remove(i)
+                    _done: set[Future[Any]] = wait(
+                        _running, timeout=0.2, return_when=FIRST_COMPLETED
+                    ).done
+                    for _future in _done:
+                        _running.pop(_future)
+                    # Cancel all queued and running jobs on the first error
+                    if _fail_fast and any(
+                        _future.exception() is not None for _future in _done
+                    ):
+                        _executor.shutdown(wait=False, cancel_futures=True)
+                        # stop the running jobs as well, the pool then stops the workers
+                        # that have not reported yet once it notices it is broken
+                        while not _worker_pids.empty():
+                            try:
+                                os.kill(_worker_pids.get(), signal.SIGTERM)
+                            except OSError:
+                                pass
+                        # running jobs end up with BrokenProcessPool errors instead
+                        for i in _pending:
+                            _futures[i].cancel()
+                        break
+                    if _silent:
+                        _print_progress_bar(_shared_progress_counter.value, _total)
+                if _silent:
+                    _completed: int = _shared_progress_counter.value
+                    _print_progress_bar(_completed, _total)
+                    # the progress bar only ends the line once all jobs are done
+                    if _completed < _total:
+                        sys.stdout.write("\n")
+
+    # Initialize, collect files
     _CompileProcessManager.init()
-    # Start all processes
-    _CompileProcessManager.start()
-
-    # If silent mode, show progress bar
-    if _silent and _CompileProcessManager.total() > 0:
-        _total: int = _CompileProcessManager.total()
-        _print_progress_bar(0, _total)
-        while _progress_counter.value < _total:
-            _print_progress_bar(_progress_counter.value, _total)
-            time.sleep(0.2)
-        _print_progress_bar(_total, _total)
-    # Do not exit before processes finish
-    _CompileProcessManager.join()
+    # Skip the files that can be restored from cache
+    if _enable_cache:
+        _CompileProcessManager.restore()
+    # Skip generating the stubs that are unchanged
+    if _skip_unchanged_stubs:
+        _CompileProcessManager.restore_stubs()
+    # Compile all files (do not exit before all jobs finish)
+    try:
+        _CompileProcessManager.run()
+    finally:
+        _CompileProcessManager.record()
+        _CompileProcessManager.finalize()
+        # Modules that were compiled successfully are cached even if others failed
+        _CompileProcessManager.store()
+    # Exit with the status of the failed jobs (if any)
+    sys.exit(_CompileProcessManager.report())
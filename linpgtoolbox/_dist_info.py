@@ -0,0 +1,291 @@
+import ast
+import base64
+import csv
+import hashlib
+import io
+import os
+import re
+import tomllib
+from glob import glob
+from typing import Any, Final
+
+from ._version import Version
+
+# Content type of the readme file by its extension
+_README_TYPES: Final[dict[str, str]] = {
+    ".md": "text/markdown",
+    ".rst": "text/x-rst",
+}
+
+# Fields of the core metadata that can be dynamic and are resolved the way setuptools does
+_RESOLVABLE_FIELDS: Final[tuple[str, ...]] = ("version", "readme")
+
+
+# Normalize the name of a distribution for file names, e.g. "My-Project" -> "my_project"
+def normalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+# Get the name of the .dist-info folder of given project (the [project] table of pyproject.toml)
+def dist_info_name(project: dict[str, Any]) -> str:
+    return f"{normalize_name(project['name'])}-{Version(project['version'])}.dist-info"
+
+
+# Get the hash of some data (or of its sha256 digest) in the format of RECORD
+def record_hash(data: bytes, is_digest: bool = False) -> str:
+    return "sha256=" + base64.urlsafe_b64encode(
+        data if is_digest else hashlib.sha256(data).digest()
+    ).decode().rstrip("=")
+
+
+# Read the files (relative path -> "hash,size") recorded in a RECORD file
+def read_record(path: str) -> dict[str, str]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return {
+            _row[0]: ",".join(_row[1:3]) for _row in csv.reader(f) if len(_row) >= 2
+        }
+
+
+# Get the content of a RECORD file of given files (relative path -> "hash,size")
+def write_record(records: dict[str, str]) -> bytes:
+    _file: io.StringIO = io.StringIO()
+    csv.writer(_file, lineterminator="\n").writerows(
+        [_path, *_record.split(",")] for _path, _record in sorted(records.items())
+    )
+    return _file.getvalue().encode()
+
+
+# Read the files (relative to project folder) of a "file" directive of setuptools
+def _read_files(paths: str | list[str], project_folder: str) -> str:
+    _contents: list[str] = []
+    for _path in [paths] if isinstance(paths, str) else paths:
+        with open(os.path.join(project_folder, _path), "r", encoding="utf-8") as f:
+            _contents.append(f.read())
+    return "\n".join(_contents)
+
+
+# Get the value of an "attr" directive of setuptools (e.g. "package.module.__version__")
+# from the source of the module without importing it, None if it is not a literal
+def _read_attr(
+    attr: str, project_folder: str, setuptools: dict[str, Any]
+) -> Any | None:
+    _module, _, _name = attr.strip().rpartition(".")
+    # the module is looked up in the folders the packages are found in, and in the
+    # project folder, where the sources of a compiled package are
+    _roots: list[str] = [
+        *setuptools.get("packages", {}).get("find", {}).get("where", []),
+        *(
+            [setuptools["package-dir"][""]]
+            if "" in setuptools.get("package-dir", {})
+            else []
+        ),
+        ".",
+    ]
+    for _root in _roots:
+        _base: str = os.path.join(project_folder, _root, *_module.split("."))
+        for _path in (_base + ".py", os.path.join(_base, "__init__.py")):
+            if not os.path.isfile(_path):
+                continue
+            with open(_path, "rb") as f:
+                _tree: ast.Module = ast.parse(f.read())
+            for _node in _tree.body:
+                _value: ast.expr | None = None
+                if isinstance(_node, ast.Assign) and any(
+                    isinstance(_target, ast.Name) and _target.id == _name
+                    for _target in _node.targets
+                ):
+                    _value = _node.value
+                elif (
+                    isinstance(_node, ast.AnnAssign)
+                    and isinstance(_node.target, ast.Name)
+                    and _node.target.id == _name
+                ):
+                    _value = _node.value
+                if _value is not None:
+                    try:
+                        return ast.literal_eval(_value)
+                    except ValueError:
+                        return None
+    return None
+
+
+# Load the [project] table of the pyproject.toml in project folder, the dynamic version
+# and readme are resolved from [tool.setuptools.dynamic] the way setuptools does, the
+# fields that cannot be resolved are left in "dynamic"
+def load_project(project_folder: str) -> dict[str, Any]:
+    with open(os.path.join(project_folder, "pyproject.toml"), "rb") as f:
+        _data: dict[str, Any] = tomllib.load(f)
+    project: dict[str, Any] = dict(_data["project"])
+    if len(project.get("dynamic", [])) <= 0:
+        return project
+    _setuptools: dict[str, Any] = _data.get("tool", {}).get("setuptools", {})
+    _directives: dict[str, Any] = _setuptools.get("dynamic", {})
+    _dynamic: list[str] = []
+    for _field in project["dynamic"]:
+        _directive: Any = _directives.get(_field)
+        if _field not in _RESOLVABLE_FIELDS or not isinstance(_directive, dict):
+            _dynamic.append(_field)
+        elif _field == "version" and "attr" in _directive:
+            _version: Any = _read_attr(_directive["attr"], project_folder, _setuptools)
+            # a version may also be given as a tuple, e.g. (1, 2, 3)
+            if isinstance(_version, (tuple, list)):
+                _version = ".".join(str(_part) for _part in _version)
+            if isinstance(_version, str):
+                project["version"] = _version
+            else:
+                _dynamic.append(_field)
+        elif _field == "version" and "file" in _directive:
+            project["version"] = _read_files(_directive["file"], project_folder).strip()
+        elif _field == "readme" and "file" in _directive:
+            _files: list[str] = (
+                [_directive["file"]]
+                if isinstance(_directive["file"], str)
+                else _directive["file"]
+            )
+            project["readme"] = {
+                "text": _read_files(_files, project_folder),
+                "content-type": _directive.get("content-type")
+                or _README_TYPES.get(
+                    os.path.splitext(_files[0])[1].lower(), "text/plain"
+                ),
+            }
+        else:
+            _dynamic.append(_field)
+    project["dynamic"] = _dynamic
+    return project
+
+
+# Get a header of the core metadata, the lines of a multi-line value are indented
+def _header(name: str, value: str) -> str:
+    return f"{name}: " + "\n        ".join(str(value).splitlines())
+
+
+# Get the content of the METADATA file of the project, along with the license files
+# (relative to project folder) that it refers to
+def _metadata(project: dict[str, Any], project_folder: str) -> tuple[str, list[str]]:
+    _license: str | dict[str, str] = project.get("license", {})
+    _license_files: list[str] = sorted(
+        {
+            os.path.relpath(_path, project_folder).replace(os.sep, "/")
+            for _pattern in project.get("license-files", [])
+            for _path in glob(os.path.join(project_folder, _pattern))
+            if os.path.isfile(_path)
+        }
+    )
+    # license expressions and license files are introduced in metadata 2.4
+    _lines: list[str] = [
+        _header(
+            "Metadata-Version",
+            ("2.4" if isinstance(_license, str) or len(_license_files) > 0 else "2.1"),
+        ),
+        _header("Name", project["name"]),
+        _header("Version", str(Version(project["version"]))),
+    ]
+    if "description" in project:
+        _lines.append(_header("Summary", project["description"]))
+    if len(project.get("keywords", [])) > 0:
+        _lines.append(_header("Keywords", ",".join(project["keywords"])))
+    for _role, _people in (
+        ("Author", project.get("authors", [])),
+        ("Maintainer", project.get("maintainers", [])),
+    ):
+        _names: list[str] = [_p["name"] for _p in _people if "email" not in _p]
+        _emails: list[str] = [
+            f"{_p['name']} <{_p['email']}>" if "name" in _p else _p["email"]
+            for _p in _people
+            if "email" in _p
+        ]
+        if len(_names) > 0:
+            _lines.append(_header(_role, ", ".join(_names)))
+        if len(_emails) > 0:
+            _lines.append(_header(f"{_role}-email", ", ".join(_emails)))
+    if isinstance(_license, str):
+        _lines.append(_header("License-Expression", _license))
+    elif "text" in _license:
+        _lines.append(_header("License", _license["text"]))
+    elif "file" in _license:
+        with open(
+            os.path.join(project_folder, _license["file"]), "r", encoding="utf-8"
+        ) as f:
+            _lines.append(_header("License", f.read()))
+    for _path in _license_files:
+        _lines.append(_header("License-File", _path))
+    for _classifier in project.get("classifiers", []):
+        _lines.append(_header("Classifier", _classifier))
+    for _label, _url in project.get("urls", {}).items():
+        _lines.append(_header("Project-URL", f"{_label}, {_url}"))
+    if "requires-python" in project:
+        _lines.append(_header("Requires-Python", project["requires-python"]))
+    for _requirement in project.get("dependencies", []):
+        _lines.append(_header("Requires-Dist", _requirement))
+    for _extra, _requirements in project.get("optional-dependencies", {}).items():
+        _lines.append(_header("Provides-Extra", _extra))
+        for _requirement in _requirements:
+            _name, _, _marker = str(_requirement).partition(";")
+            _lines.append(
+                _header(
+                    "Requires-Dist",
+                    f"{_name.strip()} ; "
+                    + (f"({_marker.strip()}) and " if _marker.strip() else "")
+                    + f'extra == "{_extra}"',
+                )
+            )
+    # the readme is the body of the metadata
+    _readme: str | dict[str, str] | None = project.get("readme")
+    _description: str | None = None
+    if isinstance(_readme, str):
+        _readme = {"file": _readme}
+    if _readme is not None:
+        _content_type: str | None = _readme.get("content-type")
+        if "file" in _readme:
+            with open(
+                os.path.join(project_folder, _readme["file"]), "r", encoding="utf-8"
+            ) as f:
+                _description = f.read()
+            _content_type = _content_type or _README_TYPES.get(
+                os.path.splitext(_readme["file"])[1].lower(), "text/plain"
+            )
+        else:
+            _description = _readme.get("text")
+        if _content_type is not None:
+            _lines.append(_header("Description-Content-Type", _content_type))
+    return (
+        "\n".join(_lines)
+        + "\n"
+        + (f"\n{_description}" if _description is not None else "")
+    ), _license_files
+
+
+# Get the content of the entry_points.txt file of the project, None if it has no entry point
+def _entry_points(project: dict[str, Any]) -> str | None:
+    _groups: dict[str, dict[str, str]] = {
+        "console_scripts": project.get("scripts", {}),
+        "gui_scripts": project.get("gui-scripts", {}),
+        **project.get("entry-points", {}),
+    }
+    _sections: list[str] = [
+        f"[{_group}]\n"
+        + "".join(f"{_name} = {_value}\n" for _name, _value in _entries.items())
+        for _group, _entries in _groups.items()
+        if len(_entries) > 0
+    ]
+    return "\n".join(_sections) if len(_sections) > 0 else None
+
+
+# Get the files (relative to the .dist-info folder) that describe the project in
+# both wheels and installed projects: METADATA, entry_points.txt and the license files
+def dist_info_files(project: dict[str, Any], project_folder: str) -> dict[str, bytes]:
+    # fields that are computed by the build backend cannot be known here
+    # (see load_project for the ones that are resolved)
+    if len(project.get("dynamic", [])) > 0:
+        raise ValueError(
+            f"Dynamic metadata ({', '.join(project['dynamic'])}) is not supported!"
+        )
+    _metadata_text, _license_files = _metadata(project, project_folder)
+    _files: dict[str, bytes] = {"METADATA": _metadata_text.encode()}
+    if (_entry_points_text := _entry_points(project)) is not None:
+        _files["entry_points.txt"] = _entry_points_text.encode()
+    for _path in _license_files:
+        with open(os.path.join(project_folder, _path), "rb") as f:
+            _files[f"licenses/{_path}"] = f.read()
+    return _files
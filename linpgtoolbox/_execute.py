@@ -1,11 +1,16 @@
+import os
+import shutil
 import sys
-from subprocess import check_call
+from contextvars import ContextVar
+from subprocess import CompletedProcess, check_call, run
 
 # the python version of current environment
 _DEFAULT_PYTHON_VERSION: str = f"{sys.version_info.major}.{sys.version_info.minor}"
 
-# the version that currently selected for commands
-_SELECTED_PYTHON_VERSION: str = _DEFAULT_PYTHON_VERSION
+# the version that currently selected for commands (each thread selects its own version)
+_SELECTED_PYTHON_VERSION: ContextVar[str] = ContextVar(
+    "selected_python_version", default=_DEFAULT_PYTHON_VERSION
+)
 
 
 # if the current platform is windows
@@ -13,24 +18,55 @@ def is_using_windows() -> bool:
     return sys.platform.startswith("win")
 
 
+# get the command that executes the selected python with given arguments
+def _python_command(*cmd: str) -> list[str]:
+    return (
+        ["py", f"-{_SELECTED_PYTHON_VERSION.get()}", *cmd]
+        if is_using_windows()
+        else [f"python{_SELECTED_PYTHON_VERSION.get()}", *cmd]
+    )
+
+
 # execute a python command
-def execute_python(*cmd: str, cwd: str | None = None) -> None:
-    check_call(
-        (
-            ["py", f"-{_SELECTED_PYTHON_VERSION}", *cmd]
-            if is_using_windows()
-            else [f"python{_SELECTED_PYTHON_VERSION}", *cmd]
-        ),
-        cwd=cwd,
+def execute_python(
+    *cmd: str, cwd: str | None = None, env: dict[str, str] | None = None
+) -> None:
+    check_call(_python_command(*cmd), cwd=cwd, env=env)
+
+
+# execute a python command and capture its output
+def capture_python(*cmd: str, cwd: str | None = None) -> CompletedProcess[str]:
+    return run(
+        _python_command(*cmd), cwd=cwd, capture_output=True, text=True, check=True
     )
 
 
+# execute a module of linpgtoolbox with the selected python, which may not have linpgtoolbox
+# installed, so the package is always loaded from where the running one is
+def execute_toolbox_module(module: str, *cmd: str, cwd: str | None = None) -> None:
+    _env: dict[str, str] = dict(os.environ)
+    _env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+        + ([_env["PYTHONPATH"]] if _env.get("PYTHONPATH") else [])
+    )
+    execute_python("-m", f"linpgtoolbox.{module}", *cmd, cwd=cwd, env=_env)
+
+
 # set the python version used for commands
 def set_python_version(v: str = _DEFAULT_PYTHON_VERSION) -> None:
-    global _SELECTED_PYTHON_VERSION
-    _SELECTED_PYTHON_VERSION = v
+    _SELECTED_PYTHON_VERSION.set(v)
 
 
 # get the version of current python selected
 def get_current_python_version() -> list[str]:
-    return _SELECTED_PYTHON_VERSION.split(".")
+    return _SELECTED_PYTHON_VERSION.get().split(".")
+
+
+# if the selected python is the one that runs current process
+def is_current_python() -> bool:
+    if _SELECTED_PYTHON_VERSION.get() != _DEFAULT_PYTHON_VERSION or is_using_windows():
+        return False
+    _executable: str | None = shutil.which(_python_command()[0])
+    return _executable is not None and os.path.dirname(
+        os.path.abspath(_executable)
+    ) == os.path.dirname(os.path.abspath(sys.executable))
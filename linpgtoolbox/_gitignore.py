@@ -0,0 +1,170 @@
+import os
+import re
+from typing import Final
+
+# NOTE: this module is imported by _compiler.py, which may run under a different python
+# version than linpgtoolbox itself, so it must only depend on the standard library
+
+
+# Matcher of the .gitignore files (including the nested ones) of a directory tree
+class GitIgnore:
+    # Name of the files that contain the patterns
+    FILE_NAME: Final[str] = ".gitignore"
+
+    def __init__(self, root: str, rules: list[str] | None = None) -> None:
+        self.__root: str = os.path.abspath(root)
+        # extra rules that take precedence over all .gitignore files
+        self.__extra_rules: list[tuple[str, bool]] = [
+            _rule
+            for _pattern in (rules or [])
+            if (_rule := self.__translate(_pattern, "")) is not None
+        ]
+        # rules of each directory, including the ones inherited from its parents
+        self.__rules: dict[str, list[tuple[str, bool]]] = {}
+        # compiled regex and whether each rule is a negation, for each directory
+        self.__regex: dict[str, tuple[re.Pattern[str] | None, list[bool]]] = {}
+        # whether each directory is ignored
+        self.__ignored_dirs: dict[str, bool] = {}
+
+    # Convert a pattern into a regex that matches paths relative to the root,
+    # return None if the line is not a pattern
+    @staticmethod
+    def __translate(pattern: str, base: str) -> tuple[str, bool] | None:
+        # trailing spaces are ignored unless they are escaped
+        pattern = re.sub(r"(?<!\\) +$", "", pattern.rstrip("\r\n"))
+        if len(pattern) <= 0 or pattern.startswith("#"):
+            return None
+        negated: bool = pattern.startswith("!")
+        if negated:
+            pattern = pattern[1:]
+        # a trailing slash only matches directories
+        dir_only: bool = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if len(pattern) <= 0:
+            return None
+        # a slash at the beginning or in the middle anchors the pattern to its directory
+        anchored: bool = "/" in pattern
+        pattern = pattern.removeprefix("/")
+        _regex: list[str] = [re.escape(base)]
+        if not anchored:
+            _regex.append("(?:.*/)?")
+        i: int = 0
+        while i < len(pattern):
+            c: str = pattern[i]
+            if c == "*":
+                if (
+                    pattern.startswith("**", i)
+                    and (i == 0 or pattern[i - 1] == "/")
+                    and (i + 2 == len(pattern) or pattern[i + 2] == "/")
+                ):
+                    # "**/" matches any number of directories, a trailing "/**" matches everything inside
+                    if i + 2 == len(pattern):
+                        _regex.append(".+" if i > 0 else ".*")
+                        i += 2
+                    else:
+                        _regex.append("(?:.*/)?")
+                        i += 3
+                else:
+                    _regex.append("[^/]*")
+                    i += 1
+            elif c == "?":
+                _regex.append("[^/]")
+                i += 1
+            elif c == "[":
+                j: int = i + 1
+                if j < len(pattern) and pattern[j] in "!^":
+                    j += 1
+                if j < len(pattern) and pattern[j] == "]":
+                    j += 1
+                while j < len(pattern) and pattern[j] != "]":
+                    j += 1
+                # an unclosed bracket is matched literally
+                if j >= len(pattern):
+                    _regex.append(re.escape(c))
+                    i += 1
+                    continue
+                _class: str = pattern[i + 1 : j].replace("\\", "\\\\")
+                if _class[0] in "!^":
+                    _class = "^" + _class[1:]
+                _regex.append(f"[{_class}]")
+                i = j + 1
+            elif c == "\\" and i + 1 < len(pattern):
+                _regex.append(re.escape(pattern[i + 1]))
+                i += 2
+            else:
+                _regex.append(re.escape(c))
+                i += 1
+        # directories are matched with a trailing slash
+        _regex.append("/" if dir_only else "/?")
+        return "".join(_regex), negated
+
+    # Get the rules that apply to the entries of given directory (relative to the root)
+    def __dir_rules(self, directory: str) -> list[tuple[str, bool]]:
+        if directory not in self.__rules:
+            _rules: list[tuple[str, bool]] = (
+                list(self.__dir_rules(directory.rpartition("/")[0]))
+                if len(directory) > 0
+                else []
+            )
+            _path: str = os.path.join(self.__root, directory, self.FILE_NAME)
+            if os.path.isfile(_path):
+                _base: str = directory + "/" if len(directory) > 0 else ""
+                with open(_path, "r", encoding="utf-8", errors="replace") as f:
+                    for _line in f:
+                        if (_rule := self.__translate(_line, _base)) is not None:
+                            _rules.append(_rule)
+            self.__rules[directory] = _rules
+        return self.__rules[directory]
+
+    # Get the compiled regex of all rules that apply to the entries of given directory,
+    # the last rule comes first so that the first alternative that matches is the one that counts
+    def __dir_regex(self, directory: str) -> tuple[re.Pattern[str] | None, list[bool]]:
+        if directory not in self.__regex:
+            _rules: list[tuple[str, bool]] = [
+                *self.__dir_rules(directory),
+                *self.__extra_rules,
+            ][::-1]
+            self.__regex[directory] = (
+                (
+                    re.compile(
+                        "|".join(
+                            f"(?P<r{i}>{_regex})"
+                            for i, (_regex, _) in enumerate(_rules)
+                        )
+                    )
+                    if len(_rules) > 0
+                    else None
+                ),
+                [_negated for _, _negated in _rules],
+            )
+        return self.__regex[directory]
+
+    # Whether given path matches the rules, without checking its parent directories
+    def __match(self, path: str, is_dir: bool) -> bool:
+        _regex, _negated = self.__dir_regex(path.rpartition("/")[0])
+        if _regex is None:
+            return False
+        _result: re.Match[str] | None = _regex.fullmatch(path + "/" if is_dir else path)
+        return (
+            _result is not None
+            and _result.lastgroup is not None
+            and not _negated[int(_result.lastgroup[1:])]
+        )
+
+    # Whether given path (relative to the root) is ignored, a path is also ignored
+    # if any of its parent directories is ignored
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        _parts: list[str] = [
+            _part
+            for _part in path.replace(os.sep, "/").split("/")
+            if _part not in ("", ".")
+        ]
+        if len(_parts) <= 0 or _parts[0] == "..":
+            return False
+        for i in range(1, len(_parts)):
+            _directory: str = "/".join(_parts[:i])
+            if _directory not in self.__ignored_dirs:
+                self.__ignored_dirs[_directory] = self.__match(_directory, True)
+            if self.__ignored_dirs[_directory]:
+                return True
+        return self.__match("/".join(_parts), is_dir)
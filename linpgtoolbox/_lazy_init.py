@@ -0,0 +1,225 @@
+import ast
+import os
+from subprocess import CalledProcessError
+
+from ._execute import capture_python
+
+# Code that loads the submodules of a package on first access (PEP 562)
+_LAZY_LOADER: str = """
+# Lazy loading of submodules (PEP 562), generated by linpg-toolbox
+_LAZY_SUBMODULES: dict[str, str] = {index}
+
+
+def __getattr__(name: str) -> object:
+    if name in _LAZY_SUBMODULES:
+        # same as "from .submodule import name"
+        value = getattr(
+            __import__(_LAZY_SUBMODULES[name], globals(), None, [name], 1), name
+        )
+        globals()[name] = value
+        return value
+    # the submodules are attributes of the package once imported, as with the star imports
+    if name in _LAZY_SUBMODULES.values():
+        # same as "from . import name"
+        return __import__(name, globals(), None, [], 1)
+    raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+
+
+def __dir__() -> list[str]:
+    return sorted(
+        set(globals()) | set(_LAZY_SUBMODULES) | set(_LAZY_SUBMODULES.values())
+    )
+"""
+
+
+# Generate __init__ files that only import submodules when their names are accessed
+class LazyInit:
+
+    # Get the sibling module that given statement star imports, None if it is not one
+    @staticmethod
+    def __star_import(node: ast.stmt) -> str | None:
+        if (
+            isinstance(node, ast.ImportFrom)
+            and node.level == 1
+            and node.module is not None
+            and "." not in node.module
+            and len(node.names) == 1
+            and node.names[0].name == "*"
+        ):
+            return node.module
+        return None
+
+    # Get the file that defines given sibling module, None if it cannot be analyzed
+    @staticmethod
+    def __source(_dir_path: str, module: str) -> str | None:
+        for _path in (
+            os.path.join(_dir_path, module, "__init__.py"),
+            os.path.join(_dir_path, f"{module}.py"),
+        ):
+            if os.path.isfile(_path):
+                return _path
+        return None
+
+    # Get the names that a statement binds at module level
+    @staticmethod
+    def __bindings(node: ast.stmt) -> list[str]:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return [node.name]
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return [
+                _alias.asname or _alias.name.split(".")[0]
+                for _alias in node.names
+                if _alias.name != "*"
+            ]
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            return [
+                _name.id
+                for _target in (
+                    node.targets if isinstance(node, ast.Assign) else [node.target]
+                )
+                for _name in ast.walk(_target)
+                if isinstance(_name, ast.Name)
+            ]
+        return []
+
+    # Get the literal "__all__" of a module, None if it does not have one
+    @staticmethod
+    def __all(tree: ast.Module) -> list[str] | None:
+        for node in tree.body:
+            _targets: list[ast.expr] = (
+                node.targets
+                if isinstance(node, ast.Assign)
+                else [node.target] if isinstance(node, ast.AnnAssign) else []
+            )
+            if (
+                isinstance(node, (ast.Assign, ast.AnnAssign))
+                and len(_targets) == 1
+                and isinstance(_targets[0], ast.Name)
+                and _targets[0].id == "__all__"
+                and node.value is not None
+            ):
+                try:
+                    return [str(_name) for _name in ast.literal_eval(node.value)]
+                except ValueError:
+                    return None
+        return None
+
+    # Get the names that "from module import *" imports from given file
+    @classmethod
+    def __exports(cls, path: str) -> list[str]:
+        with open(path, "r", encoding="utf-8") as f:
+            tree: ast.Module = ast.parse(f.read(), path)
+        if (_all := cls.__all(tree)) is not None:
+            return _all
+        _names: dict[str, None] = {}
+        for node in tree.body:
+            if (_module := cls.__star_import(node)) is not None:
+                if (
+                    _source := cls.__source(os.path.dirname(path), _module)
+                ) is not None:
+                    _names.update(dict.fromkeys(cls.__exports(_source)))
+            else:
+                _names.update(dict.fromkeys(cls.__bindings(node)))
+        return [_name for _name in _names if not _name.startswith("_")]
+
+    # Replace the star imports of given package and all of its sub packages with lazy loading
+    @classmethod
+    def generate(cls, _dir_path: str) -> None:
+        init_file_path: str = os.path.join(_dir_path, "__init__.py")
+        if not os.path.isdir(_dir_path) or not os.path.exists(init_file_path):
+            return
+        for _name in sorted(os.listdir(_dir_path)):
+            cls.generate(os.path.join(_dir_path, _name))
+        with open(init_file_path, "r", encoding="utf-8") as f:
+            original: str = f.read()
+        tree: ast.Module = ast.parse(original, init_file_path)
+        # Names that the rest of __init__ (including the functions it defines) looks up,
+        # a global lookup never reaches __getattr__, so the star imports of them stay eager
+        _needed: set[str] = {
+            _node.id
+            for node in tree.body
+            if cls.__star_import(node) is None
+            for _node in ast.walk(node)
+            if isinstance(_node, ast.Name) and isinstance(_node.ctx, ast.Load)
+        }
+        # Name -> submodule index, the last star import of a name wins
+        _index: dict[str, str] = {}
+        _eager: list[ast.stmt] = []
+        # Names that the star imports which stay eager bind
+        _eager_names: dict[str, None] = {}
+        for node in tree.body:
+            if (_module := cls.__star_import(node)) is not None and (
+                _source := cls.__source(_dir_path, _module)
+            ) is not None:
+                _exports: list[str] = cls.__exports(_source)
+                for _name in _exports:
+                    _index.pop(_name, None)
+                if _needed.isdisjoint(_exports):
+                    _index.update(dict.fromkeys(_exports, _module))
+                    continue
+                _eager_names.update(dict.fromkeys(_exports))
+            _eager.append(node)
+        if len(_index) <= 0:
+            return
+        # Static typing keeps using the original star imports
+        _stub_path: str = os.path.join(_dir_path, "__init__.pyi")
+        if not os.path.exists(_stub_path):
+            with open(_stub_path, "w", encoding="utf-8") as f:
+                f.write(original)
+        # "from package import *" needs to know the lazy names
+        if cls.__all(tree) is None:
+            _public: list[str] = [
+                _name
+                for node in _eager
+                for _name in cls.__bindings(node)
+                if not _name.startswith("_")
+            ] + list(_eager_names)
+            _eager.append(
+                ast.parse(f"__all__ = {sorted(set(_public) | set(_index))!r}").body[0]
+            )
+        tree.body = _eager
+        with open(init_file_path, "w", encoding="utf-8") as f:
+            f.write(ast.unparse(tree) + "\n" + _LAZY_LOADER.format(index=repr(_index)))
+
+    # Get the cumulative import time in ms of given package with the selected python (best of
+    # a few runs), optionally accessing all names of lazy packages, None if it cannot be imported
+    @classmethod
+    def import_time(
+        cls, cwd: str, package: str, load_all: bool = False, runs: int = 3
+    ) -> float | None:
+        _times: list[float] = []
+        for _ in range(runs):
+            if (_time := cls.__import_time(cwd, package, load_all)) is None:
+                return None
+            _times.append(_time)
+        return min(_times)
+
+    # Run python once to get the cumulative import time in ms of given package
+    @staticmethod
+    def __import_time(cwd: str, package: str, load_all: bool) -> float | None:
+        _code: str = f"import {package}"
+        if load_all:
+            _code += (
+                f"; [getattr({package}, _n)"
+                f" for _n in getattr({package}, '_LAZY_SUBMODULES', ())]"
+            )
+        try:
+            _output: str = capture_python(
+                "-X", "importtime", "-c", _code, cwd=cwd
+            ).stderr
+        except CalledProcessError:
+            return None
+        _total: int = 0
+        for _line in _output.splitlines():
+            _columns: list[str] = _line.split("|")
+            if not _line.startswith("import time:") or len(_columns) != 3:
+                continue
+            _name: str = _columns[2][1:]
+            # only count the imports that are not nested in other imports
+            if (
+                not _name.startswith(" ")
+                and (_name == package or _name.startswith(f"{package}."))
+                and _columns[1].strip().isdigit()
+            ):
+                _total += int(_columns[1])
+        return _total / 1000
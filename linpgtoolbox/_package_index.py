@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from tempfile import mkstemp
+from typing import Any, Final
+
+from ._compile_cache import CompileCache
+from ._version import Version
+
+
+# Get the seconds before the cached versions expire, set by LINPGTOOLBOX_INDEX_TTL
+def _ttl(default: int) -> int:
+    _value: str | None = os.environ.get("LINPGTOOLBOX_INDEX_TTL")
+    if _value is None:
+        return default
+    try:
+        return int(_value)
+    except ValueError:
+        print(f'Warning: invalid LINPGTOOLBOX_INDEX_TTL "{_value}", {default} is used')
+        return default
+
+
+# Look up the versions of packages with the json api of PyPI, the responses are cached on
+# disk and only requested again (conditionally, with ETag/Last-Modified) once they expire
+class PackageIndex:
+    # Url of the json api of the index
+    URL: str = "https://pypi.org/pypi"
+    # Seconds before the cached versions of a package are requested again
+    TTL: int = _ttl(24 * 60 * 60)
+    # Seconds to wait for the index to respond
+    TIMEOUT: int = 10
+    # Folder of the cached responses
+    __CACHE_DIR: Final[str] = os.path.join(CompileCache.default_dir(), "pypi")
+    # Lookups that run in the background, and their results
+    __threads: dict[str, threading.Thread] = {}
+    __results: dict[str, str | None] = {}
+
+    # Get the path of the cache file of a package
+    @classmethod
+    def __cache_path(cls, name: str) -> str:
+        return os.path.join(cls.__CACHE_DIR, f"{name.lower()}.json")
+
+    # Load the cached response of a package, it is only valid for the current index url
+    @classmethod
+    def __load(cls, name: str) -> dict[str, Any]:
+        try:
+            with open(cls.__cache_path(name), "r", encoding="utf-8") as f:
+                _cache: dict[str, Any] = dict(json.load(f))
+        except (OSError, ValueError):
+            return {}
+        return _cache if _cache.get("url") == cls.URL else {}
+
+    # Save the cached response of a package
+    @classmethod
+    def __save(cls, name: str, cache: dict[str, Any]) -> None:
+        os.makedirs(cls.__CACHE_DIR, exist_ok=True)
+        _fd, _temp = mkstemp(dir=cls.__CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(_fd, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=4)
+            os.replace(_temp, cls.__cache_path(name))
+        except BaseException:
+            os.remove(_temp)
+            raise
+
+    # Whether the cached versions of a package are younger than the ttl
+    @classmethod
+    def __is_fresh(cls, cache: dict[str, Any], ttl: int | None = None) -> bool:
+        return len(cache) > 0 and time.time() - float(cache.get("checked", 0)) < (
+            cls.TTL if ttl is None else ttl
+        )
+
+    # Whether the versions of a package have to be requested from the index again
+    @classmethod
+    def is_expired(cls, name: str, ttl: int | None = None) -> bool:
+        return not cls.__is_fresh(cls.__load(name), ttl)
+
+    # Get the released versions of a package (the ones of which all files are yanked
+    # are left out), requested from the index only if the cache is older than the ttl
+    @classmethod
+    def versions(cls, name: str, ttl: int | None = None) -> list[str]:
+        _cache: dict[str, Any] = cls.__load(name)
+        if cls.__is_fresh(_cache, ttl):
+            return list(_cache["versions"])
+        _request: urllib.request.Request = urllib.request.Request(
+            f"{cls.URL}/{name}/json", headers={"Accept": "application/json"}
+        )
+        # only download the document again if it has changed
+        if _cache.get("etag"):
+            _request.add_header("If-None-Match", _cache["etag"])
+        if _cache.get("last_modified"):
+            _request.add_header("If-Modified-Since", _cache["last_modified"])
+        try:
+            with urllib.request.urlopen(_request, timeout=cls.TIMEOUT) as _response:
+                _data: dict[str, Any] = json.loads(_response.read())
+                _cache = {
+                    "url": cls.URL,
+                    "etag": _response.headers.get("ETag"),
+                    "last_modified": _response.headers.get("Last-Modified"),
+                    "versions": [
+                        _version
+                        for _version, _files in _data.get("releases", {}).items()
+                        if any(not _file.get("yanked", False) for _file in _files)
+                    ]
+                    or [_data["info"]["version"]],
+                }
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or len(_cache) <= 0:
+                raise
+        _cache["checked"] = time.time()
+        cls.__save(name, _cache)
+        return list(_cache["versions"])
+
+    # Get the files (name -> sha256) of a release of a package that the index already
+    # has, which is always requested, as files may have been uploaded in the meantime
+    @classmethod
+    def release_files(
+        cls, name: str, version: str, url: str | None = None
+    ) -> dict[str, str]:
+        _request: urllib.request.Request = urllib.request.Request(
+            f"{url or cls.URL}/{name}/{version}/json",
+            headers={"Accept": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(_request, timeout=cls.TIMEOUT) as _response:
+                _data: dict[str, Any] = json.loads(_response.read())
+        except urllib.error.HTTPError as e:
+            # neither the package nor the release exists yet
+            if e.code == 404:
+                return {}
+            raise
+        return {
+            _file["filename"]: _file.get("digests", {}).get("sha256", "")
+            for _file in _data.get("urls", [])
+        }
+
+    # Get the latest version of a package according to PEP 440, pre-releases are only
+    # taken into account if asked for
+    @classmethod
+    def latest_version(
+        cls, name: str, prerelease: bool = False, ttl: int | None = None
+    ) -> str | None:
+        _latest: Version | None = None
+        for _text in cls.versions(name, ttl):
+            try:
+                _version: Version = Version(_text)
+            except ValueError:
+                continue
+            if (prerelease or not _version.is_prerelease) and (
+                _latest is None or _version > _latest
+            ):
+                _latest = _version
+        return str(_latest) if _latest is not None else None
+
+    # Look up the latest version of a package in a background thread, the cached one is
+    # used right away if it has not expired
+    @classmethod
+    def fetch_in_background(cls, name: str, prerelease: bool = False) -> None:
+        if name in cls.__threads or name in cls.__results:
+            return
+        if not cls.is_expired(name):
+            cls.__results[name] = cls.latest_version(name, prerelease)
+            return
+
+        def _fetch() -> None:
+            try:
+                cls.__results[name] = cls.latest_version(name, prerelease)
+            except Exception:
+                cls.__results[name] = None
+
+        # a daemon thread never keeps the program from exiting
+        cls.__threads[name] = threading.Thread(
+            target=_fetch, name=f"linpgtoolbox_index_{name}", daemon=True
+        )
+        cls.__threads[name].start()
+
+    # Get the result of the background lookup of a package, None if it is not done (or fails)
+    @classmethod
+    def fetched(cls, name: str) -> str | None:
+        return cls.__results.get(name)
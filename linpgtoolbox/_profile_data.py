@@ -0,0 +1,63 @@
+import os
+import pstats
+
+# NOTE: this module is imported by _compiler.py, which may run under a different python
+# version than linpgtoolbox itself, so it must only depend on the standard library
+
+
+# Time spent in each module according to a cProfile/pstats file
+class ProfileData:
+    def __init__(self, path: str) -> None:
+        # seconds spent in the functions (by first line) of each file, excluding the functions
+        # they call, so that the times of all functions add up to the total time of the workload
+        self.__times: dict[str, dict[int, float]] = {}
+        # the typing stubs of pstats do not declare the raw stats
+        _stats: dict[tuple[str, int, str], tuple[int, int, float, float, object]] = (
+            getattr(pstats.Stats(path), "stats")
+        )
+        for (_file, _line, _), (_, _, _self_time, _, _) in _stats.items():
+            # built-in functions have no file, e.g. "~"
+            if _file.endswith((".py", ".pyx")):
+                _functions: dict[int, float] = self.__times.setdefault(
+                    _file.replace(os.sep, "/"), {}
+                )
+                _functions[_line] = _functions.get(_line, 0.0) + _self_time
+
+    # Get the seconds spent in the functions (by first line) of each of the given modules
+    # (relative paths with "/"), the files in profile are matched by the longest module path
+    # they end with
+    def function_times(self, modules: list[str]) -> dict[str, dict[int, float]]:
+        _modules: set[str] = set(modules)
+        _times: dict[str, dict[int, float]] = {_module: {} for _module in modules}
+        for _file, _functions in self.__times.items():
+            _parts: list[str] = _file.split("/")
+            for i in range(len(_parts)):
+                if (_module := "/".join(_parts[i:])) in _modules:
+                    for _line, _seconds in _functions.items():
+                        _times[_module][_line] = (
+                            _times[_module].get(_line, 0.0) + _seconds
+                        )
+                    break
+        return _times
+
+    # Get the seconds spent in each of the given modules (relative paths with "/")
+    def times(self, modules: list[str]) -> dict[str, float]:
+        return {
+            _module: sum(_functions.values())
+            for _module, _functions in self.function_times(modules).items()
+        }
+
+    # Get the fewest modules that together hold given share of the time spent in all modules
+    @staticmethod
+    def hottest(times: dict[str, float], share: float) -> list[str]:
+        _total: float = sum(times.values())
+        _selected: list[str] = []
+        _sum: float = 0.0
+        for _module, _seconds in sorted(
+            times.items(), key=lambda _item: _item[1], reverse=True
+        ):
+            if _seconds <= 0 or _sum >= _total * share:
+                break
+            _selected.append(_module)
+            _sum += _seconds
+        return _selected
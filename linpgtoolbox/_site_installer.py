@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Final
+
+from ._dist_info import (
+    dist_info_files,
+    dist_info_name,
+    load_project,
+    normalize_name,
+    read_record,
+    record_hash,
+    write_record,
+)
+from ._execute import capture_python, is_using_windows
+from .pkginstaller import PackageInstaller
+
+# Script that prints the paths the selected python installs packages into as json
+_PATHS_SCRIPT: Final[str] = """
+import json, sys, sysconfig
+print(json.dumps([sysconfig.get_path("platlib"), sysconfig.get_path("scripts"), sys.executable]))
+"""
+
+# Script that is written for each console and gui script of the project
+_SCRIPT: Final[str] = """#!{python}
+import sys
+from {module} import {name}
+if __name__ == "__main__":
+    sys.exit({call}())
+"""
+
+
+# Install a built project straight into the site-packages of the selected python,
+# the same way pip installs a wheel (PEP 376, PEP 627), but only the files that have
+# changed since the last install are replaced
+class SiteInstaller:
+    # Name of the tool recorded in INSTALLER
+    __INSTALLER: Final[str] = "linpgtoolbox"
+
+    # Get the hash and size of a file in the format of RECORD
+    @staticmethod
+    def __hash(path: str) -> str:
+        with open(path, "rb") as f:
+            _digest: bytes = hashlib.file_digest(f, "sha256").digest()
+        return f"{record_hash(_digest, True)},{os.path.getsize(path)}"
+
+    # Get the .dist-info folders of given project in given site-packages folder
+    @staticmethod
+    def __dist_infos(site_dir: str, project_name: str) -> list[str]:
+        if not os.path.isdir(site_dir):
+            return []
+        return [
+            os.path.join(site_dir, _dir)
+            for _dir in os.listdir(site_dir)
+            if _dir.endswith(".dist-info")
+            and normalize_name(_dir[:-10].partition("-")[0])
+            == normalize_name(project_name)
+        ]
+
+    # Write a file only if its content differs, return whether it has been written
+    @staticmethod
+    def __write(path: str, content: bytes, mode: int | None = None) -> bool:
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                if f.read() == content:
+                    return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _temp: str = f"{path}.{os.getpid()}.tmp"
+        with open(_temp, "wb") as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(_temp, mode)
+        os.replace(_temp, path)
+        return True
+
+    # Remove the cached bytecode of a python module, so that it is never used for a new source
+    @staticmethod
+    def __remove_bytecode(path: str) -> None:
+        _cache_dir: str = os.path.join(os.path.dirname(path), "__pycache__")
+        if path.endswith(".py") and os.path.isdir(_cache_dir):
+            _prefix: str = os.path.basename(path)[:-3] + "."
+            for _file in os.listdir(_cache_dir):
+                if _file.startswith(_prefix) and _file.endswith(".pyc"):
+                    os.remove(os.path.join(_cache_dir, _file))
+
+    # Install the built files in build folder (e.g. src) as the project in source folder,
+    # return False if the project has to be installed by pip instead
+    @classmethod
+    def install(cls, source_folder: str, build_folder: str) -> bool:
+        project: dict[str, Any] = load_project(source_folder)
+        # the metadata has to be known (of the dynamic fields, only the version and the
+        # readme can be resolved), and scripts cannot be created on windows
+        if len(project.get("dynamic", [])) > 0 or (
+            is_using_windows()
+            and len(project.get("scripts", {}) | project.get("gui-scripts", {})) > 0
+        ):
+            return False
+        site_dir, scripts_dir, python = json.loads(
+            capture_python("-c", _PATHS_SCRIPT).stdout.strip()
+        )
+        os.makedirs(site_dir, exist_ok=True)
+        if not os.access(site_dir, os.W_OK):
+            return False
+        # make sure the dependencies are installed
+        if len(project.get("dependencies", [])) > 0:
+            PackageInstaller.install(*project["dependencies"], upgrade=False)
+        # the files installed before (relative to site-packages) and their hashes
+        _old_dist_infos: list[str] = cls.__dist_infos(site_dir, project["name"])
+        _old_records: dict[str, str] = {}
+        for _old_dist_info in _old_dist_infos:
+            if not os.path.isfile(os.path.join(_old_dist_info, "RECORD")):
+                # not installed by a wheel installer, so leave it to pip
+                PackageInstaller.uninstall(project["name"])
+                return cls.install(source_folder, build_folder)
+            _old_records.update(read_record(os.path.join(_old_dist_info, "RECORD")))
+        _records: dict[str, str] = {}
+        _changed: int = 0
+        # copy the files that have changed
+        for _root, _dirs, _files in os.walk(build_folder):
+            _dirs[:] = [
+                _dir
+                for _dir in _dirs
+                if _dir != "__pycache__"
+                and not _dir.endswith((".dist-info", ".egg-info"))
+            ]
+            for _file in _files:
+                _source: str = os.path.join(_root, _file)
+                _relative: str = os.path.relpath(_source, build_folder).replace(
+                    os.sep, "/"
+                )
+                _target: str = os.path.join(site_dir, _relative)
+                _records[_relative] = cls.__hash(_source)
+                if os.path.isfile(_target) and _records[_relative] == (
+                    _old_records.get(_relative)
+                    # the file may have been recorded without its hash
+                    if "=" in _old_records.get(_relative, "")
+                    else cls.__hash(_target)
+                ):
+                    continue
+                os.makedirs(os.path.dirname(_target), exist_ok=True)
+                # replace the file instead of writing into it, as it may be loaded by a process
+                _temp: str = f"{_target}.{os.getpid()}.tmp"
+                shutil.copy2(_source, _temp)
+                os.replace(_temp, _target)
+                cls.__remove_bytecode(_target)
+                _changed += 1
+        # create the console and gui scripts
+        if not is_using_windows():
+            for _name, _value in (
+                project.get("scripts", {}) | project.get("gui-scripts", {})
+            ).items():
+                _module, _, _attr = str(_value).partition(":")
+                _script: str = os.path.join(scripts_dir, _name)
+                _content: bytes = _SCRIPT.format(
+                    python=python,
+                    module=_module.strip(),
+                    name=_attr.strip().split(".")[0],
+                    call=_attr.strip(),
+                ).encode()
+                if cls.__write(_script, _content, 0o755):
+                    _changed += 1
+                _records[os.path.relpath(_script, site_dir).replace(os.sep, "/")] = (
+                    f"{record_hash(_content)},{len(_content)}"
+                )
+        _dist_info: str = os.path.join(site_dir, dist_info_name(project))
+        _dist_info_name: str = os.path.basename(_dist_info) + "/"
+        # write the metadata
+        _metadata_files: dict[str, bytes] = dist_info_files(project, source_folder)
+        _metadata_files["INSTALLER"] = (cls.__INSTALLER + "\n").encode()
+        # the project is installed on purpose, not as a dependency
+        _metadata_files["REQUESTED"] = b""
+        _metadata_files["direct_url.json"] = json.dumps(
+            {
+                "url": "file://" + os.path.abspath(source_folder).replace(os.sep, "/"),
+                "dir_info": {},
+            }
+        ).encode()
+        for _file, _data in _metadata_files.items():
+            cls.__write(os.path.join(_dist_info, _file), _data)
+            _records[f"{_dist_info_name}{_file}"] = f"{record_hash(_data)},{len(_data)}"
+        _records[f"{_dist_info_name}RECORD"] = ","
+        # remove the files that are no longer part of the project, except the bytecode
+        # of the modules that still exist
+        _removed_dirs: set[str] = set()
+        for _relative in _old_records:
+            if _relative in _records:
+                continue
+            _parts: list[str] = _relative.split("/")
+            if (
+                len(_parts) >= 2
+                and _parts[-2] == "__pycache__"
+                and "/".join([*_parts[:-2], _parts[-1].split(".")[0] + ".py"])
+                in _records
+            ):
+                continue
+            _path: str = os.path.normpath(os.path.join(site_dir, _relative))
+            if os.path.isfile(_path):
+                os.remove(_path)
+                # the bytecode that python wrote for the module is not recorded
+                cls.__remove_bytecode(_path)
+                _removed_dirs.add(os.path.dirname(_path))
+                _removed_dirs.add(os.path.join(os.path.dirname(_path), "__pycache__"))
+                _changed += 1
+        # remove the dist-info of other versions and the folders that become empty
+        for _old_dist_info in _old_dist_infos:
+            if _old_dist_info != _dist_info:
+                shutil.rmtree(_old_dist_info)
+        for _dir in sorted(_removed_dirs, key=len, reverse=True):
+            while (
+                os.path.commonpath([_dir, site_dir]) == site_dir
+                and _dir != site_dir
+                and os.path.isdir(_dir)
+                and len(os.listdir(_dir)) <= 0
+            ):
+                os.rmdir(_dir)
+                _dir = os.path.dirname(_dir)
+        cls.__write(os.path.join(_dist_info, "RECORD"), write_record(_records))
+        print(
+            f"Installed {project['name']} {project['version']} into {site_dir}"
+            f" ({_changed} file(s) changed)"
+        )
+        return True
@@ -0,0 +1,368 @@
+import base64
+import configparser
+import getpass
+import hashlib
+import http.client
+import json
+import os
+import queue
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.message import Message
+from email.parser import BytesParser
+from tempfile import mkstemp
+from typing import Final, Iterator
+from urllib.parse import urlsplit, urlunsplit
+
+from ._package_index import PackageIndex
+
+
+# Upload distributions to a package index through the legacy upload API (the one that
+# PyPI and twine use), several files at a time over keep-alive connections
+class Uploader:
+    # Index that files are uploaded to by default
+    DEFAULT_REPOSITORY_URL: Final[str] = "https://upload.pypi.org/legacy/"
+    # Number of files that are uploaded at the same time
+    WORKERS: int = 4
+    # Number of times an upload is retried after a connection error or a server error
+    RETRIES: int = 5
+    # Seconds to wait before the first retry, doubled for each of the following ones
+    BACKOFF: float = 1.0
+    # File in the dist folder that records the files that have been uploaded, so that
+    # an interrupted upload resumes where it stopped
+    __STATE_FILE: Final[str] = ".linpgtoolbox_upload.json"
+    # Uploads that run at the same time may record their files in the same state file
+    __STATE_LOCK: Final[threading.Lock] = threading.Lock()
+    # Size of the chunks that files are hashed and sent in
+    __CHUNK_SIZE: Final[int] = 1024 * 1024
+    # Seconds to wait for the index to respond
+    __TIMEOUT: Final[int] = 300
+
+    # Get the url, username and password of the repository, looked up in the same places
+    # as twine: the environment variables, then ~/.pypirc, then asked for the password
+    @classmethod
+    def credentials(
+        cls, repository_url: str | None = None, repository: str = "pypi"
+    ) -> tuple[str, str, str]:
+        _pypirc: configparser.RawConfigParser = configparser.RawConfigParser()
+        _pypirc.read(os.path.join(os.path.expanduser("~"), ".pypirc"))
+        _section: dict[str, str] = (
+            dict(_pypirc.items(repository)) if _pypirc.has_section(repository) else {}
+        )
+        _url: str = (
+            repository_url
+            or os.environ.get("TWINE_REPOSITORY_URL")
+            or _section.get("repository")
+            or cls.DEFAULT_REPOSITORY_URL
+        )
+        _username: str = (
+            os.environ.get("TWINE_USERNAME") or _section.get("username") or "__token__"
+        )
+        _password: str = (
+            os.environ.get("TWINE_PASSWORD")
+            or _section.get("password")
+            or getpass.getpass(f"Password (or token) for {_url}: ")
+        )
+        return _url, _username, _password
+
+    # Get the url of the json api of the index that files are uploaded to, e.g.
+    # "https://upload.pypi.org/legacy/" -> "https://pypi.org/pypi", the indexes that
+    # implement the api of PyPI serve it at "/pypi" next to the upload path "/legacy/"
+    @staticmethod
+    def __api_url(repository_url: str) -> str:
+        _parts = urlsplit(repository_url)
+        _host: str = _parts.netloc
+        if _parts.hostname == "upload.pypi.org":
+            _host = "pypi.org"
+        _path: str = _parts.path.rstrip("/")
+        if _path.endswith("/legacy") or _path == "legacy":
+            _path = _path[:-6]
+        return urlunsplit((_parts.scheme, _host, _path.rstrip("/") + "/pypi", "", ""))
+
+    # Get the metadata of a wheel or source distribution
+    @staticmethod
+    def __metadata(path: str) -> Message:
+        if path.endswith(".whl"):
+            with zipfile.ZipFile(path) as _wheel:
+                for _name in _wheel.namelist():
+                    if _name.count("/") == 1 and _name.endswith(".dist-info/METADATA"):
+                        return BytesParser().parsebytes(_wheel.read(_name))
+        elif path.endswith((".tar.gz", ".tgz")):
+            with tarfile.open(path, "r:gz") as _sdist:
+                for _member in _sdist.getmembers():
+                    if _member.name.count("/") == 1 and _member.name.endswith(
+                        "/PKG-INFO"
+                    ):
+                        _file = _sdist.extractfile(_member)
+                        if _file is not None:
+                            return BytesParser().parsebytes(_file.read())
+        raise ValueError(f'Cannot find the metadata of "{path}"!')
+
+    # Get the form fields of the upload of given distribution, along with its sha256 digest
+    @classmethod
+    def __fields(cls, path: str) -> tuple[list[tuple[str, str]], str]:
+        _metadata: Message = cls.__metadata(path)
+        _file_name: str = os.path.basename(path)
+        _fields: list[tuple[str, str]] = [
+            (":action", "file_upload"),
+            ("protocol_version", "1"),
+            ("filetype", "bdist_wheel" if path.endswith(".whl") else "sdist"),
+            # the python tag of a wheel, e.g. "demo-1.0-cp311-cp311-win_amd64.whl"
+            (
+                "pyversion",
+                (_file_name[:-4].split("-")[-3] if path.endswith(".whl") else "source"),
+            ),
+        ]
+        # the headers of the metadata, e.g. "Requires-Dist" -> "requires_dist"
+        for _key, _value in _metadata.items():
+            _field: str = _key.lower().replace("-", "_")
+            _fields.append(
+                (
+                    {"classifier": "classifiers", "project_url": "project_urls"}.get(
+                        _field, _field
+                    ),
+                    str(_value),
+                )
+            )
+        _description: object = _metadata.get_payload()
+        if isinstance(_description, str) and len(_description.strip()) > 0:
+            _fields.append(("description", _description))
+        _md5 = hashlib.md5(usedforsecurity=False)
+        _sha256 = hashlib.sha256()
+        _blake2 = hashlib.blake2b(digest_size=32)
+        with open(path, "rb") as f:
+            while len(_chunk := f.read(cls.__CHUNK_SIZE)) > 0:
+                _md5.update(_chunk)
+                _sha256.update(_chunk)
+                _blake2.update(_chunk)
+        _fields.extend(
+            (
+                ("md5_digest", _md5.hexdigest()),
+                ("sha256_digest", _sha256.hexdigest()),
+                ("blake2_256_digest", _blake2.hexdigest()),
+            )
+        )
+        return _fields, _sha256.hexdigest()
+
+    # Get the parts of the multipart form body, the file is read in chunks when it is sent
+    @classmethod
+    def __body(
+        cls, path: str, fields: list[tuple[str, str]], boundary: str
+    ) -> tuple[bytes, bytes, int]:
+        _head: bytes = (
+            b"".join(
+                (
+                    f"--{boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{_name}"\r\n\r\n'
+                ).encode()
+                + _value.encode()
+                + b"\r\n"
+                for _name, _value in fields
+            )
+            + (
+                f"--{boundary}\r\n"
+                'Content-Disposition: form-data; name="content";'
+                f' filename="{os.path.basename(path)}"\r\n'
+                "Content-Type: application/octet-stream\r\n\r\n"
+            ).encode()
+        )
+        _tail: bytes = f"\r\n--{boundary}--\r\n".encode()
+        return _head, _tail, len(_head) + os.path.getsize(path) + len(_tail)
+
+    # Read the file between the head and tail of the body
+    @classmethod
+    def __stream(cls, path: str, head: bytes, tail: bytes) -> Iterator[bytes]:
+        yield head
+        with open(path, "rb") as f:
+            while len(_chunk := f.read(cls.__CHUNK_SIZE)) > 0:
+                yield _chunk
+        yield tail
+
+    # Load the files (name -> sha256) that have been uploaded to each repository
+    @classmethod
+    def __load_state(cls, dist_folder: str) -> dict[str, dict[str, str]]:
+        try:
+            with open(
+                os.path.join(dist_folder, cls.__STATE_FILE), "r", encoding="utf-8"
+            ) as f:
+                return dict(json.load(f))
+        except (OSError, ValueError):
+            return {}
+
+    # Record that a file has been uploaded to a repository, the state is loaded again
+    # first, so that the files recorded by another upload in the meantime are kept
+    @classmethod
+    def __save_state(
+        cls, dist_folder: str, repository_url: str, name: str, sha256: str
+    ) -> None:
+        with cls.__STATE_LOCK:
+            _state: dict[str, dict[str, str]] = cls.__load_state(dist_folder)
+            _state.setdefault(repository_url, {})[name] = sha256
+            _fd, _temp = mkstemp(
+                dir=dist_folder, prefix=cls.__STATE_FILE, suffix=".tmp"
+            )
+            try:
+                with os.fdopen(_fd, "w", encoding="utf-8") as f:
+                    json.dump(_state, f, indent=4, sort_keys=True)
+                os.replace(_temp, os.path.join(dist_folder, cls.__STATE_FILE))
+            except BaseException:
+                os.remove(_temp)
+                raise
+
+    # Upload the given files, the ones that have been uploaded before (by an interrupted
+    # upload) or that the index already has are skipped, return the ones that fail along
+    # with the reasons
+    @classmethod
+    def upload(
+        cls,
+        files: list[str],
+        repository_url: str | None = None,
+        workers: int | None = None,
+    ) -> dict[str, str]:
+        if len(files) <= 0:
+            return {}
+        _url, _username, _password = cls.credentials(repository_url)
+        _parts = urlsplit(_url)
+        if _parts.scheme not in ("http", "https") or not _parts.hostname:
+            raise ValueError(f'Invalid repository url "{_url}"!')
+        _path: str = (_parts.path or "/") + (f"?{_parts.query}" if _parts.query else "")
+        _authorization: str = "Basic " + base64.b64encode(
+            f"{_username}:{_password}".encode()
+        ).decode("ascii")
+        # connections that are idle, each upload takes one and puts it back when it is done
+        _pool: queue.SimpleQueue[http.client.HTTPConnection] = queue.SimpleQueue()
+
+        def _connect() -> http.client.HTTPConnection:
+            try:
+                return _pool.get_nowait()
+            except queue.Empty:
+                return (
+                    http.client.HTTPSConnection
+                    if _parts.scheme == "https"
+                    else http.client.HTTPConnection
+                )(_parts.hostname or "", _parts.port, timeout=cls.__TIMEOUT)
+
+        _dist_folders: set[str] = {
+            os.path.dirname(os.path.abspath(_file)) for _file in files
+        }
+        _states: dict[str, dict[str, dict[str, str]]] = {
+            _folder: cls.__load_state(_folder) for _folder in _dist_folders
+        }
+        # the files (name -> sha256) of each release that the index has already
+        _api_url: str = cls.__api_url(_url)
+        _releases: dict[tuple[str, str], dict[str, str]] = {}
+        _releases_lock: threading.Lock = threading.Lock()
+
+        # look up the files of a release once, an index without the json api (or one
+        # that cannot be reached) is left to reject the files it already has on upload
+        def _release_files(_project: str, _version: str) -> dict[str, str]:
+            with _releases_lock:
+                if (_project, _version) not in _releases:
+                    try:
+                        _releases[_project, _version] = PackageIndex.release_files(
+                            _project, _version, _api_url
+                        )
+                    except (OSError, ValueError, http.client.HTTPException):
+                        _releases[_project, _version] = {}
+                return _releases[_project, _version]
+
+        # upload a single file, return None if it is uploaded or skipped, otherwise the error
+        def _upload(_file: str) -> str | None:
+            _folder: str = os.path.dirname(os.path.abspath(_file))
+            _name: str = os.path.basename(_file)
+            _fields, _sha256 = cls.__fields(_file)
+            if _states[_folder].get(_url, {}).get(_name) == _sha256:
+                print(f"Skipped {_name} (uploaded before)")
+                return None
+            _metadata: dict[str, str] = dict(_fields)
+            _existing: str | None = _release_files(
+                _metadata["name"], _metadata["version"]
+            ).get(_name)
+            if _existing is not None:
+                # a file cannot be replaced once it is on the index
+                if len(_existing) > 0 and _existing != _sha256:
+                    return "a different file with the same name is on the index"
+                print(f"Skipped {_name} (already exists)")
+                cls.__save_state(_folder, _url, _name, _sha256)
+                return None
+            _boundary: str = uuid.uuid4().hex
+            _head, _tail, _length = cls.__body(_file, _fields, _boundary)
+            _error: str = "unknown error"
+            _delay: float = cls.BACKOFF
+            for _attempt in range(cls.RETRIES + 1):
+                # wait longer after each failure
+                if _attempt > 0:
+                    time.sleep(_delay)
+                    _delay *= 2
+                _connection: http.client.HTTPConnection = _connect()
+                _start: float = time.perf_counter()
+                try:
+                    _connection.request(
+                        "POST",
+                        _path,
+                        body=cls.__stream(_file, _head, _tail),
+                        headers={
+                            "Authorization": _authorization,
+                            "Content-Type": f"multipart/form-data; boundary={_boundary}",
+                            "Content-Length": str(_length),
+                            "User-Agent": "linpgtoolbox",
+                        },
+                    )
+                    _response: http.client.HTTPResponse = _connection.getresponse()
+                    _text: str = _response.read().decode("utf-8", "replace")
+                except (OSError, http.client.HTTPException) as e:
+                    _connection.close()
+                    _error = f"{type(e).__name__}: {e}"
+                    continue
+                # the connection can be reused unless the server closes it
+                if _response.will_close:
+                    _connection.close()
+                else:
+                    _pool.put(_connection)
+                _reason: str = f"{_response.status} {_response.reason}"
+                if 200 <= _response.status < 300:
+                    print(
+                        f"Uploaded {_name} ({_length / 1024 / 1024:.2f}MB"
+                        f" in {time.perf_counter() - _start:.2f}s)"
+                    )
+                elif _response.status == 409 or (
+                    _response.status == 400
+                    and "already exist" in f"{_response.reason} {_text}".lower()
+                ):
+                    print(f"Skipped {_name} (already exists)")
+                elif _response.status == 429 or _response.status >= 500:
+                    _error = _reason
+                    # the server may tell how long to wait
+                    _retry_after: str | None = _response.getheader("Retry-After")
+                    if _retry_after is not None and _retry_after.isdigit():
+                        _delay = max(_delay, float(_retry_after))
+                    continue
+                else:
+                    return f"{_reason}: {_text.strip()[:200]}"
+                cls.__save_state(_folder, _url, _name, _sha256)
+                return None
+            return f"{_error} (after {cls.RETRIES} retries)"
+
+        _errors: dict[str, str] = {}
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(min(workers or cls.WORKERS, len(files)), 1)
+            ) as _executor:
+                _futures = {_executor.submit(_upload, _file): _file for _file in files}
+                for _future in as_completed(_futures):
+                    try:
+                        _result: str | None = _future.result()
+                    except Exception as e:
+                        _result = f"{type(e).__name__}: {e}"
+                    if _result is not None:
+                        _errors[_futures[_future]] = _result
+        finally:
+            while not _pool.empty():
+                _pool.get_nowait().close()
+        for _file, _error in _errors.items():
+            print(f"Failed to upload {os.path.basename(_file)}: {_error}")
+        return _errors
@@ -0,0 +1,171 @@
+import re
+from typing import Final
+
+# Version scheme of PEP 440
+_VERSION_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"""
+    ^\s*v?
+    (?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_label>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre>\d+)?)?
+    (?:-(?P<post_implicit>\d+)|[-_.]?(?P<post_label>post|rev|r)[-_.]?(?P<post>\d+)?)?
+    (?:[-_.]?(?P<dev_label>dev)[-_.]?(?P<dev>\d+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+# Order of the pre-release labels
+_PRE_RELEASES: Final[dict[str, int]] = {
+    "a": 0,
+    "alpha": 0,
+    "b": 1,
+    "beta": 1,
+    "c": 2,
+    "rc": 2,
+    "pre": 2,
+    "preview": 2,
+}
+# Name, extras and the version specifiers of a requirement (environment markers are ignored)
+_REQUIREMENT_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*([^;]*)"
+)
+# Operators of version specifiers, the longer ones first
+_OPERATORS: Final[tuple[str, ...]] = ("===", "~=", "==", "!=", "<=", ">=", "<", ">")
+
+
+# A version that is compared according to PEP 440
+class Version:
+    def __init__(self, version: str) -> None:
+        _match: re.Match[str] | None = _VERSION_PATTERN.match(version)
+        if _match is None:
+            raise ValueError(f'Invalid version "{version}"!')
+        self.epoch: int = int(_match["epoch"] or 0)
+        self.release: tuple[int, ...] = tuple(
+            int(_part) for _part in _match["release"].split(".")
+        )
+        self.pre: tuple[int, int] | None = (
+            (_PRE_RELEASES[_match["pre_label"].lower()], int(_match["pre"] or 0))
+            if _match["pre_label"]
+            else None
+        )
+        self.post: int | None = (
+            int(_match["post_implicit"] or _match["post"] or 0)
+            if _match["post_implicit"] or _match["post_label"]
+            else None
+        )
+        self.dev: int | None = int(_match["dev"] or 0) if _match["dev_label"] else None
+        self.local: str | None = _match["local"]
+
+    # Whether this is a pre-release (including development releases)
+    @property
+    def is_prerelease(self) -> bool:
+        return self.pre is not None or self.dev is not None
+
+    # Key that sorts versions in the order of PEP 440
+    def __key(self) -> tuple[object, ...]:
+        _release: list[int] = list(self.release)
+        # trailing zeros do not matter, e.g. 1.0 == 1.0.0
+        while len(_release) > 1 and _release[-1] == 0:
+            _release.pop()
+        return (
+            self.epoch,
+            tuple(_release),
+            # a development release of a final release comes before its pre-releases
+            (
+                (1, *self.pre)
+                if self.pre is not None
+                else (0,) if self.post is None and self.dev is not None else (2,)
+            ),
+            (0,) if self.post is None else (1, self.post),
+            (2,) if self.dev is None else (1, self.dev),
+            # numeric segments of a local version come after alphanumeric ones
+            tuple(
+                (1, int(_part), "") if _part.isdigit() else (0, 0, _part.lower())
+                for _part in re.split(r"[-_.]", self.local or "")
+                if len(_part) > 0
+            ),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Version) and self.__key() == other.__key()
+
+    def __lt__(self, other: "Version") -> bool:
+        return self.__key() < other.__key()
+
+    def __le__(self, other: "Version") -> bool:
+        return self.__key() <= other.__key()
+
+    def __gt__(self, other: "Version") -> bool:
+        return self.__key() > other.__key()
+
+    def __ge__(self, other: "Version") -> bool:
+        return self.__key() >= other.__key()
+
+    def __hash__(self) -> int:
+        return hash(self.__key())
+
+    # Whether this version matches all the specifiers (e.g. ">=3.0,!=3.1.*")
+    def matches(self, specifiers: str) -> bool:
+        for _specifier in specifiers.split(","):
+            _specifier = _specifier.strip()
+            if len(_specifier) <= 0:
+                continue
+            _operator: str = next(
+                (_op for _op in _OPERATORS if _specifier.startswith(_op)), ""
+            )
+            _version: str = _specifier.removeprefix(_operator).strip()
+            if not self.__match(_operator, _version):
+                return False
+        return True
+
+    # Whether this version matches a single specifier
+    def __match(self, operator: str, version: str) -> bool:
+        if operator == "===":
+            return str(self) == version
+        # prefix matching, e.g. "==1.2.*"
+        if version.endswith(".*") and operator in ("==", "!="):
+            _prefix: tuple[int, ...] = Version(version[:-2]).release
+            _release: tuple[int, ...] = self.release + (0,) * len(_prefix)
+            return (_release[: len(_prefix)] == _prefix) == (operator == "==")
+        _other: Version = Version(version)
+        if operator == "~=":
+            # compatible release, e.g. "~=2.2" means ">=2.2,==2.*"
+            return self >= _other and self.__match(
+                "==", ".".join(str(_part) for _part in _other.release[:-1]) + ".*"
+            )
+        if operator in ("==", ""):
+            return self == _other
+        if operator == "!=":
+            return self != _other
+        if operator == "<=":
+            return self <= _other
+        if operator == ">=":
+            return self >= _other
+        if operator == "<":
+            return self < _other
+        if operator == ">":
+            return self > _other
+        raise ValueError(f'Unknown operator "{operator}"!')
+
+    def __str__(self) -> str:
+        _version: str = ".".join(str(_part) for _part in self.release)
+        if self.epoch > 0:
+            _version = f"{self.epoch}!{_version}"
+        if self.pre is not None:
+            _version += ("a", "b", "rc")[self.pre[0]] + str(self.pre[1])
+        if self.post is not None:
+            _version += f".post{self.post}"
+        if self.dev is not None:
+            _version += f".dev{self.dev}"
+        if self.local is not None:
+            _version += f"+{self.local}"
+        return _version
+
+
+# Split a requirement (e.g. "cython>=3.0") into its name and version specifiers
+def parse_requirement(requirement: str) -> tuple[str, str]:
+    _match: re.Match[str] | None = _REQUIREMENT_PATTERN.match(requirement)
+    if _match is None:
+        raise ValueError(f'Invalid requirement "{requirement}"!')
+    return _match[1], _match[2].strip().strip("()")
@@ -0,0 +1,399 @@
+import json
+import os
+import re
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Final
+
+from ._dist_info import (
+    dist_info_files,
+    dist_info_name,
+    load_project,
+    normalize_name,
+    record_hash,
+    write_record,
+)
+from ._execute import capture_python
+from ._version import Version
+
+# Script that prints what the wheel tags of the selected python are made of as json
+_TAGS_SCRIPT: Final[str] = """
+import json, sys, sysconfig
+print(json.dumps({
+    "implementation": sys.implementation.name,
+    "version": sys.version_info[:2],
+    "soabi": sysconfig.get_config_var("SOABI"),
+    "platform": sysconfig.get_platform(),
+    "is_32bit": sys.maxsize <= 2**32,
+}))
+"""
+
+# Interpreter and abi of an extension module, e.g. "a.cpython-313t-x86_64-linux-gnu.so"
+# or "a.cp311-win_amd64.pyd" (abi3 modules are matched on their own)
+_EXTENSION_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"\.(?:cpython-(\d)(\d+)(t?)(?:-[^.]+)?|cp(\d)(\d+)(t?)-[^.]+|(abi3))\.(?:so|pyd)$"
+)
+# Suffixes of the files that are extension modules
+_EXTENSION_SUFFIXES: Final[tuple[str, ...]] = (".so", ".pyd")
+
+
+# Write wheels (PEP 427) of a built project directly, the files are compressed in parallel
+# and every entry has the same timestamp, so that the same build always results in the
+# same wheel
+class WheelBuilder:
+    # Number of files that may be compressed ahead of the one being written per worker
+    __PENDING_PER_WORKER: Final[int] = 4
+    # Largest value that fits into the fields of a zip file without zip64
+    __ZIP64_LIMIT: Final[int] = 0xFFFFFFFF
+    # Version of the zip specification needed to extract, without and with zip64
+    __ZIP_VERSION: Final[int] = 20
+    __ZIP64_VERSION: Final[int] = 45
+    # Entry names are encoded in utf-8
+    __UTF8_FLAG: Final[int] = 0x800
+
+    # Get the date and time (ms-dos format) that all entries have, according to
+    # SOURCE_DATE_EPOCH if it is set, otherwise the earliest time a zip file supports
+    @staticmethod
+    def __timestamp() -> tuple[int, int]:
+        _epoch: str | None = os.environ.get("SOURCE_DATE_EPOCH")
+        _time: time.struct_time = time.gmtime(
+            max(int(_epoch) if _epoch else 0, 315532800)
+        )
+        return (
+            (_time.tm_year - 1980) << 9 | _time.tm_mon << 5 | _time.tm_mday,
+            _time.tm_hour << 11 | _time.tm_min << 5 | _time.tm_sec // 2,
+        )
+
+    # Get the platform tag of the selected python, e.g. "linux_x86_64", the modules only get
+    # a manylinux tag from auditwheel once it has checked the libraries they link against
+    @staticmethod
+    def __platform_tag(_info: dict[str, Any]) -> str:
+        _platform: str = re.sub(r"[-.\s]", "_", str(_info["platform"]))
+        # a 32-bit python may run on a 64-bit kernel
+        if _platform.startswith("linux_") and _info["is_32bit"]:
+            _arch: str = _platform.removeprefix("linux_")
+            return "linux_" + {"x86_64": "i686", "aarch64": "armv7l"}.get(_arch, _arch)
+        return _platform
+
+    # Get the python, abi and platform tags of the wheel of given files (relative paths),
+    # the wheel is pure python if it contains no extension module
+    @classmethod
+    def tags(
+        cls, files: list[str], platform_tag: str | None = None
+    ) -> tuple[str, str, str]:
+        _extensions: list[str] = [
+            _file for _file in files if _file.endswith(_EXTENSION_SUFFIXES)
+        ]
+        if len(_extensions) <= 0:
+            return "py3", "none", "any"
+        _info: dict[str, Any] = json.loads(
+            capture_python("-c", _TAGS_SCRIPT).stdout.strip()
+        )
+        _major, _minor = _info["version"]
+        _prefix: str = "cp" if _info["implementation"] == "cpython" else "pp"
+        # the abi of the selected python, e.g. "cpython-313t-x86_64-linux-gnu" -> "cp313t"
+        _soabi: re.Match[str] | None = re.match(
+            r"^cpython-(\d+t?)", str(_info["soabi"] or "")
+        )
+        _default: tuple[str, str] = (
+            f"{_prefix}{_major}{_minor}",
+            (
+                f"cp{_soabi[1]}"
+                if _soabi is not None
+                else re.sub(r"[-.]", "_", str(_info["soabi"] or "none"))
+            ),
+        )
+        _abis: set[tuple[str, str]] = set()
+        for _file in _extensions:
+            _match: re.Match[str] | None = _EXTENSION_PATTERN.search(_file)
+            if _match is None:
+                # e.g. modules built by cmake without the abi suffix
+                _abis.add(_default)
+            elif _match[7] is not None:
+                _abis.add((f"cp{_major}{_minor}", "abi3"))
+            else:
+                _groups: tuple[str, ...] = (
+                    _match.groups()[0:3]
+                    if _match[1] is not None
+                    else _match.groups()[3:6]
+                )
+                _abis.add((f"cp{''.join(_groups[0:2])}", f"cp{''.join(_groups)}"))
+        # modules of the stable abi also work with the specific abi of other modules
+        if len(_abis) > 1:
+            _abis.discard((f"cp{_major}{_minor}", "abi3"))
+        if len(_abis) > 1:
+            raise ValueError(
+                "Extension modules are built for different python versions: "
+                + ", ".join(sorted(f"{_python}-{_abi}" for _python, _abi in _abis))
+            )
+        _python, _abi = _abis.pop()
+        return _python, _abi, platform_tag or cls.__platform_tag(_info)
+
+    # Compress the data of an entry, return the compression method, the crc and the
+    # data that is stored (data that cannot be compressed is stored as it is)
+    @staticmethod
+    def __compress(data: bytes, level: int) -> tuple[int, int, bytes]:
+        _crc: int = zlib.crc32(data)
+        if level > 0:
+            _compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            _compressed: bytes = _compressor.compress(data) + _compressor.flush()
+            if len(_compressed) < len(data):
+                return 8, _crc, _compressed
+        return 0, _crc, data
+
+    # Read a file, then compress it
+    @classmethod
+    def __read_and_compress(
+        cls, path: str, level: int
+    ) -> tuple[bytes, tuple[int, int, bytes]]:
+        with open(path, "rb") as f:
+            _data: bytes = f.read()
+        return _data, cls.__compress(_data, level)
+
+    # Write an entry into the zip file, return its central directory record
+    @classmethod
+    def __write_entry(
+        cls,
+        f: BinaryIO,
+        name: str,
+        mode: int,
+        size: int,
+        compressed: tuple[int, int, bytes],
+        timestamp: tuple[int, int],
+    ) -> bytes:
+        _method, _crc, _data = compressed
+        _name: bytes = name.encode()
+        _offset: int = f.tell()
+        _zip64: bool = size >= cls.__ZIP64_LIMIT or len(_data) >= cls.__ZIP64_LIMIT
+        _version: int = cls.__ZIP64_VERSION if _zip64 else cls.__ZIP_VERSION
+        _local_extra: bytes = (
+            struct.pack("<HHQQ", 1, 16, size, len(_data)) if _zip64 else b""
+        )
+        f.write(
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                _version,
+                cls.__UTF8_FLAG,
+                _method,
+                timestamp[1],
+                timestamp[0],
+                _crc,
+                cls.__ZIP64_LIMIT if _zip64 else len(_data),
+                cls.__ZIP64_LIMIT if _zip64 else size,
+                len(_name),
+                len(_local_extra),
+            )
+        )
+        f.write(_name)
+        f.write(_local_extra)
+        f.write(_data)
+        # the fields that do not fit are moved into the zip64 extra field
+        _central_fields: list[int] = [
+            *((size, len(_data)) if _zip64 else ()),
+            *((_offset,) if _offset >= cls.__ZIP64_LIMIT else ()),
+        ]
+        _central_extra: bytes = (
+            struct.pack(
+                f"<HH{len(_central_fields)}Q",
+                1,
+                8 * len(_central_fields),
+                *_central_fields,
+            )
+            if len(_central_fields) > 0
+            else b""
+        )
+        if len(_central_extra) > 0:
+            _version = cls.__ZIP64_VERSION
+        return (
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                # made by unix, so that the file modes are kept
+                3 << 8 | _version,
+                _version,
+                cls.__UTF8_FLAG,
+                _method,
+                timestamp[1],
+                timestamp[0],
+                _crc,
+                cls.__ZIP64_LIMIT if _zip64 else len(_data),
+                cls.__ZIP64_LIMIT if _zip64 else size,
+                len(_name),
+                len(_central_extra),
+                0,
+                0,
+                0,
+                (0o100000 | mode) << 16,
+                min(_offset, cls.__ZIP64_LIMIT),
+            )
+            + _name
+            + _central_extra
+        )
+
+    # Write the central directory at the end of the zip file
+    @classmethod
+    def __write_central_directory(cls, f: BinaryIO, records: list[bytes]) -> None:
+        _offset: int = f.tell()
+        for _record in records:
+            f.write(_record)
+        _size: int = f.tell() - _offset
+        if (
+            len(records) >= 0xFFFF
+            or _offset >= cls.__ZIP64_LIMIT
+            or _size >= cls.__ZIP64_LIMIT
+        ):
+            _zip64_offset: int = f.tell()
+            f.write(
+                struct.pack(
+                    "<IQHHIIQQQQ",
+                    0x06064B50,
+                    44,
+                    3 << 8 | cls.__ZIP64_VERSION,
+                    cls.__ZIP64_VERSION,
+                    0,
+                    0,
+                    len(records),
+                    len(records),
+                    _size,
+                    _offset,
+                )
+            )
+            f.write(struct.pack("<IIQI", 0x07064B50, 0, _zip64_offset, 1))
+        f.write(
+            struct.pack(
+                "<IHHHHIIH",
+                0x06054B50,
+                0,
+                0,
+                min(len(records), 0xFFFF),
+                min(len(records), 0xFFFF),
+                min(_size, cls.__ZIP64_LIMIT),
+                min(_offset, cls.__ZIP64_LIMIT),
+                0,
+            )
+        )
+
+    # Pack the built files in build folder (e.g. src) into a wheel of the project in
+    # project folder, return the path of the wheel
+    @classmethod
+    def build(
+        cls,
+        project_folder: str,
+        build_folder: str,
+        dist_folder: str,
+        compression_level: int = 6,
+        workers: int | None = None,
+        platform_tag: str | None = None,
+    ) -> str:
+        project: dict[str, Any] = load_project(project_folder)
+        # the files of the project, sorted so that the wheel is always the same
+        _files: dict[str, str] = {}
+        for _root, _dirs, _names in os.walk(build_folder):
+            _dirs[:] = [
+                _dir
+                for _dir in _dirs
+                if _dir != "__pycache__"
+                and not _dir.endswith((".dist-info", ".egg-info"))
+            ]
+            for _name in _names:
+                if not _name.endswith(".pyc"):
+                    _path: str = os.path.join(_root, _name)
+                    _files[
+                        os.path.relpath(_path, build_folder).replace(os.sep, "/")
+                    ] = _path
+        _python, _abi, _platform = cls.tags(list(_files), platform_tag)
+        _dist_info: str = dist_info_name(project)
+        _metadata: dict[str, bytes] = dist_info_files(project, project_folder)
+        _metadata["WHEEL"] = (
+            "Wheel-Version: 1.0\n"
+            "Generator: linpgtoolbox\n"
+            f"Root-Is-Purelib: {'true' if _platform == 'any' else 'false'}\n"
+            f"Tag: {_python}-{_abi}-{_platform}\n"
+        ).encode()
+        _wheel_path: str = os.path.join(
+            dist_folder,
+            f"{normalize_name(project['name'])}-{Version(project['version'])}"
+            f"-{_python}-{_abi}-{_platform}.whl",
+        )
+        os.makedirs(dist_folder, exist_ok=True)
+        _timestamp: tuple[int, int] = cls.__timestamp()
+        _records: dict[str, str] = {}
+        _central_directory: list[bytes] = []
+        _temp: str = f"{_wheel_path}.{os.getpid()}.tmp"
+        _workers: int = max(workers or os.cpu_count() or 1, 1)
+        try:
+            with (
+                open(_temp, "wb") as f,
+                ThreadPoolExecutor(max_workers=_workers) as _executor,
+            ):
+                # the files are compressed ahead by the workers while they are written
+                # in order, the number of pending files is limited to bound the memory
+                _pending: deque[tuple[str, str, Future[Any]]] = deque()
+                _queue: list[tuple[str, str]] = sorted(_files.items())
+                _queue.reverse()
+                while len(_queue) > 0 or len(_pending) > 0:
+                    while (
+                        len(_queue) > 0
+                        and len(_pending) < _workers * cls.__PENDING_PER_WORKER
+                    ):
+                        _name, _path = _queue.pop()
+                        _pending.append(
+                            (
+                                _name,
+                                _path,
+                                _executor.submit(
+                                    cls.__read_and_compress, _path, compression_level
+                                ),
+                            )
+                        )
+                    _name, _path, _future = _pending.popleft()
+                    _data, _compressed = _future.result()
+                    _records[_name] = f"{record_hash(_data)},{len(_data)}"
+                    _central_directory.append(
+                        cls.__write_entry(
+                            f,
+                            _name,
+                            0o755 if os.stat(_path).st_mode & 0o111 else 0o644,
+                            len(_data),
+                            _compressed,
+                            _timestamp,
+                        )
+                    )
+                # the metadata comes last, with RECORD at the very end
+                for _name, _data in sorted(_metadata.items()):
+                    _records[f"{_dist_info}/{_name}"] = (
+                        f"{record_hash(_data)},{len(_data)}"
+                    )
+                    _central_directory.append(
+                        cls.__write_entry(
+                            f,
+                            f"{_dist_info}/{_name}",
+                            0o644,
+                            len(_data),
+                            cls.__compress(_data, compression_level),
+                            _timestamp,
+                        )
+                    )
+                _records[f"{_dist_info}/RECORD"] = ","
+                _record: bytes = write_record(_records)
+                _central_directory.append(
+                    cls.__write_entry(
+                        f,
+                        f"{_dist_info}/RECORD",
+                        0o644,
+                        len(_record),
+                        cls.__compress(_record, compression_level),
+                        _timestamp,
+                    )
+                )
+                cls.__write_central_directory(f, _central_directory)
+            os.replace(_temp, _wheel_path)
+        finally:
+            if os.path.exists(_temp):
+                os.remove(_temp)
+        print(f"Created {os.path.basename(_wheel_path)}")
+        return _wheel_path
@@ -0,0 +1,203 @@
+import ast
+import html
+import json
+import os
+import re
+from tempfile import mkdtemp
+from typing import Any, Final
+
+from ._profile_data import ProfileData
+from .builder import Builder
+
+
+# Rank the functions of a package by how much of their code still goes through the
+# python C-API once compiled, according to the html annotation generated by cython
+class AnnotationReport:
+    # A source line of the annotation, along with its score (the number of python C-API calls)
+    __LINE: Final[re.Pattern[str]] = re.compile(
+        r'<pre class="cython line score-(\d+)"[^>]*>.*?<span class="">(\d+)</span>: (.*?)</pre>',
+        re.DOTALL,
+    )
+    # Number of functions that are shown in the text report
+    __TOP: Final[int] = 30
+
+    # Get the score and source code of each line in given annotation file
+    @classmethod
+    def __parse(cls, path: str) -> dict[int, tuple[int, str]]:
+        with open(path, "r", encoding="utf-8") as f:
+            _content: str = f.read()
+        return {
+            int(_line): (int(_score), html.unescape(re.sub(r"<[^>]+>", "", _code)))
+            for _score, _line, _code in cls.__LINE.findall(_content)
+        }
+
+    # Get the functions of given source code, along with the lines that belong to each of them
+    # (nested functions are separated from the functions they are defined in)
+    @staticmethod
+    def __functions(source: str) -> dict[str, tuple[list[int], list[int]]]:
+        _owners: dict[int, str] = {}
+        # first lines that profile may refer each function by (the def or the first decorator)
+        _first_lines: dict[str, list[int]] = {}
+        _pending: list[tuple[ast.AST, str]] = [(ast.parse(source), "")]
+        while len(_pending) > 0:
+            _node, _prefix = _pending.pop(0)
+            for _child in ast.iter_child_nodes(_node):
+                if isinstance(_child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    _name: str = _prefix + _child.name
+                    _first_lines[_name] = [
+                        _child.lineno,
+                        *(_decorator.lineno for _decorator in _child.decorator_list),
+                    ]
+                    # the signature is only parsed when the function is called,
+                    # so only the body counts
+                    for _line in range(
+                        _child.body[0].lineno, (_child.end_lineno or _child.lineno) + 1
+                    ):
+                        _owners[_line] = _name
+                    _pending.append((_child, _name + ".<locals>."))
+                elif isinstance(_child, ast.ClassDef):
+                    _pending.append((_child, f"{_prefix}{_child.name}."))
+                else:
+                    _pending.append((_child, _prefix))
+        _functions: dict[str, tuple[list[int], list[int]]] = {
+            _name: ([], _lines) for _name, _lines in _first_lines.items()
+        }
+        for _line, _name in sorted(_owners.items()):
+            _functions[_name][0].append(_line)
+        return _functions
+
+    # Score each function of the compiled modules in given build folder, weighted by
+    # the time spent in each function if profile data is given
+    @classmethod
+    def analyze(
+        cls, build_folder: str, profile: ProfileData | None = None
+    ) -> list[dict[str, Any]]:
+        _annotations: dict[str, str] = {}
+        for _root, _, _files in os.walk(build_folder):
+            for _file in _files:
+                if _file.endswith(".html"):
+                    _path: str = os.path.join(_root, _file)
+                    _module: str = os.path.relpath(_path, build_folder)[:-5]
+                    _annotations[_module.replace(os.sep, "/")] = _path
+        _results: list[dict[str, Any]] = []
+        for _module, _path in sorted(_annotations.items()):
+            _lines: dict[int, tuple[int, str]] = cls.__parse(_path)
+            _source: str = "\n".join(
+                _lines.get(i, (0, ""))[1] for i in range(1, max(_lines, default=0) + 1)
+            )
+            try:
+                _functions: dict[str, tuple[list[int], list[int]]] = cls.__functions(
+                    _source
+                )
+            except SyntaxError:
+                print(f"Cannot analyze {_module}, skipped")
+                continue
+            # the source files no longer exist once they are compiled
+            _times: dict[int, float] = {}
+            if profile is not None:
+                for _functions_times in profile.function_times(
+                    [f"{_module}.py", f"{_module}.pyx"]
+                ).values():
+                    _times.update(_functions_times)
+            for _name, (_body, _first_lines) in _functions.items():
+                # blank lines and comments are never scored
+                _code_lines: list[int] = [
+                    _line
+                    for _line in _body
+                    if _line in _lines
+                    and len(_code := _lines[_line][1].strip()) > 0
+                    and not _code.startswith("#")
+                ]
+                _python_lines: list[int] = [
+                    _line for _line in _code_lines if _lines[_line][0] > 0
+                ]
+                _score: int = sum(_lines[_line][0] for _line in _python_lines)
+                _result: dict[str, Any] = {
+                    "module": _module.replace("/", "."),
+                    "function": _name,
+                    "line": _first_lines[0],
+                    "lines": len(_code_lines),
+                    "python_lines": len(_python_lines),
+                    "score": _score,
+                    # the lines that are worth looking at first
+                    "hottest_lines": sorted(
+                        _python_lines, key=lambda _line: _lines[_line][0], reverse=True
+                    )[:5],
+                }
+                if profile is not None:
+                    _result["time"] = sum(_times.get(i, 0.0) for i in _first_lines)
+                    _result["weighted_score"] = _score * _result["time"]
+                _results.append(_result)
+        _results.sort(
+            key=lambda _result: (
+                _result.get("weighted_score", _result["score"]),
+                _result["score"],
+            ),
+            reverse=True,
+        )
+        return _results
+
+    # Print the results as a table
+    @classmethod
+    def __print_table(cls, results: list[dict[str, Any]]) -> None:
+        _shown: list[dict[str, Any]] = [
+            _result for _result in results if _result["score"] > 0
+        ][: cls.__TOP]
+        if len(_shown) <= 0:
+            print("No function goes through the python C-API")
+            return
+        _weighted: bool = "weighted_score" in _shown[0]
+        _names: list[str] = [
+            f"{_result['module']}:{_result['function']}" for _result in _shown
+        ]
+        _width: int = max(len("function"), *(len(_name) for _name in _names))
+        print(
+            f"{'rank':>4}  {'function'.ljust(_width)}  {'python lines':>12}  {'score':>6}"
+            + (f"  {'time':>9}  {'weighted':>9}" if _weighted else "")
+            + "  hottest lines"
+        )
+        for i, (_name, _result) in enumerate(zip(_names, _shown), 1):
+            _python_lines: str = f"{_result['python_lines']}/{_result['lines']}"
+            print(
+                f"{i:>4}  {_name.ljust(_width)}  {_python_lines:>12}"
+                f"  {_result['score']:>6}"
+                + (
+                    f"  {_result['time']:>8.3f}s  {_result['weighted_score']:>9.3f}"
+                    if _weighted
+                    else ""
+                )
+                + f"  {', '.join(str(_line) for _line in _result['hottest_lines'])}"
+            )
+
+    # Compile the project with annotation, then report the functions that need type
+    # declarations the most, optionally weighted by a cProfile/pstats file
+    @classmethod
+    def run(
+        cls,
+        source_folder: str,
+        output: str | None = None,
+        profile: str | None = None,
+        **build_options: Any,
+    ) -> list[dict[str, Any]]:
+        source_folder = os.path.abspath(source_folder)
+        _build_folder: str = mkdtemp(prefix="linpgtoolbox_annotate_")
+        try:
+            # every module is compiled, the profile is only used for weighting
+            Builder.compile(
+                source_folder,
+                _build_folder,
+                show_success_message=False,
+                annotate=True,
+                **build_options,
+            )
+            results: list[dict[str, Any]] = cls.analyze(
+                _build_folder, ProfileData(profile) if profile is not None else None
+            )
+        finally:
+            Builder.remove(_build_folder)
+        cls.__print_table(results)
+        output = output or os.path.join(source_folder, "annotation_report.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nReport saved to {output}")
+        return results
@@ -0,0 +1,242 @@
+import json
+import os
+import tomllib
+from subprocess import CalledProcessError
+from tempfile import mkdtemp
+from typing import Any, Final
+
+from ._execute import capture_python, get_current_python_version
+from .builder import Builder
+
+# Script that imports the given modules, then runs the given benchmark callables
+# and prints how long each call takes as json
+_RUNNER: Final[str] = """
+import json, sys, timeit
+modules, callables, repeat, extra_path = json.loads(sys.argv[1])
+sys.path.append(extra_path)
+for module in modules:
+    __import__(module)
+results = {}
+for name in callables:
+    try:
+        module, attr = name.split(":")
+        function = __import__(module, fromlist=[attr])
+        for part in attr.split("."):
+            function = getattr(function, part)
+        timer = timeit.Timer(function)
+        number = timer.autorange()[0]
+        results[name] = min(timer.repeat(repeat, number)) / number
+    except Exception as e:
+        results[name] = f"{type(e).__name__}: {e}"
+print(json.dumps(results))
+"""
+
+
+# Compare the compiled build of a project with its source build
+class Benchmark:
+    # Number of runs that import times are measured by (the best one counts)
+    __IMPORT_RUNS: Final[int] = 5
+
+    # Get the names of all modules in given build folder
+    @staticmethod
+    def __modules(build_folder: str, project_name: str) -> list[str]:
+        _modules: set[str] = set()
+        for _root, _dirs, _files in os.walk(os.path.join(build_folder, project_name)):
+            _dirs[:] = [_dir for _dir in _dirs if _dir.isidentifier()]
+            _package: str = os.path.relpath(_root, build_folder).replace(os.sep, ".")
+            for _file in _files:
+                _name, _, _suffix = _file.partition(".")
+                if _name.isidentifier() and _suffix.rpartition(".")[2] in (
+                    "py",
+                    "so",
+                    "pyd",
+                ):
+                    _modules.add(
+                        _package if _name == "__init__" else f"{_package}.{_name}"
+                    )
+        # single file modules that are combined into a single file
+        for _file in os.listdir(build_folder):
+            if _file.partition(".")[0] == project_name and os.path.isfile(
+                os.path.join(build_folder, _file)
+            ):
+                _modules.add(project_name)
+        return sorted(_modules)
+
+    # Run the runner script with the selected python in given build folder
+    @staticmethod
+    def __run(
+        build_folder: str, arguments: list[Any], import_time: bool
+    ) -> tuple[dict[str, Any], str]:
+        _result = capture_python(
+            *(("-X", "importtime") if import_time else ()),
+            "-c",
+            _RUNNER,
+            json.dumps(arguments),
+            cwd=build_folder,
+        )
+        return json.loads(_result.stdout.strip().splitlines()[-1]), _result.stderr
+
+    # Measure the import time (ms, excluding the modules it imports) of each module
+    # and the time (seconds per call) of each benchmark callable in given build folder
+    @classmethod
+    def measure(
+        cls,
+        build_folder: str,
+        modules: list[str],
+        callables: list[str],
+        repeat: int,
+        source_folder: str,
+    ) -> tuple[dict[str, float], dict[str, float | str]]:
+        _import_times: dict[str, float] = {}
+        for _ in range(cls.__IMPORT_RUNS):
+            _, _output = cls.__run(
+                build_folder, [modules, [], repeat, source_folder], True
+            )
+            for _line in _output.splitlines():
+                _columns: list[str] = _line.split("|")
+                if not _line.startswith("import time:") or len(_columns) != 3:
+                    continue
+                _module: str = _columns[2].strip()
+                _self_time: str = _columns[0].removeprefix("import time:").strip()
+                if _module in modules and _self_time.isdigit():
+                    _import_times[_module] = min(
+                        _import_times.get(_module, float("inf")),
+                        int(_self_time) / 1000,
+                    )
+        _call_times, _ = cls.__run(
+            build_folder, [[], callables, repeat, source_folder], False
+        )
+        return _import_times, _call_times
+
+    # Format a duration in seconds
+    @staticmethod
+    def __format_time(seconds: float | str | None) -> str:
+        if not isinstance(seconds, float):
+            return "error" if isinstance(seconds, str) else "-"
+        for _unit, _scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+            if seconds >= _scale:
+                return f"{seconds / _scale:.2f}{_unit}"
+        return f"{seconds / 1e-9:.0f}ns"
+
+    # Get how many times faster the compiled build is
+    @staticmethod
+    def __speedup(compiled: Any, source: Any) -> float | None:
+        if isinstance(compiled, float) and isinstance(source, float) and compiled > 0:
+            return source / compiled
+        return None
+
+    # Print the results as a table
+    @classmethod
+    def __print_table(cls, title: str, rows: dict[str, dict[str, Any]]) -> None:
+        if len(rows) <= 0:
+            return
+        _width: int = max(len(title), *(len(_name) for _name in rows))
+        print(
+            f"\n{title.ljust(_width)}  {'compiled':>10}  {'source':>10}  {'speedup':>8}"
+        )
+        for _name, _row in rows.items():
+            _speedup: float | None = _row["speedup"]
+            print(
+                f"{_name.ljust(_width)}  {cls.__format_time(_row['compiled']):>10}"
+                f"  {cls.__format_time(_row['source']):>10}"
+                f"  {f'{_speedup:.2f}x' if _speedup is not None else '-':>8}"
+            )
+            for _build in ("compiled", "source"):
+                if isinstance(_row[_build], str):
+                    print(f"  {_build} build: {_row[_build]}")
+
+    # Build the project both compiled and uncompiled, then compare their import time
+    # and the benchmark callables declared in pyproject.toml
+    @classmethod
+    def run(
+        cls, source_folder: str, output: str | None = None, **build_options: Any
+    ) -> dict[str, Any]:
+        source_folder = os.path.abspath(source_folder)
+        with open(os.path.join(source_folder, "pyproject.toml"), "rb") as f:
+            data: dict[str, Any] = tomllib.load(f)
+        project_name: str = str(data["project"]["name"])
+        _config: dict[str, Any] = (
+            data.get("tool", {}).get("linpgtoolbox", {}).get("benchmark", {})
+        )
+        callables: list[str] = [str(_name) for _name in _config.get("callables", [])]
+        repeat: int = max(int(_config.get("repeat", 5)), 1)
+        _folders: dict[str, str] = {
+            "compiled": mkdtemp(prefix="linpgtoolbox_bench_compiled_"),
+            "source": mkdtemp(prefix="linpgtoolbox_bench_source_"),
+        }
+        _import_times: dict[str, dict[str, float]] = {}
+        _call_times: dict[str, dict[str, float | str]] = {}
+        try:
+            for _build, _folder in _folders.items():
+                Builder.compile(
+                    source_folder,
+                    _folder,
+                    skip_compile=_build == "source",
+                    show_success_message=False,
+                    **build_options,
+                )
+            modules: list[str] = cls.__modules(_folders["source"], project_name)
+            for _build, _folder in _folders.items():
+                try:
+                    _import_times[_build], _call_times[_build] = cls.measure(
+                        _folder, modules, callables, repeat, source_folder
+                    )
+                except CalledProcessError as e:
+                    print(f"Cannot import the {_build} build:\n{e.stderr}")
+                    raise
+        finally:
+            Builder.remove(*_folders.values())
+        results: dict[str, Any] = {
+            "project": project_name,
+            "python": ".".join(get_current_python_version()),
+            "modules": {
+                _module: {
+                    "compiled": _import_times["compiled"].get(_module),
+                    "source": _import_times["source"].get(_module),
+                }
+                for _module in modules
+            },
+            "benchmarks": {
+                _name: {
+                    "compiled": _call_times["compiled"].get(_name),
+                    "source": _call_times["source"].get(_name),
+                }
+                for _name in callables
+            },
+        }
+        for _rows in (results["modules"], results["benchmarks"]):
+            for _row in _rows.values():
+                _row["speedup"] = cls.__speedup(_row["compiled"], _row["source"])
+        # import times are in ms, the table takes seconds
+        cls.__print_table(
+            "Import time",
+            {
+                _module: {
+                    "compiled": (
+                        _row["compiled"] / 1000
+                        if _row["compiled"] is not None
+                        else None
+                    ),
+                    "source": (
+                        _row["source"] / 1000 if _row["source"] is not None else None
+                    ),
+                    "speedup": _row["speedup"],
+                }
+                for _module, _row in results["modules"].items()
+            },
+        )
+        cls.__print_table("Benchmark (per call)", results["benchmarks"])
+        # Modules that do not benefit from compiling are candidates to leave uncompiled
+        _slower: list[str] = [
+            _name
+            for _rows in (results["modules"], results["benchmarks"])
+            for _name, _row in _rows.items()
+            if _row["speedup"] is not None and _row["speedup"] < 1
+        ]
+        if len(_slower) > 0:
+            print(f"\nSlower when compiled: {', '.join(_slower)}")
+        output = output or os.path.join(source_folder, "benchmark.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults saved to {output}")
+        return results
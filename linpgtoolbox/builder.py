@@ -1,22 +1,82 @@
+import hashlib
 import os
+import re
 import shutil
 import sys
 import sysconfig
+import time
 import tomllib
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
 from glob import glob
-from json import dump
-from subprocess import check_call
-from tempfile import gettempdir
-from typing import Any, Final
+from json import dump, load
+from subprocess import CalledProcessError, check_call, check_output
+from tempfile import mkdtemp, mkstemp
+from typing import Any, Callable, Final
 
-from ._execute import execute_python, get_current_python_version, is_using_windows
+from ._combiner import ModuleCombiner
+from ._compile_cache import CompileCache
+from ._dist_info import load_project
+from ._execute import (
+    capture_python,
+    execute_python,
+    execute_toolbox_module,
+    get_current_python_version,
+    is_using_windows,
+    set_python_version,
+)
+from ._gitignore import GitIgnore
+from ._lazy_init import LazyInit
+from ._site_installer import SiteInstaller
+from ._uploader import Uploader
+from ._wheel import WheelBuilder
 from .pyinstaller import PackageInstaller, PyInstaller
 
 
 # System for building and packing files
 class Builder:
-    __PATH: Final[str] = os.path.join(os.path.dirname(__file__), "_compiler.py")
     __CACHE_NEED_REMOVE: Final[tuple[str, ...]] = ("dist", "build")
+    # Folders that are never copied into target folder
+    __COPY_IGNORES: Final[tuple[str, ...]] = (".git", "__pycache__", ".mypy_cache")
+    # Minimum size of the files that incremental sync links instead of copying
+    __LINK_MIN_SIZE: Final[int] = 1024 * 1024
+    # Files that may be modified during the build, so they must never be linked
+    __NEVER_LINK: Final[tuple[str, ...]] = (".py", ".pyx", ".pxd", ".pyi")
+    # Files that are compiled into extension modules
+    __COMPILED_SOURCES: Final[tuple[str, ...]] = (".py", ".pyx")
+    # Files that compiling a module generates next to it
+    __COMPILED_OUTPUTS: Final[tuple[str, ...]] = (
+        ".so",
+        ".pyd",
+        ".pyi",
+        ".c",
+        ".cpp",
+        ".html",
+    )
+    # ioctl request of cloning a file on linux
+    __FICLONE: Final[int] = 0x40049409
+    # Runs the cmake stage next to the cython stage
+    __CMAKE_EXECUTOR: Final[ThreadPoolExecutor] = ThreadPoolExecutor(
+        thread_name_prefix="linpgtoolbox_cmake"
+    )
+    # File in cmake build folder that records what the configuration depends on
+    __CMAKE_STAMP: Final[str] = ".linpgtoolbox_configure"
+    # Build profile that is used when none is selected
+    __DEFAULT_BUILD_PROFILE: Final[str] = "safe"
+    # Compiler and linker flags that allow the linker to drop unused code
+    __GC_SECTIONS: Final[dict[str, dict[str, list[str]]]] = {
+        "linux": {
+            "extra_compile_args": ["-ffunction-sections", "-fdata-sections"],
+            "extra_link_args": ["-Wl,--gc-sections"],
+        },
+        "darwin": {"extra_link_args": ["-Wl,-dead_strip"]},
+    }
+    # Settings that a rule of a build profile can have
+    __BUILD_PROFILE_KEYS: Final[tuple[str, ...]] = (
+        "directives",
+        "extra_compile_args",
+        "extra_link_args",
+    )
 
     # If specified folder exists, remove it
     @staticmethod
@@ -27,6 +87,319 @@ class Builder:
             if os.path.exists(_path):
                 shutil.rmtree(_path) if os.path.isdir(_path) else os.remove(_path)
 
+    # Whether two files are considered identical by incremental sync
+    @staticmethod
+    def __same_file(source: str, target: str, checksum: bool) -> bool:
+        if not os.path.isfile(target):
+            return False
+        _source_stat: os.stat_result = os.stat(source)
+        _target_stat: os.stat_result = os.stat(target)
+        if _source_stat.st_size != _target_stat.st_size:
+            return False
+        if not checksum:
+            return _source_stat.st_mtime_ns == _target_stat.st_mtime_ns
+        with open(source, "rb") as f:
+            _source_digest: bytes = hashlib.file_digest(f, "sha256").digest()
+        with open(target, "rb") as f:
+            return _source_digest == hashlib.file_digest(f, "sha256").digest()
+
+    # Clone a file with copy-on-write (only supported by some linux filesystems), return whether it succeeds
+    @classmethod
+    def __reflink(cls, source: str, target: str) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        import fcntl
+
+        try:
+            with open(source, "rb") as _src, open(target, "wb") as _dst:
+                fcntl.ioctl(_dst.fileno(), cls.__FICLONE, _src.fileno())
+        except OSError:
+            if os.path.exists(target):
+                os.remove(target)
+            return False
+        shutil.copystat(source, target)
+        return True
+
+    # Copy a single file if it has changed, large assets are linked if possible
+    @classmethod
+    def __sync_file(cls, source: str, target: str, checksum: bool, link: str) -> None:
+        if cls.__same_file(source, target, checksum):
+            return
+        # never write into the existing file, since it may be a hardlink to a source file
+        cls.remove(target)
+        if (
+            link != "copy"
+            and os.path.getsize(source) >= cls.__LINK_MIN_SIZE
+            and not source.endswith(cls.__NEVER_LINK)
+        ):
+            if link == "hardlink":
+                try:
+                    os.link(source, target)
+                    return
+                except OSError:
+                    pass
+            elif link == "reflink" and cls.__reflink(source, target):
+                return
+        shutil.copy2(source, target)
+
+    # Make target folder identical to source folder by only copying the files that have changed
+    # and deleting the ones that are gone, paths in keep (relative to target) are left untouched
+    # and the paths that the ignore function returns True for are not copied. The files in
+    # compiled (relative to source) have been compiled into the given outputs (relative to
+    # target), so they are not copied again as long as all of their outputs exist.
+    @classmethod
+    def sync(
+        cls,
+        source: str,
+        target: str,
+        checksum: bool = False,
+        link: str = "reflink",
+        ignores: tuple[str, ...] = tuple(),
+        keep: tuple[str, ...] = tuple(),
+        ignore: Callable[[str, bool], bool] | None = None,
+        compiled: dict[str, list[str]] | None = None,
+    ) -> None:
+        if link not in ("copy", "reflink", "hardlink"):
+            raise ValueError(f'Unknown link mode "{link}"!')
+        _expected: set[str] = set()
+        for _root, _dirs, _files in os.walk(source):
+            _dirs[:] = [
+                _dir
+                for _dir in _dirs
+                if _dir not in ignores
+                and (ignore is None or not ignore(os.path.join(_root, _dir), True))
+            ]
+            _files = [
+                _file
+                for _file in _files
+                if _file not in ignores
+                and (ignore is None or not ignore(os.path.join(_root, _file), False))
+            ]
+            _relative_root: str = os.path.relpath(_root, source)
+            _target_root: str = os.path.normpath(os.path.join(target, _relative_root))
+            if not os.path.isdir(_target_root):
+                cls.remove(_target_root)
+                os.makedirs(_target_root)
+            for _name in _dirs:
+                _expected.add(os.path.normpath(os.path.join(_relative_root, _name)))
+            for _file in _files:
+                _relative_path: str = os.path.normpath(
+                    os.path.join(_relative_root, _file)
+                )
+                _outputs: list[str] = (
+                    compiled.get(_relative_path, []) if compiled is not None else []
+                )
+                if len(_outputs) > 0 and all(
+                    os.path.isfile(os.path.join(target, _output))
+                    for _output in _outputs
+                ):
+                    _expected.update(os.path.normpath(_output) for _output in _outputs)
+                    continue
+                _expected.add(_relative_path)
+                cls.__sync_file(
+                    os.path.join(_root, _file),
+                    os.path.join(_target_root, _file),
+                    checksum,
+                    link,
+                )
+        # Delete the files that no longer exist in source folder
+        _keep: set[str] = {os.path.normpath(_path) for _path in keep}
+        for _root, _dirs, _files in os.walk(target):
+            _relative_root = os.path.relpath(_root, target)
+            for _name in tuple(_dirs):
+                _relative_path = os.path.normpath(os.path.join(_relative_root, _name))
+                if _relative_path in _keep:
+                    _dirs.remove(_name)
+                elif _relative_path not in _expected or os.path.islink(
+                    os.path.join(_root, _name)
+                ):
+                    cls.remove(os.path.join(_root, _name))
+                    _dirs.remove(_name)
+            for _name in _files:
+                _relative_path = os.path.normpath(os.path.join(_relative_root, _name))
+                if _relative_path not in _expected and _relative_path not in _keep:
+                    os.remove(os.path.join(_root, _name))
+
+    # Get the source and the relative target path of a file to copy
+    @staticmethod
+    def __copy_target(the_file: str) -> tuple[str, str]:
+        _target: str = os.path.basename(the_file)
+        # If user customizes relative output path
+        if "->" in the_file:
+            the_file, _target = the_file.split("->")
+        # Remove unintentional empty spaces
+        return the_file.strip(), _target.strip()
+
+    # Get the options of incremental sync, None if target folder shall be copied from scratch
+    @staticmethod
+    def __sync_options(
+        _config: dict[str, Any], no_cache: bool
+    ) -> dict[str, Any] | None:
+        _options: dict[str, Any] = _config.get("options", {})
+        if no_cache is True or _options.get("incremental_sync", True) is not True:
+            return None
+        return {
+            "checksum": bool(_options.get("sync_checksum", False)),
+            "link": str(_options.get("sync_link", "reflink")),
+        }
+
+    # Get the file that records the modules compiled by the incremental builds into target
+    # folder, None if the modules cannot be tracked since the build rewrites or picks them
+    @classmethod
+    def __compiled_manifest(
+        cls,
+        abs_target_folder: str,
+        project_name: str,
+        _config: dict[str, Any],
+        sync_options: dict[str, Any] | None,
+        skip_compile: bool,
+        profile: str | None,
+    ) -> str | None:
+        _options: dict[str, Any] = _config.get("options", {})
+        if (
+            sync_options is None
+            or skip_compile
+            or _options.get("smart_auto_module_combine", "disable") != "disable"
+            or _options.get("lazy_init", False) is True
+            or profile is not None
+            or _options.get("profile")
+        ):
+            return None
+        return os.path.join(
+            str(_options.get("cache_dir") or CompileCache.default_dir()),
+            "sync",
+            project_name
+            + "-"
+            + hashlib.sha256(abs_target_folder.encode()).hexdigest()[:16]
+            + ".json",
+        )
+
+    # Get the fingerprint of everything the compiled modules depend on besides their source
+    @staticmethod
+    def __compiled_fingerprint(_config: dict[str, Any], *args: Any) -> str:
+        return hashlib.sha256(
+            repr(
+                (
+                    _config,
+                    capture_python(
+                        "-c",
+                        "import importlib.metadata, sys; print(sys.version, importlib.metadata.version('cython'))",
+                    ).stdout,
+                    args,
+                )
+            ).encode()
+        ).hexdigest()
+
+    # Get the size, modification time and hash of the python modules in given folder
+    @classmethod
+    def __module_states(cls, folder: str) -> dict[str, list[Any]]:
+        _states: dict[str, list[Any]] = {}
+        for _root, _dirs, _files in os.walk(folder):
+            for _file in _files:
+                # cython needs the __init__ files to determine the module names,
+                # so they are always synced
+                if not _file.endswith(cls.__COMPILED_SOURCES) or _file.startswith(
+                    "__init__."
+                ):
+                    continue
+                _path: str = os.path.join(_root, _file)
+                _stat: os.stat_result = os.stat(_path)
+                with open(_path, "rb") as f:
+                    _digest: str = hashlib.file_digest(f, "sha256").hexdigest()
+                _states[os.path.normpath(os.path.relpath(_path, folder))] = [
+                    _stat.st_size,
+                    _stat.st_mtime_ns,
+                    _digest,
+                ]
+        return _states
+
+    # Load the modules of source folder that have not changed since they were compiled,
+    # along with their records
+    @staticmethod
+    def __load_compiled(
+        manifest: str, fingerprint: str, source: str, checksum: bool
+    ) -> dict[str, dict[str, Any]]:
+        if not os.path.isfile(manifest):
+            return {}
+        try:
+            with open(manifest, "r", encoding="utf-8") as f:
+                _data: dict[str, Any] = load(f)
+        except ValueError:
+            return {}
+        if _data.get("fingerprint") != fingerprint:
+            return {}
+        _compiled: dict[str, dict[str, Any]] = {}
+        for _relative, _record in dict(_data.get("modules", {})).items():
+            _path: str = os.path.join(source, _relative)
+            if not os.path.isfile(_path):
+                continue
+            _stat: os.stat_result = os.stat(_path)
+            _size, _mtime_ns, _digest = _record["state"]
+            if _stat.st_size != _size:
+                continue
+            if checksum:
+                with open(_path, "rb") as f:
+                    if hashlib.file_digest(f, "sha256").hexdigest() != _digest:
+                        continue
+            elif _stat.st_mtime_ns != _mtime_ns:
+                continue
+            _compiled[_relative] = _record
+        return _compiled
+
+    # Record the modules that have been compiled into target folder, so that the next
+    # incremental build neither copies nor compiles them again if they have not changed
+    @classmethod
+    def __save_compiled(
+        cls,
+        manifest: str,
+        fingerprint: str,
+        source: str,
+        target: str,
+        compiled: dict[str, dict[str, Any]],
+        states: dict[str, list[Any]],
+    ) -> None:
+        _modules: dict[str, dict[str, Any]] = {}
+        for _relative in {*compiled, *states}:
+            # the module has not been compiled if its source is still there
+            if os.path.exists(os.path.join(target, _relative)):
+                continue
+            _folder, _file = os.path.split(_relative)
+            _stem: str = os.path.splitext(_file)[0] + "."
+            _outputs: list[str] = (
+                sorted(
+                    os.path.join(_folder, _name)
+                    for _name in os.listdir(os.path.join(target, _folder))
+                    if _name.startswith(_stem)
+                    and _name.endswith(cls.__COMPILED_OUTPUTS)
+                    # the files that come with the source code are synced on their own
+                    and not os.path.exists(os.path.join(source, _folder, _name))
+                )
+                if os.path.isdir(os.path.join(target, _folder))
+                else []
+            )
+            if not any(_output.endswith((".so", ".pyd")) for _output in _outputs):
+                continue
+            _modules[_relative] = {
+                "state": (
+                    states[_relative]
+                    if _relative in states
+                    else compiled[_relative]["state"]
+                ),
+                "outputs": _outputs,
+            }
+        os.makedirs(os.path.dirname(manifest), exist_ok=True)
+        _temp: str = f"{manifest}.{os.getpid()}.tmp"
+        with open(_temp, "w", encoding="utf-8") as f:
+            dump({"fingerprint": fingerprint, "modules": _modules}, f)
+        os.replace(_temp, manifest)
+
+    # Get the matcher of the gitignore files of the project, None if they are not respected
+    @staticmethod
+    def __gitignore(source_folder: str, _config: dict[str, Any]) -> GitIgnore | None:
+        if _config.get("options", {}).get("respect_gitignore", True) is not True:
+            return None
+        return GitIgnore(source_folder)
+
     # Copy files
     @classmethod
     def copy(
@@ -35,20 +408,28 @@ class Builder:
         target_folder: str,
         move: bool = False,
         cwd: str | None = None,
+        sync_options: dict[str, Any] | None = None,
     ) -> None:
         for the_file in files:
-            _target: str = os.path.basename(the_file)
-            # If user customizes relative output path
-            if "->" in the_file:
-                the_file, _target = the_file.split("->")
+            the_file, _target = cls.__copy_target(the_file)
             # Make sure files are copied to target folder
-            _target = os.path.join(target_folder, _target.strip())
-            # Remove unintentional empty spaces
-            the_file = (
-                the_file.strip() if cwd is None else os.path.join(cwd, the_file.strip())
-            )
+            _target = os.path.join(target_folder, _target)
+            the_file = the_file if cwd is None else os.path.join(cwd, the_file)
+            # Only copy the files that have changed if incremental sync is enabled
+            if sync_options is not None and not move:
+                if os.path.isdir(the_file):
+                    cls.sync(the_file, _target, **sync_options)
+                else:
+                    if os.path.isdir(_target):
+                        cls.remove(_target)
+                    cls.__sync_file(
+                        the_file,
+                        _target,
+                        sync_options.get("checksum", False),
+                        sync_options.get("link", "reflink"),
+                    )
             # If it is a directory
-            if os.path.isdir(the_file):
+            elif os.path.isdir(the_file):
                 cls.remove(_target)
                 shutil.copytree(the_file, _target)
             else:
@@ -61,115 +442,277 @@ class Builder:
     def __clean_up(cls, cwd: str | None = None) -> None:
         cls.remove(*cls.__CACHE_NEED_REMOVE, cwd=cwd)
 
-    # Delete the dir and create a new one with same name
-    @classmethod
-    def __remake_dir(cls, path: str) -> None:
-        # Delete the dir
-        cls.remove(path)
-        # Create a new one with same name
-        os.makedirs(path)
+    # Get the fingerprint of the cmake files and the toolchain that the configuration depends on
+    @staticmethod
+    def __cmake_fingerprint(source_dir: str, python: str) -> str:
+        _hash = hashlib.sha256(
+            check_output(["cmake", "--version"]).strip()
+            + repr(
+                (
+                    source_dir,
+                    sysconfig.get_platform(),
+                    python,
+                    *(
+                        os.environ.get(_variable)
+                        for _variable in (
+                            "CC",
+                            "CXX",
+                            "CFLAGS",
+                            "CXXFLAGS",
+                            "LDFLAGS",
+                            "CMAKE_GENERATOR",
+                            "CMAKE_TOOLCHAIN_FILE",
+                        )
+                    ),
+                )
+            ).encode()
+        )
+        for _root, _dirs, _files in os.walk(source_dir):
+            _dirs.sort()
+            for _file in sorted(_files):
+                if _file == "CMakeLists.txt" or _file.endswith(".cmake"):
+                    _hash.update(os.path.relpath(_root, source_dir).encode())
+                    with open(os.path.join(_root, _file), "rb") as f:
+                        _hash.update(f.read())
+        return _hash.hexdigest()
 
-    # Combine modules
+    # Configure (only if the cmake files or the toolchain changed) and build a cmake project
     @classmethod
-    def __combine(cls, _dir_path: str) -> None:
-        if os.path.isdir(_dir_path) and os.path.exists(
-            init_file_path := os.path.join(_dir_path, "__init__.py")
+    def __cmake(cls, source_dir: str, build_dir: str, workers: int) -> None:
+        os.makedirs(build_dir, exist_ok=True)
+        # the modules are built for the selected python, not the first one cmake finds
+        _python: str = capture_python(
+            "-c", "import sys; print(sys.executable)"
+        ).stdout.strip()
+        _fingerprint: str = cls.__cmake_fingerprint(source_dir, _python)
+        _stamp: str = os.path.join(build_dir, cls.__CMAKE_STAMP)
+        _configured: str = ""
+        if os.path.exists(_stamp) and os.path.exists(
+            os.path.join(build_dir, "CMakeCache.txt")
         ):
-            keyWord: Final[str] = "from ."
-            keyEndWord: Final[str] = " import *"
-            with open(init_file_path, "r", encoding="utf-8") as f:
-                _lines: list[str] = f.readlines()
-            _index: int = 0
-            while _index < len(_lines):
-                currentLine: str = _lines[_index].rstrip("\n")
-                if (
-                    currentLine.startswith(keyWord)
-                    and not currentLine.startswith("from ..")
-                    and currentLine.endswith(keyEndWord)
-                ):
-                    pyFilePath: str = os.path.join(
-                        _dir_path,
-                        currentLine[len(keyWord) : len(currentLine) - len(keyEndWord)]
-                        + ".py",
-                    )
-                    if os.path.exists(pyFilePath):
-                        with open(pyFilePath, "r", encoding="utf-8") as f:
-                            content: list[str] = f.readlines()
-                        cls.remove(pyFilePath)
-                        _lines = _lines[:_index] + content + _lines[_index + 1 :]
-                    else:
-                        _index += 1
-                else:
-                    _index += 1
-            # If only __init__.py remains in the module folder, convert the folder to a python file
-            if len([f for f in os.listdir(_dir_path) if f != "__pycache__"]) <= 1:
-                for i in range(len(_lines)):
-                    if _lines[i].lstrip().startswith("from .."):
-                        _lines[i] = _lines[i].replace("from ..", "from .")
-                with open(os.path.join(f"{_dir_path}.py"), "w", encoding="utf-8") as f:
-                    f.writelines(_lines)
-                shutil.rmtree(_dir_path)
-            # Otherwise write content directly to original __init__.py file
-            else:
-                with open(init_file_path, "w", encoding="utf-8") as f:
-                    f.writelines(_lines)
+            with open(_stamp, "r", encoding="utf-8") as f:
+                _configured = f.read()
+        if _configured != _fingerprint:
+            cls.remove(_stamp)
+            check_call(
+                [
+                    "cmake",
+                    "-S",
+                    source_dir,
+                    "-B",
+                    build_dir,
+                    f"-DPython_EXECUTABLE={_python}",
+                    f"-DPython3_EXECUTABLE={_python}",
+                ]
+            )
+            with open(_stamp, "w", encoding="utf-8") as f:
+                f.write(_fingerprint)
+        check_call(
+            [
+                "cmake",
+                "--build",
+                build_dir,
+                "--config",
+                "Release",
+                "--parallel",
+                str(workers),
+            ]
+        )
 
-    # Compile
-    @classmethod
-    def compile(
-        cls,
-        source_folder: str,
-        target_folder: str = "src",
-        upgrade: bool = False,
-        skip_compile: bool = False,
-        show_success_message: bool = True,
-        show_compile_messages: bool = False,
-    ) -> None:
-        # Make sure required libraries are installed
-        PackageInstaller.install("setuptools")
-        PackageInstaller.install("cython")
-        # Convert to abs path
-        source_folder = os.path.abspath(source_folder)
-        # Remove cache folder
-        abs_target_folder: str = os.path.join(source_folder, target_folder)
-        cls.remove(abs_target_folder)
+    # Load the project name and the config for linpgtoolbox from pyproject.toml
+    @staticmethod
+    def __load_config(source_folder: str) -> tuple[str, dict[str, Any]]:
         # Make sure pyproject.toml exists
         pyproject_path: str = os.path.join(source_folder, "pyproject.toml")
         if not os.path.exists(pyproject_path):
             raise FileNotFoundError("Cannot find pyproject.toml!")
-        # Load config for linpgtoolbox
-        _config: dict[str, Any] = {}
-        _options: dict[str, Any] = {}
         with open(pyproject_path, "rb") as f:
             data: dict[str, Any] = tomllib.load(f)
-            _config.update(data.get("tool", {}).get("linpgtoolbox", {}))
-            _options.update(_config.get("options", {}))
-            project_name: str = str(data["project"]["name"])
+        return str(data["project"]["name"]), dict(
+            data.get("tool", {}).get("linpgtoolbox", {})
+        )
+
+    # Get the rules (module glob and settings) of given build profile, the rules are applied
+    # in order, so that the settings of a later rule override the ones of an earlier rule
+    @classmethod
+    def __build_profile(
+        cls, _config: dict[str, Any], name: str | None
+    ) -> list[tuple[str, dict[str, Any]]]:
+        _profiles: dict[str, dict[str, Any]] = _config.get("build_profiles", {})
+        # nothing to apply if the default profile is not declared
+        if name is None and cls.__DEFAULT_BUILD_PROFILE not in _profiles:
+            return []
+        name = name or cls.__DEFAULT_BUILD_PROFILE
+        if name not in _profiles:
+            raise ValueError(
+                f'Build profile "{name}" is not declared in [tool.linpgtoolbox.build_profiles]!'
+            )
+        for _pattern, _settings in _profiles[name].items():
+            if not isinstance(_settings, dict) or any(
+                _key not in cls.__BUILD_PROFILE_KEYS for _key in _settings
+            ):
+                raise ValueError(
+                    f'Invalid settings for "{_pattern}" in build profile "{name}", only'
+                    f" {', '.join(cls.__BUILD_PROFILE_KEYS)} are supported!"
+                )
+        return list(_profiles[name].items())
+
+    # Whether to strip the extension modules, which is on by default for release packs
+    @staticmethod
+    def __strip_enabled(_options: dict[str, Any], release: bool) -> bool:
+        return not _options.get("debug_mode", False) and bool(
+            _options.get("strip", release)
+        )
+
+    # Strip the symbols of the extension modules in given folder and report their sizes
+    @classmethod
+    def strip(cls, folder: str) -> None:
+        # the symbols of .pyd files are kept in separate .pdb files
+        _strip: str | None = shutil.which("strip")
+        if is_using_windows() or _strip is None:
+            return
+        _sizes: dict[str, tuple[int, int]] = {}
+        for _root, _, _files in os.walk(folder):
+            for _file in _files:
+                if not _file.endswith(".so"):
+                    continue
+                _path: str = os.path.join(_root, _file)
+                _before: int = os.path.getsize(_path)
+                # strip into a new file, so that the files linked by sync are not modified
+                _temp: str = _path + ".stripped"
+                try:
+                    check_call(
+                        [
+                            _strip,
+                            (
+                                "-x"
+                                if sys.platform.startswith("darwin")
+                                else "--strip-unneeded"
+                            ),
+                            "-o",
+                            _temp,
+                            _path,
+                        ]
+                    )
+                except CalledProcessError:
+                    print(f"Cannot strip {os.path.relpath(_path, folder)}, skipped")
+                    cls.remove(_temp)
+                    continue
+                os.replace(_temp, _path)
+                if (_after := os.path.getsize(_path)) < _before:
+                    _sizes[os.path.relpath(_path, folder)] = (_before, _after)
+        if len(_sizes) <= 0:
+            return
+        _width: int = max(len("total"), *(len(_module) for _module in _sizes))
+        print(f"Stripped {len(_sizes)} extension module(s):")
+        for _module, (_before, _after) in sorted(_sizes.items()) + [
+            (
+                "total",
+                (
+                    sum(_before for _before, _ in _sizes.values()),
+                    sum(_after for _, _after in _sizes.values()),
+                ),
+            )
+        ]:
+            print(
+                f"  {_module.ljust(_width)}  {_before / 1024:>9.1f}KB"
+                f" -> {_after / 1024:>9.1f}KB  (-{100 * (_before - _after) / _before:.1f}%)"
+            )
+
+    # Copy the project into target folder and combine the modules if needed
+    @classmethod
+    def __prepare(
+        cls,
+        source_folder: str,
+        abs_target_folder: str,
+        project_name: str,
+        _config: dict[str, Any],
+        sync_options: dict[str, Any] | None = None,
+        compiled: dict[str, list[str]] | None = None,
+    ) -> None:
+        _options: dict[str, Any] = _config.get("options", {})
         # Copy repo to destination folder
         source_path_in_target_folder: str = os.path.join(
             abs_target_folder, project_name
         )
-        shutil.copytree(
+        # Files ignored by git are not part of the build
+        _gitignore: GitIgnore | None = cls.__gitignore(source_folder, _config)
+        # the extra files are synced on their own, so they are kept here
+        cls.sync(
             os.path.join(source_folder, project_name),
             source_path_in_target_folder,
-            ignore=shutil.ignore_patterns(".git", "__pycache__", ".mypy_cache"),
+            ignores=cls.__COPY_IGNORES,
+            keep=tuple(
+                cls.__copy_target(the_file)[1]
+                for the_file in (
+                    *_config.get("requires", tuple()),
+                    *_config.get("includes", tuple()),
+                )
+            ),
+            ignore=(
+                (
+                    lambda _path, _is_dir: _gitignore.is_ignored(
+                        os.path.relpath(_path, source_folder), _is_dir
+                    )
+                )
+                if _gitignore is not None
+                else None
+            ),
+            compiled=compiled,
+            # target folder is empty if it is not synced incrementally
+            **(sync_options if sync_options is not None else {"link": "copy"}),
         )
         # Copy the files that are required for compiling
         cls.copy(
             tuple(_config.get("requires", tuple())),
             source_path_in_target_folder,
             cwd=source_folder,
+            sync_options=sync_options,
         )
-        # If smart module combination mode is enabled
+        # If smart module combination mode is enabled (sub packages are combined recursively)
         smart_auto_module_combine: str = _options.get(
             "smart_auto_module_combine", "disable"
         )
-        if smart_auto_module_combine != "disable":
-            for _path in glob(os.path.join(source_path_in_target_folder, "*")):
-                cls.__combine(_path)
         if smart_auto_module_combine == "all_in_one":
-            cls.__combine(source_path_in_target_folder)
-        # If target folder has cmake file
+            ModuleCombiner.combine(source_path_in_target_folder)
+        elif smart_auto_module_combine != "disable":
+            for _path in glob(os.path.join(source_path_in_target_folder, "*")):
+                ModuleCombiner.combine(_path)
+        # Only import submodules when their names are accessed
+        if _options.get("lazy_init", False) is True:
+            LazyInit.generate(source_path_in_target_folder)
+
+    # Build the project that has been prepared in target folder
+    @classmethod
+    def __build(
+        cls,
+        source_folder: str,
+        abs_target_folder: str,
+        project_name: str,
+        _config: dict[str, Any],
+        skip_compile: bool,
+        show_compile_messages: bool,
+        workers: int | None,
+        no_cache: bool,
+        fail_fast: bool,
+        profile: str | None = None,
+        annotate: bool = False,
+        build_profile: str | None = None,
+        release: bool = False,
+    ) -> None:
+        _options: dict[str, Any] = _config.get("options", {})
+        source_path_in_target_folder: str = os.path.join(
+            abs_target_folder, project_name
+        )
+        sync_options: dict[str, Any] | None = cls.__sync_options(_config, no_cache)
+        _strip: bool = cls.__strip_enabled(_options, release)
+        # Number of jobs that cython and cmake run together
+        _jobs: int = max(
+            int(workers or _options.get("workers") or os.cpu_count() or 1), 1
+        )
+        # If target folder has cmake file, build it while the modules are being compiled
+        _cmake_stage: Future[None] | None = None
+        _cmake_jobs: int = 0
         if (
             os.path.exists(
                 CMakeListsFilePath := os.path.join(
@@ -178,71 +721,188 @@ class Builder:
             )
             and _options.get("auto_cmake", False) is True
         ):
-            # Create a temporary build folder
-            cmake_build_dir: Final[str] = os.path.join(
-                source_path_in_target_folder, "build"
+            # The build folder is kept in cache, unless the project is built in a temporary
+            # work folder (which changes every time) or cache is disabled
+            _cache_cmake: bool = (
+                not no_cache
+                and os.path.commonpath([abs_target_folder, source_folder])
+                == source_folder
             )
-            cls.__remake_dir(cmake_build_dir)
-            # Make project
-            check_call(["cmake", ".."], cwd=cmake_build_dir)
-            check_call(
-                ["cmake", "--build", ".", "--config", "Release"], cwd=cmake_build_dir
-            )
-            # Copy compiled python files (windows)
-            cls.copy(
-                tuple(glob(os.path.join(cmake_build_dir, "Release", "*.pyd"))),
-                source_path_in_target_folder,
+            cmake_build_dir: str = (
+                os.path.join(
+                    str(_options.get("cache_dir") or CompileCache.default_dir()),
+                    "cmake",
+                    project_name
+                    + "-"
+                    + hashlib.sha256(
+                        repr(
+                            (
+                                source_path_in_target_folder,
+                                get_current_python_version(),
+                            )
+                        ).encode()
+                    ).hexdigest()[:16],
+                )
+                if _cache_cmake
+                else mkdtemp(prefix="linpgtoolbox_cmake_")
             )
-            # Copy compiled python files (linux)
-            cls.copy(
-                tuple(glob(os.path.join(cmake_build_dir, "*.so"))),
+            # cmake takes a share of the jobs, unless there is nothing else to do
+            _cmake_jobs = _jobs if skip_compile else max(_jobs // 4, 1)
+            # the stage runs in another thread, which has to use the python selected by this one
+            _cmake_stage = cls.__CMAKE_EXECUTOR.submit(
+                copy_context().run,
+                cls.__cmake,
                 source_path_in_target_folder,
+                cmake_build_dir,
+                _cmake_jobs,
             )
-            cls.remove(cmake_build_dir)
-            cls.remove(CMakeListsFilePath)
 
-        if not skip_compile:
-            # Write data to cache file for compiler to read
-            builder_options: dict[str, Any] = {
-                "source_folder": source_path_in_target_folder,
-                "ignores": _config.get("ignores", tuple()),
-                "enable_multiprocessing": True,
-                "debug_mode": False,
-                "emit_code_comments": False,
-                "keep_c": False,
-                "skip_compile": skip_compile,
-            }
-            builder_options.update(_options)
-            with open(
-                os.path.join(gettempdir(), "linpgtoolbox_builder_cache.json"),
-                "w",
-                encoding="utf-8",
-            ) as f:
-                dump(builder_options, f)
-            # Ensure mypy is installed
-            PackageInstaller.install("mypy")
-            # Compile source code
-            _compile_args: list[str] = [
-                cls.__PATH,
-                "build_ext",
-                "--build-lib",
-                target_folder,
-            ]
-            if show_compile_messages:
-                _compile_args.append("--show-compile-messages")
-            execute_python(*_compile_args, cwd=source_folder)
-            # Delete cache
-            cls.__clean_up(source_folder)
-            cls.remove(
-                *_config.get("cache_needs_removal", tuple()),
-                cwd=source_path_in_target_folder,
-            )
+        try:
+            if not skip_compile:
+                # Write data to cache file for compiler to read
+                builder_options: dict[str, Any] = {
+                    "source_folder": source_path_in_target_folder,
+                    "ignores": _config.get("ignores", tuple()),
+                    "enable_multiprocessing": True,
+                    "workers": os.cpu_count(),
+                    "debug_mode": False,
+                    "emit_code_comments": False,
+                    "keep_c": False,
+                    "enable_cache": True,
+                    "fail_fast": False,
+                    "skip_compile": skip_compile,
+                }
+                builder_options.update(_options)
+                # Files ignored by git are not compiled, except the required ones
+                if cls.__gitignore(source_folder, _config) is not None:
+                    builder_options["gitignore_root"] = source_folder
+                    builder_options["gitignore_rules"] = [
+                        f"!/{project_name}/{cls.__copy_target(the_file)[1]}{_suffix}"
+                        for the_file in _config.get("requires", tuple())
+                        for _suffix in ("", "/**")
+                    ]
+                # The extra files kept by incremental sync are not part of the build
+                if sync_options is not None:
+                    builder_options["ignores"] = [
+                        *builder_options["ignores"],
+                        *(
+                            re.escape(
+                                os.path.join(
+                                    source_path_in_target_folder,
+                                    cls.__copy_target(the_file)[1],
+                                )
+                            )
+                            + r"($|[\\/])"
+                            for the_file in _config.get("includes", tuple())
+                        ),
+                    ]
+                # The number of workers given directly overrides the one in options,
+                # and the jobs of cmake are taken out of it
+                builder_options["workers"] = max(_jobs - _cmake_jobs, 1)
+                # Always compile everything from scratch if cache is disabled
+                if no_cache is True:
+                    builder_options["enable_cache"] = False
+                # Stop the build on the first error
+                if fail_fast is True:
+                    builder_options["fail_fast"] = True
+                # Cython directives and c compiler flags of the selected build profile
+                builder_options["build_profile"] = cls.__build_profile(
+                    _config, build_profile or _options.get("build_profile")
+                )
+                # Let the linker drop unused code of the modules that will be stripped
+                if _strip and _options.get("gc_sections", True) is True:
+                    for _platform, _settings in cls.__GC_SECTIONS.items():
+                        if sys.platform.startswith(_platform):
+                            builder_options["build_profile"].append(("*", _settings))
+                # Generate the html annotation of each module
+                if annotate is True:
+                    builder_options["annotate"] = True
+                # The profile given directly overrides the one in options
+                if profile is not None:
+                    builder_options["profile"] = os.path.abspath(profile)
+                elif builder_options.get("profile"):
+                    builder_options["profile"] = os.path.join(
+                        source_folder, builder_options["profile"]
+                    )
+                # Each build gets its own configuration file and build directory,
+                # so that any number of builds can run at the same time
+                _config_fd, _config_path = mkstemp(
+                    prefix="linpgtoolbox_builder_", suffix=".json"
+                )
+                with os.fdopen(_config_fd, "w", encoding="utf-8") as f:
+                    dump(builder_options, f)
+                _build_temp: str = mkdtemp(prefix="linpgtoolbox_build_")
+                # Compile source code
+                _compile_args: list[str] = [
+                    "--config",
+                    _config_path,
+                    "build_ext",
+                    "--build-lib",
+                    abs_target_folder,
+                    "--build-temp",
+                    _build_temp,
+                ]
+                if show_compile_messages:
+                    _compile_args.append("--show-compile-messages")
+                try:
+                    execute_toolbox_module(
+                        "_compiler", *_compile_args, cwd=source_folder
+                    )
+                finally:
+                    cls.remove(_config_path, _build_temp)
+                # Delete cache
+                cls.remove(
+                    *_config.get("cache_needs_removal", tuple()),
+                    cwd=source_path_in_target_folder,
+                )
 
+            # Wait for cmake to finish and copy the modules it built
+            if _cmake_stage is not None:
+                _cmake_stage.result()
+                # Copy compiled python files (windows)
+                cls.copy(
+                    tuple(glob(os.path.join(cmake_build_dir, "Release", "*.pyd"))),
+                    source_path_in_target_folder,
+                )
+                # Copy compiled python files (linux)
+                cls.copy(
+                    tuple(glob(os.path.join(cmake_build_dir, "*.so"))),
+                    source_path_in_target_folder,
+                )
+                cls.remove(CMakeListsFilePath)
+        finally:
+            # cmake may still be running if compiling fails, so its temporary build folder
+            # is only removed once it is done
+            if _cmake_stage is not None:
+                wait((_cmake_stage,))
+                if not _cache_cmake:
+                    cls.remove(cmake_build_dir)
+
+        # Strip the compiled modules (including the ones built by cmake)
+        if _strip:
+            cls.strip(abs_target_folder)
+
+        # Compare the import time of the lazy package with loading everything
+        if _options.get("lazy_init", False) is True:
+            _lazy_time: float | None = LazyInit.import_time(
+                abs_target_folder, project_name
+            )
+            _eager_time: float | None = LazyInit.import_time(
+                abs_target_folder, project_name, True
+            )
+            if _lazy_time is not None and _eager_time is not None:
+                print(
+                    f"Import time of {project_name}: {_lazy_time:.1f}ms (lazy),"
+                    f" {_eager_time:.1f}ms (all submodules loaded)"
+                )
+            else:
+                print(f"Cannot measure the import time of {project_name}")
         # Copy extra files
         cls.copy(
             tuple(_config.get("includes", tuple())),
             source_path_in_target_folder,
             cwd=source_folder,
+            sync_options=sync_options,
         )
         # Write default PyInstaller program
         if _options.get("include_pyinstaller", False) is True:
@@ -257,7 +917,7 @@ class Builder:
                 (
                     source_path_in_target_folder
                     if os.path.exists(source_path_in_target_folder)
-                    else target_folder
+                    else abs_target_folder
                 ),
                 "py.typed",
             ),
@@ -269,8 +929,112 @@ class Builder:
                     "More information can be found here: https://peps.python.org/pep-0561/\n",
                 )
             )
+
+    # Compile
+    @classmethod
+    def compile(
+        cls,
+        source_folder: str,
+        target_folder: str = "src",
+        upgrade: bool = False,
+        skip_compile: bool = False,
+        show_success_message: bool = True,
+        show_compile_messages: bool = False,
+        workers: int | None = None,
+        no_cache: bool = False,
+        fail_fast: bool = False,
+        profile: str | None = None,
+        annotate: bool = False,
+        build_profile: str | None = None,
+        fast_install: bool = False,
+    ) -> None:
+        # Make sure required libraries are installed
+        PackageInstaller.install(
+            "setuptools", "cython", *(() if skip_compile else ("mypy",))
+        )
+        # Convert to abs path
+        source_folder = os.path.abspath(source_folder)
+        # Load config for linpgtoolbox
+        project_name, _config = cls.__load_config(source_folder)
+        sync_options: dict[str, Any] | None = cls.__sync_options(_config, no_cache)
+        # Remove cache folder (or everything but the project if only changes are synced)
+        abs_target_folder: str = os.path.join(source_folder, target_folder)
+        if sync_options is None:
+            cls.remove(abs_target_folder)
+        elif os.path.isdir(abs_target_folder):
+            cls.remove(
+                *(
+                    _path
+                    for _path in os.listdir(abs_target_folder)
+                    if _path != project_name
+                ),
+                cwd=abs_target_folder,
+            )
+        # The modules that have not changed since the last build are neither synced nor compiled
+        _manifest: str | None = cls.__compiled_manifest(
+            abs_target_folder,
+            project_name,
+            _config,
+            sync_options,
+            skip_compile,
+            profile,
+        )
+        _fingerprint: str = ""
+        _compiled: dict[str, dict[str, Any]] = {}
+        if _manifest is not None and sync_options is not None:
+            _fingerprint = cls.__compiled_fingerprint(_config, annotate, build_profile)
+            _compiled = cls.__load_compiled(
+                _manifest,
+                _fingerprint,
+                os.path.join(source_folder, project_name),
+                sync_options["checksum"],
+            )
+        # Copy the project and build it
+        cls.__prepare(
+            source_folder,
+            abs_target_folder,
+            project_name,
+            _config,
+            sync_options,
+            {_relative: _record["outputs"] for _relative, _record in _compiled.items()},
+        )
+        _states: dict[str, list[Any]] = (
+            cls.__module_states(os.path.join(abs_target_folder, project_name))
+            if _manifest is not None
+            else {}
+        )
+        cls.__build(
+            source_folder,
+            abs_target_folder,
+            project_name,
+            _config,
+            skip_compile,
+            show_compile_messages,
+            workers,
+            no_cache,
+            fail_fast,
+            profile,
+            annotate,
+            build_profile,
+        )
+        if _manifest is not None:
+            cls.__save_compiled(
+                _manifest,
+                _fingerprint,
+                os.path.join(source_folder, project_name),
+                os.path.join(abs_target_folder, project_name),
+                _compiled,
+                _states,
+            )
+        # Delete cache
+        if not skip_compile:
+            cls.__clean_up(source_folder)
         # Delete old build in sitepackages and copy new build
-        if upgrade is True:
+        if upgrade is True and not (
+            # Copy the changed files straight into site-packages if possible
+            fast_install is True
+            and SiteInstaller.install(source_folder, abs_target_folder)
+        ):
             # Remove old build
             PackageInstaller.uninstall(project_name)
             # Install new build
@@ -284,44 +1048,215 @@ class Builder:
     # Build the latest release
     @classmethod
     def pack(cls, path: str, os_specific: bool = True) -> None:
-        # Upgrade build tool
-        PackageInstaller.install("build")
-        # Upgrade wheel tool
-        PackageInstaller.install("wheel")
-        # Pack files
-        execute_python("-m", "build", "--no-isolation", cwd=path)
-        # If the project is not os specific, then renaming is not needed
+        _options: dict[str, Any] = cls.__load_config(path)[1].get("options", {})
+        # Strip the compiled modules unless disabled or in debug mode
+        if os_specific and cls.__strip_enabled(_options, True):
+            cls.strip(os.path.join(path, "src"))
+        # Only the source code is worth a source distribution
         if not os_specific:
-            return
-        # Rename based on python_ver and compilation environment
-        version_info: list[str] = get_current_python_version()
-        python_ver: str = f"cp{version_info[0]}{version_info[1]}"
-        key_word: str = f"py{version_info[0]}-none-any.whl"
-        _evn: str = (
-            sysconfig.get_platform().replace("-", "_")
-            if is_using_windows()
-            else (
-                "manylinux2014_x86_64"  # PEP 599
-                if sys.platform.startswith("linux")
-                else (
-                    "macosx_11_0_arm64"
-                    if sys.platform.startswith("darwin")
-                    else "none-any"
+            PackageInstaller.install("build")
+            execute_python("-m", "build", "--sdist", "--no-isolation", cwd=path)
+        # Pack the built files into a wheel tagged for the python it is built with,
+        # unless some of the metadata can only be computed by the build backend
+        _wheel_files: list[str] = (
+            cls.__pack_with_backend(path, _options.get("wheel_platform"))
+            if len(load_project(path).get("dynamic", [])) > 0
+            else [
+                WheelBuilder.build(
+                    path,
+                    os.path.join(path, "src"),
+                    os.path.join(path, "dist"),
+                    compression_level=int(_options.get("wheel_compression_level", 6)),
+                    workers=_options.get("workers"),
+                    platform_tag=_options.get("wheel_platform"),
                 )
+            ]
+        )
+        # Let auditwheel check the libraries that the modules link against and
+        # give the wheel the manylinux tag that it is compatible with
+        if _options.get("auditwheel", False) is True and sys.platform.startswith(
+            "linux"
+        ):
+            for _wheel_file in _wheel_files:
+                if not _wheel_file.endswith("-any.whl"):
+                    cls.__repair_wheel(_wheel_file)
+
+    # Replace a linux wheel with the manylinux wheel repaired by auditwheel
+    @staticmethod
+    def __repair_wheel(wheel_file: str) -> None:
+        PackageInstaller.install("auditwheel")
+        execute_python(
+            "-m",
+            "auditwheel",
+            "repair",
+            "--wheel-dir",
+            os.path.dirname(wheel_file),
+            wheel_file,
+        )
+        os.remove(wheel_file)
+
+    # Pack the built files into a wheel with the build backend of the project, the backend
+    # only sees the compiled modules as package data, so the wheel is tagged afterwards
+    @classmethod
+    def __pack_with_backend(cls, path: str, platform_tag: str | None) -> list[str]:
+        PackageInstaller.install("build", "wheel")
+        _output_folder: str = mkdtemp(prefix="linpgtoolbox_wheel_")
+        try:
+            execute_python(
+                "-m",
+                "build",
+                "--wheel",
+                "--no-isolation",
+                "--outdir",
+                _output_folder,
+                cwd=path,
             )
+            _python, _abi, _platform = WheelBuilder.tags(
+                glob(os.path.join(path, "src", "**", "*"), recursive=True),
+                platform_tag,
+            )
+            if _platform != "any":
+                execute_python(
+                    "-m",
+                    "wheel",
+                    "tags",
+                    "--python-tag",
+                    _python,
+                    "--abi-tag",
+                    _abi,
+                    "--platform-tag",
+                    _platform,
+                    "--remove",
+                    *glob(os.path.join(_output_folder, "*.whl")),
+                )
+            os.makedirs(os.path.join(path, "dist"), exist_ok=True)
+            _wheel_files: list[str] = []
+            for _wheel_file in glob(os.path.join(_output_folder, "*.whl")):
+                _wheel_files.append(
+                    os.path.join(path, "dist", os.path.basename(_wheel_file))
+                )
+                shutil.move(_wheel_file, _wheel_files[-1])
+            return _wheel_files
+        finally:
+            cls.remove(_output_folder)
+
+    # Compile and pack the project for one of the python versions in the matrix
+    @classmethod
+    def __pack_version(
+        cls,
+        source_folder: str,
+        shared_folder: str,
+        work_folder: str,
+        python_version: str,
+        project_name: str,
+        _config: dict[str, Any],
+        show_compile_messages: bool,
+        workers: int | None,
+        no_cache: bool,
+        fail_fast: bool,
+        profile: str | None,
+        build_profile: str | None,
+    ) -> float:
+        start_time: float = time.perf_counter()
+        # Commands executed by current thread use the given python version
+        set_python_version(python_version)
+        # Make sure required libraries are installed
+        PackageInstaller.install("setuptools", "cython", "mypy")
+        # The work folder needs the top level files (pyproject.toml, README, etc.) for packing
+        os.makedirs(work_folder)
+        for _file in glob(os.path.join(source_folder, "*")):
+            if os.path.isfile(_file):
+                shutil.copy2(_file, work_folder)
+        abs_target_folder: str = os.path.join(work_folder, "src")
+        shutil.copytree(shared_folder, abs_target_folder)
+        cls.__build(
+            source_folder,
+            abs_target_folder,
+            project_name,
+            _config,
+            False,
+            show_compile_messages,
+            workers,
+            no_cache,
+            fail_fast,
+            profile,
+            build_profile=build_profile,
+            release=True,
         )
-        for _wheel_file in glob(os.path.join(path, "dist", f"*-{key_word}")):
-            os.rename(
+        cls.pack(work_folder)
+        # Collect the wheels
+        os.makedirs(os.path.join(source_folder, "dist"), exist_ok=True)
+        for _wheel_file in glob(os.path.join(work_folder, "dist", "*.whl")):
+            shutil.move(
                 _wheel_file,
-                _wheel_file.replace(
-                    key_word,
-                    f"{python_ver}-{python_ver}-{_evn}.whl",
-                ),
+                os.path.join(source_folder, "dist", os.path.basename(_wheel_file)),
             )
+        return time.perf_counter() - start_time
+
+    # Compile and pack the project for multiple python versions at the same time
+    @classmethod
+    def pack_matrix(
+        cls,
+        source_folder: str,
+        python_versions: list[str],
+        show_compile_messages: bool = False,
+        workers: int | None = None,
+        no_cache: bool = False,
+        fail_fast: bool = False,
+        profile: str | None = None,
+        build_profile: str | None = None,
+    ) -> None:
+        # Convert to abs path
+        source_folder = os.path.abspath(source_folder)
+        # Load config for linpgtoolbox
+        project_name, _config = cls.__load_config(source_folder)
+        # Delete cache
+        cls.__clean_up(source_folder)
+        # Share the cpu cores between all python versions unless specified
+        if workers is None:
+            workers = max((os.cpu_count() or 1) // len(python_versions), 1)
+        matrix_folder: str = mkdtemp(prefix="linpgtoolbox_matrix_")
+        try:
+            # Copy and combine the modules only once for all python versions
+            shared_folder: str = os.path.join(matrix_folder, "shared")
+            cls.__prepare(source_folder, shared_folder, project_name, _config)
+            # Each python version is built in its own work folder
+            with ThreadPoolExecutor(max_workers=len(python_versions)) as executor:
+                futures: dict[str, Future[float]] = {
+                    _version: executor.submit(
+                        cls.__pack_version,
+                        source_folder,
+                        shared_folder,
+                        os.path.join(matrix_folder, _version),
+                        _version,
+                        project_name,
+                        _config,
+                        show_compile_messages,
+                        workers,
+                        no_cache,
+                        fail_fast,
+                        profile,
+                        build_profile,
+                    )
+                    for _version in python_versions
+                }
+            # Report the wall time of each python version
+            print("\n--------------------Report--------------------\n")
+            for _version, _future in futures.items():
+                if _future.exception() is None:
+                    print(f"Python {_version}: done in {_future.result():.2f}s")
+                else:
+                    print(f"Python {_version}: failed ({_future.exception()})")
+            for _future in futures.values():
+                _future.result()
+        finally:
+            cls.remove(matrix_folder)
 
     # Upload the packaged project
     @classmethod
-    def upload(cls, path: str, confirm: bool = True) -> None:
+    def upload(
+        cls, path: str, confirm: bool = True, repository_url: str | None = None
+    ) -> None:
         # Ask user to confirm packed files in dist folder before continuing
         if (
             not confirm
@@ -330,18 +1265,25 @@ class Builder:
             )
             == "Y"
         ):
-            # Upgrade twine
-            PackageInstaller.install("twine")
-            # Upload files using twine
-            execute_python("-m", "twine", "upload", "dist/*", cwd=path)
+            _options: dict[str, Any] = cls.__load_config(path)[1].get("options", {})
+            # Upload files, the ones that have been uploaded are skipped if it fails
+            _errors: dict[str, str] = Uploader.upload(
+                sorted(glob(os.path.join(path, "dist", "*"))),
+                repository_url or _options.get("repository_url"),
+                _options.get("upload_workers"),
+            )
+            if len(_errors) > 0:
+                raise RuntimeError(
+                    f"Failed to upload {len(_errors)} file(s), run again to resume"
+                )
         # Delete cache
         cls.__clean_up(os.path.dirname(path))
 
     # Pack and upload project
     @classmethod
-    def release(cls, path: str) -> None:
+    def release(cls, path: str, repository_url: str | None = None) -> None:
         cls.pack(path)
-        cls.upload(path)
+        cls.upload(path, repository_url=repository_url)
 
     # Zip project source code
     @classmethod
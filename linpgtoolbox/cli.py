@@ -1,7 +1,11 @@
 import argparse
+from subprocess import CalledProcessError
+from typing import Any
 
 from ._execute import set_python_version, sys
 from ._fixer import Fixer
+from .annotation_report import AnnotationReport
+from .benchmark import Benchmark
 from .builder import Builder
 from .image_resizer import ImageResizer
 from .organizer import Organizer
@@ -13,21 +17,81 @@ def cli() -> None:
     parser: argparse.ArgumentParser = argparse.ArgumentParser()
     parser.add_argument("--compile", "-c", type=str, help="Compile project")
     parser.add_argument("--install", "-i", type=str, help="Install project")
+    parser.add_argument(
+        "--fast-install",
+        action="store_true",
+        help="Install the compiled project straight into site-packages instead of through pip",
+    )
     parser.add_argument("--pack", "-p", type=str, help="Pack project")
     parser.add_argument("--upload", type=str, help="Upload packed project to PyPi")
     parser.add_argument(
         "--release", "-r", type=str, help="Pack and upload project to PyPi"
     )
+    parser.add_argument(
+        "--repository-url",
+        type=str,
+        help="Upload to another package index than PyPi (legacy upload API)",
+    )
     parser.add_argument("--organize", "-o", type=str, help="Organize project")
     parser.add_argument("--upgrade", type=str, help="Upgrade a pip package")
     parser.add_argument("--zip", type=str, help="Create a source distribution")
     parser.add_argument("--fix", type=str, help="Create a source distribution")
-    parser.add_argument("--select-py", type=str, help="Select the python version")
+    parser.add_argument(
+        "--select-py",
+        type=str,
+        help="Select the python version (comma separated versions for --pack/--release)",
+    )
     parser.add_argument(
         "--show-compile-messages",
         action="store_true",
         help="Show compile messages instead of progress bar",
     )
+    parser.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        help="Maximum number of parallel compile workers or upgrade batches (default: cpu count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Compile all modules from scratch without using the compile cache",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Cancel all remaining compile jobs once a job fails",
+    )
+    parser.add_argument(
+        "--build-profile",
+        type=str,
+        help='Build profile of cython directives and compiler flags, e.g. "safe" or "fast"',
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Only compile the modules that take most of the time in a cProfile/pstats file",
+    )
+    parser.add_argument(
+        "--bench",
+        type=str,
+        help="Compare import time and benchmarks of compiled and source builds",
+    )
+    parser.add_argument(
+        "--annotate",
+        type=str,
+        help="Rank the functions that still go through the python C-API once compiled",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never use the package index, only local projects and --find-links are installed",
+    )
+    parser.add_argument(
+        "--find-links",
+        type=str,
+        help="Install and upgrade from a local folder of distributions instead of the package index",
+    )
     parser.add_argument(
         "--platform", action="store_true", help="Print current platform information"
     )
@@ -37,7 +101,11 @@ def cli() -> None:
         type=str,
         help="Target size: WxH, N%%, Wx, xH, <Wx, >Wx, <xH, or >xH",
     )
-    parser.add_argument("--output", type=str, help="Output path for resized image")
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Output path for resized image, benchmark results or annotation report (JSON)",
+    )
     parser.add_argument(
         "--overwrite",
         action="store_true",
@@ -58,42 +126,88 @@ def cli() -> None:
     args: argparse.Namespace = parser.parse_args()
 
     # override default python version if given
-    if args.select_py:
-        set_python_version(args.select_py)
+    python_versions: list[str] = (
+        [v.strip() for v in args.select_py.split(",") if len(v.strip()) > 0]
+        if args.select_py
+        else []
+    )
+    if len(python_versions) == 1:
+        set_python_version(python_versions[0])
+    elif len(python_versions) > 1 and not (args.pack or args.release):
+        print("Error: multiple python versions are only supported by --pack/--release")
+        sys.exit(1)
+
+    # never touch pip if offline
+    if args.offline:
+        PackageInstaller.set_offline(find_links=args.find_links)
+    # look for a newer version while the command runs, unless it is asked for explicitly,
+    # or there is no one to tell (e.g. the output is piped or the command runs in ci)
+    elif not args.check_update and sys.stdout.isatty():
+        PackageInstaller.check_for_update_in_background()
+
+    # options shared by all build commands
+    build_options: dict[str, Any] = {
+        "show_compile_messages": args.show_compile_messages,
+        "workers": args.workers,
+        "no_cache": args.no_cache,
+        "fail_fast": args.fail_fast,
+        "profile": args.profile,
+        "build_profile": args.build_profile,
+    }
 
     # eacute operations
-    if args.compile:
-        Builder.compile(args.compile, show_compile_messages=args.show_compile_messages)
-    elif args.install:
-        Builder.compile(
-            args.install, upgrade=True, show_compile_messages=args.show_compile_messages
-        )
-        Builder.remove("src")
-    elif args.zip:
-        Builder.zip(args.zip)
-    elif args.pack:
-        Builder.pack(args.pack)
-    elif args.upload:
-        Builder.upload(args.upload, False)
-    elif args.release:
-        Builder.release(args.release)
-    elif args.organize:
-        Organizer.organize(args.organize)
-    elif args.upgrade:
-        PackageInstaller.upgrade(args.upgrade)
-    elif args.fix:
-        Fixer.match_case_to_if_else(args.fix)
-    elif args.resize:
-        if not args.size:
-            print("Error: --size is required when using --resize")
-            sys.exit(1)
-        ImageResizer.resize(args.resize, args.size, args.output, args.overwrite)
-    elif args.platform:
-        print(f"python[{sys.platform}]-{sys.version}")
-    elif args.reinstall:
-        PackageInstaller.reinstall("linpgtoolbox")
-    elif args.check_update:
-        PackageInstaller.check_for_update()
+    try:
+        if args.compile:
+            Builder.compile(args.compile, **build_options)
+        elif args.install:
+            Builder.compile(
+                args.install,
+                upgrade=True,
+                fast_install=args.fast_install,
+                **build_options,
+            )
+            Builder.remove("src")
+        elif args.zip:
+            Builder.zip(args.zip)
+        elif args.pack:
+            if len(python_versions) > 1:
+                Builder.pack_matrix(args.pack, python_versions, **build_options)
+            else:
+                Builder.pack(args.pack)
+        elif args.upload:
+            Builder.upload(args.upload, False, args.repository_url)
+        elif args.release:
+            if len(python_versions) > 1:
+                Builder.pack_matrix(args.release, python_versions, **build_options)
+                Builder.upload(args.release, repository_url=args.repository_url)
+            else:
+                Builder.release(args.release, args.repository_url)
+        elif args.organize:
+            Organizer.organize(args.organize)
+        elif args.bench:
+            Benchmark.run(args.bench, args.output, **build_options)
+        elif args.annotate:
+            AnnotationReport.run(args.annotate, args.output, **build_options)
+        elif args.upgrade:
+            PackageInstaller.upgrade(args.upgrade, args.find_links, args.workers)
+        elif args.fix:
+            Fixer.match_case_to_if_else(args.fix)
+        elif args.resize:
+            if not args.size:
+                print("Error: --size is required when using --resize")
+                sys.exit(1)
+            ImageResizer.resize(args.resize, args.size, args.output, args.overwrite)
+        elif args.platform:
+            print(f"python[{sys.platform}]-{sys.version}")
+        elif args.reinstall:
+            PackageInstaller.reinstall("linpgtoolbox")
+        elif args.check_update:
+            PackageInstaller.check_for_update()
+    # exit with the status of the failed command
+    except CalledProcessError as e:
+        sys.exit(e.returncode)
+    # tell the user about a newer version if it has been found in the meantime
+    PackageInstaller.notify_update()
 
 
 if __name__ == "__main__":
@@ -1,40 +1,11 @@
-import fnmatch
 import json
 import os
 from typing import Any
 
+from ._gitignore import GitIgnore
 
-class Organizer:
-
-    # parse gitignore file and return a list of patterns
-    @staticmethod
-    def _parse_gitignore(gitignore_path: str) -> list[str]:
-        patterns: list[str] = []
-        if not os.path.isfile(gitignore_path):
-            return patterns
-        with open(gitignore_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                # skip empty lines and comments
-                if line and not line.startswith("#"):
-                    patterns.append(line)
-        return patterns
 
-    # check if a path should be ignored based on gitignore patterns
-    @staticmethod
-    def _is_ignored(
-        name: str, rel_path: str, is_dir: bool, patterns: list[str]
-    ) -> bool:
-        for pattern in patterns:
-            # strip trailing slash for matching, but remember if it's dir-only
-            dir_only: bool = pattern.endswith("/")
-            p: str = pattern.rstrip("/")
-            if dir_only and not is_dir:
-                continue
-            # match against both the name and relative path
-            if fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p):
-                return True
-        return False
+class Organizer:
 
     # organize file or directory
     @classmethod
@@ -55,27 +26,21 @@ class Organizer:
                     unchanged += 1
         # if path is a directory, iterate through all files
         elif os.path.isdir(path):
-            # parse gitignore patterns from the root directory
-            gitignore_patterns: list[str] = cls._parse_gitignore(
-                os.path.join(path, ".gitignore")
-            )
+            # match against the gitignore files of the directory (including nested ones)
+            gitignore: GitIgnore = GitIgnore(path)
             for root, dirs, files in os.walk(path):
                 # filter out ignored directories (modify in-place to prevent os.walk from descending)
                 dirs[:] = [
                     d
                     for d in dirs
-                    if not cls._is_ignored(
-                        d,
-                        os.path.relpath(os.path.join(root, d), path),
-                        True,
-                        gitignore_patterns,
+                    if not gitignore.is_ignored(
+                        os.path.relpath(os.path.join(root, d), path), True
                     )
                 ]
                 for f in files:
                     file_path: str = os.path.join(root, f)
-                    rel_path: str = os.path.relpath(file_path, path)
                     # skip files that match gitignore patterns
-                    if cls._is_ignored(f, rel_path, False, gitignore_patterns):
+                    if gitignore.is_ignored(os.path.relpath(file_path, path), False):
                         continue
                     result: bool = False
                     if f.endswith(".json"):
@@ -1,27 +1,214 @@
 import importlib.metadata
 import json
-import urllib.request
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from subprocess import CalledProcessError
+from tempfile import mkstemp
+from typing import Final
 
-from ._execute import execute_python
+from ._compile_cache import CompileCache
+from ._execute import (
+    capture_python,
+    execute_python,
+    get_current_python_version,
+    is_current_python,
+)
+from ._package_index import PackageIndex
+from ._version import Version, parse_requirement
+
+# Script that prints the installed version of each given distribution as json
+_VERSIONS_SCRIPT: Final[str] = """
+import importlib.metadata, json, sys
+versions = {}
+for name in json.loads(sys.argv[1]):
+    try:
+        versions[name] = importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        versions[name] = None
+print(json.dumps(versions))
+"""
+
+# Script that prints the names of the requirements of each installed distribution as json
+_DEPENDENCIES_SCRIPT: Final[str] = """
+import importlib.metadata, json, re
+dependencies = {}
+for distribution in importlib.metadata.distributions():
+    dependencies[distribution.metadata["Name"]] = [
+        re.split(r"[^A-Za-z0-9._-]", requirement.strip(), maxsplit=1)[0]
+        for requirement in distribution.requires or []
+        if "extra ==" not in requirement
+    ]
+print(json.dumps(dependencies))
+"""
 
 
 class PackageInstaller:
+    # Seconds before the installed packages are checked for newer versions again
+    UPGRADE_CHECK_TTL: int = 24 * 60 * 60
+    # Whether the package index must never be used, e.g. on build hosts without network
+    __offline: bool = False
+    # Local folder of distributions that packages are installed from when offline
+    __find_links: str | None = None
+    # File that records when each package was last checked for newer versions
+    __CHECKED_PATH: Final[str] = os.path.join(
+        CompileCache.default_dir(), "packages.json"
+    )
+    # Builds of several python versions may record the checked packages at the same time
+    __CHECKED_LOCK: Final[threading.Lock] = threading.Lock()
+
+    # never use the package index, the required packages are only checked unless they
+    # can be installed from given local folder of distributions (local projects are
+    # always installed)
+    @classmethod
+    def set_offline(cls, offline: bool = True, find_links: str | None = None) -> None:
+        cls.__offline = offline
+        cls.__find_links = find_links if offline else None
 
     # run pip command
     @staticmethod
     def pip(*cmd: str, cwd: str | None = None) -> None:
         execute_python("-m", "pip", *cmd, cwd=cwd)
 
-    # install a third-party library
+    # get the installed version of each distribution for the selected python
+    @staticmethod
+    def __installed_versions(names: list[str]) -> dict[str, str | None]:
+        if len(names) <= 0:
+            return {}
+        # the selected python may be another interpreter, which has to be asked instead
+        if not is_current_python():
+            return dict(
+                json.loads(
+                    capture_python(
+                        "-c", _VERSIONS_SCRIPT, json.dumps(names)
+                    ).stdout.strip()
+                )
+            )
+        _versions: dict[str, str | None] = {}
+        for _name in names:
+            try:
+                _versions[_name] = importlib.metadata.version(_name)
+            except importlib.metadata.PackageNotFoundError:
+                _versions[_name] = None
+        return _versions
+
+    # get the names of the requirements of each installed distribution for the selected
+    # python (the requirements of extras are not included)
+    @staticmethod
+    def __dependencies() -> dict[str, list[str]]:
+        if not is_current_python():
+            return dict(
+                json.loads(capture_python("-c", _DEPENDENCIES_SCRIPT).stdout.strip())
+            )
+        return {
+            _distribution.metadata["Name"]: [
+                re.split(r"[^A-Za-z0-9._-]", _requirement.strip(), maxsplit=1)[0]
+                for _requirement in _distribution.requires or []
+                if "extra ==" not in _requirement
+            ]
+            for _distribution in importlib.metadata.distributions()
+        }
+
+    # normalize the name of a package, e.g. "Typing_Extensions" -> "typing-extensions"
+    @staticmethod
+    def __normalize(name: str) -> str:
+        return re.sub(r"[-_.]+", "-", name).lower()
+
+    # load when the packages of each python version were last checked for newer versions
+    @classmethod
+    def __load_checked(cls) -> dict[str, dict[str, float]]:
+        try:
+            with open(cls.__CHECKED_PATH, "r", encoding="utf-8") as f:
+                return dict(json.load(f))
+        except (OSError, ValueError):
+            return {}
+
+    # record that the given packages have just been checked for newer versions
+    @classmethod
+    def __save_checked(cls, names: list[str]) -> None:
+        with cls.__CHECKED_LOCK:
+            _checked: dict[str, dict[str, float]] = cls.__load_checked()
+            _python: dict[str, float] = _checked.setdefault(
+                ".".join(get_current_python_version()), {}
+            )
+            for _name in names:
+                _python[_name.lower()] = time.time()
+            os.makedirs(os.path.dirname(cls.__CHECKED_PATH), exist_ok=True)
+            _fd, _temp = mkstemp(dir=os.path.dirname(cls.__CHECKED_PATH), suffix=".tmp")
+            try:
+                with os.fdopen(_fd, "w", encoding="utf-8") as f:
+                    json.dump(_checked, f, indent=4, sort_keys=True)
+                os.replace(_temp, cls.__CHECKED_PATH)
+            except BaseException:
+                os.remove(_temp)
+                raise
+
+    # install third-party libraries, pip is only run (once) for the requirements that are
+    # not satisfied, or not checked for newer versions within the ttl if upgrade is True
     @classmethod
     def install(
-        cls, pkg_name: str, upgrade: bool = True, cwd: str | None = None
+        cls, *pkg_names: str, upgrade: bool = True, cwd: str | None = None
     ) -> None:
-        _cmd: list[str] = ["install", pkg_name]
+        # local projects (given by path) are always installed
+        _local: list[str] = [
+            _name
+            for _name in pkg_names
+            if (os.sep in _name or "/" in _name or _name.startswith("."))
+            and os.path.exists(os.path.join(cwd or "", _name))
+        ]
+        _requirements: dict[str, tuple[str, str]] = {
+            _name: parse_requirement(_name)
+            for _name in pkg_names
+            if _name not in _local
+        }
+        _installed: dict[str, str | None] = cls.__installed_versions(
+            list(dict.fromkeys(_name for _name, _ in _requirements.values()))
+        )
+        _checked: dict[str, float] = cls.__load_checked().get(
+            ".".join(get_current_python_version()), {}
+        )
+        _missing: list[str] = []
+        _outdated: list[str] = []
+        for _requirement, (_name, _specifiers) in _requirements.items():
+            _version: str | None = _installed[_name]
+            if _version is None or (
+                len(_specifiers) > 0 and not Version(_version).matches(_specifiers)
+            ):
+                _missing.append(_requirement)
+            elif (
+                upgrade is True
+                and time.time() - _checked.get(_name.lower(), 0) > cls.UPGRADE_CHECK_TTL
+            ):
+                _outdated.append(_requirement)
+        _index_options: list[str] = []
+        if cls.__offline:
+            # the build requirements of local projects cannot be downloaded either
+            _index_options = ["--no-index", "--no-build-isolation"]
+            if cls.__find_links is not None:
+                _index_options.extend(("--find-links", cls.__find_links))
+            else:
+                for _requirement in _missing:
+                    print(f'Warning: "{_requirement}" is not installed (offline mode)')
+                _missing = []
+            # nothing is checked for newer versions
+            _outdated = []
+        _needed: list[str] = [*_local, *_missing, *_outdated]
+        if len(_needed) <= 0:
+            return
+        _cmd: list[str] = ["install", *_index_options, *_needed]
         # ensure the latest version will be installed
         if upgrade is True:
             _cmd.append("--upgrade")
         cls.pip(*_cmd, cwd=cwd)
+        if upgrade is True and not cls.__offline:
+            cls.__save_checked(
+                [
+                    _requirements[_requirement][0]
+                    for _requirement in (*_missing, *_outdated)
+                ]
+            )
 
     # uninstall a third-party library
     @classmethod
@@ -34,21 +221,151 @@ class PackageInstaller:
         cls.uninstall(pkg_name)
         cls.install(pkg_name)
 
-    # upgrade a third-party library (* for upgrading all third-party libraries)
+    # get the outdated packages of the selected python along with their latest versions
+    @staticmethod
+    def outdated(*index_options: str) -> dict[str, str]:
+        return {
+            str(_package["name"]): str(_package["latest_version"])
+            for _package in json.loads(
+                capture_python(
+                    "-m",
+                    "pip",
+                    "list",
+                    "--outdated",
+                    "--exclude-editable",
+                    "--format=json",
+                    "--disable-pip-version-check",
+                    *index_options,
+                ).stdout
+            )
+        }
+
+    # split the given packages into groups that can be upgraded independently, packages
+    # are in the same group if one of them requires the other (directly or indirectly)
+    @classmethod
+    def __upgrade_groups(cls, names: list[str]) -> list[list[str]]:
+        _requires: dict[str, set[str]] = {}
+        for _name, _dependencies in cls.__dependencies().items():
+            _requires.setdefault(cls.__normalize(_name), set()).update(
+                cls.__normalize(_dependency) for _dependency in _dependencies
+            )
+        _names: dict[str, str] = {cls.__normalize(_name): _name for _name in names}
+        _parents: dict[str, str] = {_name: _name for _name in _names}
+
+        def _find(_name: str) -> str:
+            while _parents[_name] != _name:
+                _parents[_name] = _parents[_parents[_name]]
+                _name = _parents[_name]
+            return _name
+
+        for _name in _names:
+            # walk through all the packages that the package requires
+            _visited: set[str] = {_name}
+            _pending: list[str] = [_name]
+            while len(_pending) > 0:
+                for _dependency in _requires.get(_pending.pop(), ()):
+                    if _dependency not in _visited:
+                        _visited.add(_dependency)
+                        _pending.append(_dependency)
+                        if _dependency in _names:
+                            _parents[_find(_dependency)] = _find(_name)
+        _groups: dict[str, list[str]] = {}
+        for _name, _original in _names.items():
+            _groups.setdefault(_find(_name), []).append(_original)
+        return sorted(_groups.values(), key=len, reverse=True)
+
+    # upgrade the given packages with one pip run, then one run per package to find out
+    # which ones fail if the batch fails, return the error of each package that fails
     @classmethod
-    def upgrade(cls, name: str = "*") -> None:
+    def __upgrade_batch(
+        cls, names: list[str], index_options: tuple[str, ...]
+    ) -> dict[str, str]:
+        _cmd: tuple[str, ...] = (
+            "-m",
+            "pip",
+            "install",
+            "--upgrade",
+            "--disable-pip-version-check",
+            *index_options,
+        )
+        try:
+            capture_python(*_cmd, *names)
+            return {}
+        except CalledProcessError as e:
+            if len(names) <= 1:
+                return {_name: str(e.stderr).strip() for _name in names}
+        _errors: dict[str, str] = {}
+        for _name in names:
+            _errors.update(cls.__upgrade_batch([_name], index_options))
+        return _errors
+
+    # upgrade a third-party library (* for upgrading all third-party libraries), packages
+    # can also be upgraded from a local folder of distributions instead of the index
+    @classmethod
+    def upgrade(
+        cls, name: str = "*", find_links: str | None = None, workers: int | None = None
+    ) -> None:
+        _index_options: tuple[str, ...] = (
+            ("--no-index", "--find-links", find_links) if find_links is not None else ()
+        )
+        if cls.__offline:
+            print("Warning: packages cannot be upgraded in offline mode")
+            return
         # only upgrade given third-party library
         if name != "*":
-            cls.install(name)
+            cls.pip("install", name, "--upgrade", *_index_options)
+            return
+        # upgrade all third-party libraries that are outdated
+        _outdated: dict[str, str] = {
+            _name: _version
+            for _name, _version in cls.outdated(*_index_options).items()
+            if not _name.startswith("_")
+        }
+        if len(_outdated) <= 0:
+            print("All packages are up to date.")
             return
-        # upgrade all third-party libraries
-        for distribution in importlib.metadata.distributions():
-            name = distribution.metadata["Name"]
-            if not name.startswith("_"):
-                try:
-                    cls.install(name)
-                except Exception:
-                    print(f"Warning: fail to update third party package <{name}>")
+        print(f"Upgrading {len(_outdated)} package(s)...")
+        _errors: dict[str, str] = {}
+        # pip itself is used by all the other runs, so it is upgraded first
+        for _name in [_name for _name in _outdated if cls.__normalize(_name) == "pip"]:
+            _errors.update(cls.__upgrade_batch([_name], _index_options))
+        _groups: list[list[str]] = cls.__upgrade_groups(
+            [_name for _name in _outdated if cls.__normalize(_name) != "pip"]
+        )
+        # distribute the independent groups evenly to the batches, the biggest groups first
+        _batches: list[list[str]] = [
+            [] for _ in range(max(min(workers or os.cpu_count() or 1, len(_groups)), 1))
+        ]
+        for _group in _groups:
+            min(_batches, key=len).extend(_group)
+        with ThreadPoolExecutor(max_workers=len(_batches)) as _executor:
+            for _future in as_completed(
+                _executor.submit(cls.__upgrade_batch, _batch, _index_options)
+                for _batch in _batches
+                if len(_batch) > 0
+            ):
+                _errors.update(_future.result())
+        # pip may settle for an older version than the latest one without failing,
+        # e.g. when the requirements of the latest version cannot be satisfied
+        for _name, _installed in cls.__installed_versions(
+            [_name for _name in _outdated if _name not in _errors]
+        ).items():
+            if _installed is None or Version(_installed) < Version(_outdated[_name]):
+                _errors[_name] = (
+                    f"{_installed} is installed instead of {_outdated[_name]}"
+                )
+        for _name, _version in _outdated.items():
+            if _name not in _errors:
+                print(f"  {_name} -> {_version}")
+        if len(_errors) > 0:
+            print(f"Failed to upgrade {len(_errors)} package(s):")
+            for _name, _error in _errors.items():
+                _lines: list[str] = _error.splitlines()
+                print(
+                    f"  {_name}: {_lines[-1] if len(_lines) > 0 else 'unknown error'}"
+                )
+        # the packages are up to date now, no need to check them again within the ttl
+        cls.__save_checked([_name for _name in _outdated if _name not in _errors])
 
     # get the currently installed version of linpgtoolbox
     @staticmethod
@@ -62,23 +379,47 @@ class PackageInstaller:
         current: str = cls.get_current_version()
         print(f"Current version: {current}")
         try:
-            with urllib.request.urlopen(
-                f"https://pypi.org/pypi/{pkg_name}/json", timeout=10
-            ) as response:
-                latest: str = json.loads(response.read())["info"]["version"]
+            # always ask the index, which only sends the versions again if they changed
+            latest: str | None = PackageIndex.latest_version(
+                pkg_name, Version(current).is_prerelease, ttl=0
+            )
         except Exception:
             print("Failed to fetch latest version from PyPI.")
             return
+        if latest is None:
+            print("Failed to fetch latest version from PyPI.")
+            return
         print(f"Latest version:  {latest}")
-        current_parts: tuple[int, ...] = tuple(int(x) for x in current.split("."))
-        latest_parts: tuple[int, ...] = tuple(int(x) for x in latest.split("."))
-        if current_parts >= latest_parts:
+        if Version(current) >= Version(latest):
             print("linpgtoolbox is up to date.")
         else:
             answer: str = input(
                 f"A newer version ({latest}) is available. Update now? [y/N] "
             )
             if answer.strip().lower() in ("y", "yes"):
-                cls.install(pkg_name)
+                cls.pip("install", pkg_name, "--upgrade")
             else:
                 print("Update skipped.")
+
+    # look up the latest version of linpgtoolbox in the background, so that the user can be
+    # told about it once the command is done without waiting for PyPI
+    @classmethod
+    def check_for_update_in_background(cls) -> None:
+        if cls.__offline:
+            return
+        try:
+            current: str = cls.get_current_version()
+        except importlib.metadata.PackageNotFoundError:
+            return
+        PackageIndex.fetch_in_background("linpgtoolbox", Version(current).is_prerelease)
+
+    # tell the user about a newer version of linpgtoolbox, if the background lookup has found one
+    @classmethod
+    def notify_update(cls) -> None:
+        latest: str | None = PackageIndex.fetched("linpgtoolbox")
+        # the lookup only starts if linpgtoolbox is installed
+        if latest is not None and Version(latest) > Version(cls.get_current_version()):
+            print(
+                f"\nA newer version of linpgtoolbox ({latest}) is available,"
+                " run linpgtb --check-update to update."
+            )
@@ -0,0 +1,268 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox import builder
+from linpgtoolbox._execute import set_python_version
+from linpgtoolbox.builder import Builder
+from linpgtoolbox.pkginstaller import PackageInstaller
+
+
+# Create a small project with a package of a few modules
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    _root: Path = tmp_path / "project"
+    (_root / "demo" / "sub").mkdir(parents=True)
+    (_root / "pyproject.toml").write_text(textwrap.dedent("""
+            [project]
+            name = "demo"
+            version = "0.1"
+
+            [tool.linpgtoolbox]
+            includes = []
+
+            [tool.setuptools.packages.find]
+            where = ["src"]
+            """))
+    (_root / "demo" / "__init__.py").write_text("from .a import add\n")
+    (_root / "demo" / "a.py").write_text(
+        "def add(x: int, y: int) -> int:\n    return x + y\n"
+    )
+    (_root / "demo" / "sub" / "__init__.py").write_text("")
+    (_root / "demo" / "sub" / "b.py").write_text("VALUE: int = 42\n")
+    return _root
+
+
+# Two builds of the same project into different target folders may run at the same time
+def test_concurrent_compiles_do_not_collide(
+    project: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # keep the temporary files and the caches of the builds apart from the rest of the system
+    _temp_dir: Path = tmp_path / "tmp"
+    _temp_dir.mkdir()
+    monkeypatch.setenv("TMPDIR", str(_temp_dir))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(tempfile, "tempdir", None)
+    PackageInstaller.set_offline()
+    # record the configuration files and build directories each build gets
+    _temp_paths: list[str] = []
+    _mkstemp = builder.mkstemp
+    _mkdtemp = builder.mkdtemp
+
+    def _record_mkstemp(*args: str, **kwargs: str) -> tuple[int, str]:
+        _fd, _path = _mkstemp(*args, **kwargs)
+        _temp_paths.append(_path)
+        return _fd, _path
+
+    def _record_mkdtemp(*args: str, **kwargs: str) -> str:
+        _temp_paths.append(_path := _mkdtemp(*args, **kwargs))
+        return _path
+
+    monkeypatch.setattr(builder, "mkstemp", _record_mkstemp)
+    monkeypatch.setattr(builder, "mkdtemp", _record_mkdtemp)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as _executor:
+            _futures = [
+                _executor.submit(
+                    Builder.compile,
+                    str(project),
+                    _target,
+                    show_success_message=False,
+                    workers=2,
+                )
+                for _target in ("out_a", "out_b")
+            ]
+            for _future in _futures:
+                _future.result()
+    finally:
+        PackageInstaller.set_offline(False)
+    # each build has its own configuration file and build directory
+    assert len(_temp_paths) == 4
+    assert len(set(_temp_paths)) == 4
+    # and none of them is left behind, nor is anything written into the project
+    assert not any(os.path.exists(_path) for _path in _temp_paths)
+    assert list(_temp_dir.iterdir()) == []
+    assert sorted(_path.name for _path in project.iterdir()) == [
+        "demo",
+        "out_a",
+        "out_b",
+        "pyproject.toml",
+    ]
+    # both builds are complete and can be imported
+    for _target in ("out_a", "out_b"):
+        _extensions: list[Path] = list(
+            (project / _target / "demo").rglob("*.so")
+        ) + list((project / _target / "demo").rglob("*.pyd"))
+        assert len(_extensions) == 4
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import demo, demo.sub.b; assert demo.add(1, 2) == 3; assert demo.sub.b.VALUE == 42",
+            ],
+            cwd=project / _target,
+            check=True,
+        )
+
+
+# The cmake stage runs in another thread, but it has to use the python selected by the build
+def test_cmake_uses_the_selected_python(
+    project: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if shutil.which("cmake") is None:
+        pytest.skip("cmake is not installed")
+    # any python other than the one running the tests
+    _version: str | None = next(
+        (
+            _v
+            for _v in ("3.11", "3.12", "3.13", "3.14")
+            if _v != f"{sys.version_info.major}.{sys.version_info.minor}"
+            and subprocess.run(
+                [f"python{_v}", "-c", ""], capture_output=True
+            ).returncode
+            == 0
+        ),
+        None,
+    )
+    if _version is None:
+        pytest.skip("no other python version is installed")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    with open(project / "pyproject.toml", "a", encoding="utf-8") as f:
+        f.write("\n[tool.linpgtoolbox.options]\nauto_cmake = true\n")
+    # the "module" that cmake builds is the python it has been configured with
+    (project / "demo" / "CMakeLists.txt").write_text(
+        "cmake_minimum_required(VERSION 3.15)\n"
+        "project(probe NONE)\n"
+        'file(WRITE "${CMAKE_BINARY_DIR}/python.so" "${Python_EXECUTABLE}")\n'
+    )
+
+    def _compile() -> None:
+        set_python_version(_version)
+        Builder.compile(
+            str(project), "out", skip_compile=True, show_success_message=False
+        )
+
+    PackageInstaller.set_offline()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as _executor:
+            _executor.submit(_compile).result()
+    finally:
+        PackageInstaller.set_offline(False)
+    _expected: str = subprocess.run(
+        [f"python{_version}", "-c", "import sys; print(sys.executable)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    assert (project / "out" / "demo" / "python.so").read_text() == _expected
+    assert not (project / "out" / "demo" / "CMakeLists.txt").exists()
+
+
+# A failed job fails the build, and with fail-fast the jobs that have not started are cancelled
+@pytest.mark.parametrize("fail_fast", [False, True])
+def test_failed_job_sets_the_exit_code(
+    project: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capfd: pytest.CaptureFixture[str],
+    fail_fast: bool,
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # the largest module is estimated to take the longest, so its jobs are the first to run
+    (project / "demo" / "broken.py").write_text(
+        "#" * 100000 + "\ndef broken(:\n    pass\n"
+    )
+    PackageInstaller.set_offline()
+    try:
+        with pytest.raises(subprocess.CalledProcessError) as _error:
+            Builder.compile(
+                str(project),
+                show_success_message=False,
+                workers=1,
+                fail_fast=fail_fast,
+            )
+    finally:
+        PackageInstaller.set_offline(False)
+    assert _error.value.returncode == 1
+    _output: str = capfd.readouterr().out
+    assert "job(s) failed" in _output and "broken.py" in _output
+    _compiled: list[Path] = list((project / "src" / "demo").rglob("*.so")) + list(
+        (project / "src" / "demo").rglob("*.pyd")
+    )
+    if fail_fast:
+        # nothing else has been compiled once the first job failed
+        assert "job(s) cancelled" in _output
+        assert _compiled == []
+        assert (project / "src" / "demo" / "a.py").exists()
+    else:
+        assert "job(s) cancelled" not in _output
+        assert len(_compiled) == 4
+
+
+# Incremental sync only copies the files that have changed and deletes the ones that are gone
+def test_sync_copies_changed_files_and_deletes_stale_ones(tmp_path: Path) -> None:
+    _source: Path = tmp_path / "source"
+    _target: Path = tmp_path / "target"
+    (_source / "pkg").mkdir(parents=True)
+    (_source / "pkg" / "kept.txt").write_text("kept")
+    (_source / "pkg" / "changed.txt").write_text("old")
+    (_source / "gone.txt").write_text("gone")
+    Builder.sync(str(_source), str(_target), link="copy")
+    _kept_stat: os.stat_result = (_target / "pkg" / "kept.txt").stat()
+    # a change that keeps the size and the mtime in whole seconds
+    _changed_stat: os.stat_result = (_source / "pkg" / "changed.txt").stat()
+    (_source / "pkg" / "changed.txt").write_text("new")
+    os.utime(
+        _source / "pkg" / "changed.txt",
+        ns=(_changed_stat.st_atime_ns, _changed_stat.st_mtime_ns + 1000),
+    )
+    (_source / "gone.txt").unlink()
+    (_target / "pkg" / "stale.txt").write_text("stale")
+    Builder.sync(str(_source), str(_target), link="copy")
+    assert (_target / "pkg" / "kept.txt").stat().st_ino == _kept_stat.st_ino
+    assert (_target / "pkg" / "kept.txt").stat().st_mtime_ns == _kept_stat.st_mtime_ns
+    assert (_target / "pkg" / "changed.txt").read_text() == "new"
+    assert not (_target / "gone.txt").exists()
+    assert not (_target / "pkg" / "stale.txt").exists()
+
+
+# The modules that have not changed since the last build are neither copied nor compiled again
+def test_incremental_build_only_compiles_changed_modules(
+    project: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capfd: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    _package: Path = project / "src" / "demo"
+
+    def _compile() -> str:
+        capfd.readouterr()
+        Builder.compile(str(project), show_success_message=False)
+        return capfd.readouterr().out
+
+    PackageInstaller.set_offline()
+    try:
+        assert "Compile cache: 0 hit(s), 4 miss(es)" in _compile()
+        _compiled: Path = next(_package.glob("a.*.so"))
+        _compiled_stat: os.stat_result = _compiled.stat()
+        (project / "demo" / "sub" / "b.py").write_text("VALUE: int = 43\n")
+        # only b is compiled, the __init__ files are restored from the compile cache
+        assert "Compile cache: 2 hit(s), 1 miss(es)" in _compile()
+        assert _compiled.stat().st_ino == _compiled_stat.st_ino
+        assert not (_package / "a.py").exists()
+        assert (_package / "a.pyi").exists()
+        # the outputs of a module that is gone are removed
+        (project / "demo" / "sub" / "b.py").unlink()
+        _compile()
+        assert list((_package / "sub").glob("b.*")) == []
+        assert _compiled.exists()
+    finally:
+        PackageInstaller.set_offline(False)
@@ -0,0 +1,100 @@
+import ast
+from pathlib import Path
+from typing import Any
+
+from linpgtoolbox._combiner import ModuleCombiner
+
+
+# The imports of the combined modules are hoisted once per name they bind
+def test_hoisted_imports_are_deduplicated_by_name(tmp_path: Path) -> None:
+    _package: Path = tmp_path / "demo"
+    _package.mkdir()
+    (_package / "__init__.py").write_text(
+        "import os\nfrom .a import *\nfrom .b import *\n"
+    )
+    (_package / "a.py").write_text(
+        "import os, sys\nfrom typing import Any\n\ndef a() -> Any:\n    return os.sep\n"
+    )
+    (_package / "b.py").write_text(
+        "import sys as sys\nfrom typing import Any, Final\n\nB: Final[Any] = 1\n"
+    )
+    (_package / "c.py").write_text("C = 1\n")
+    ModuleCombiner.combine(str(_package))
+    _tree: ast.Module = ast.parse((_package / "__init__.py").read_text())
+    _imports: list[str] = [
+        ast.unparse(_node)
+        for _node in _tree.body
+        if isinstance(_node, (ast.Import, ast.ImportFrom))
+    ]
+    assert _imports == ["import os", "import sys", "from typing import Any, Final"]
+    _namespace: dict[str, object] = {}
+    exec(compile(_tree, "__init__.py", "exec"), _namespace)
+    assert _namespace["B"] == 1
+
+
+# The comments are kept, and the compiler directives stay in the header of the file
+def test_comments_and_compiler_directives_survive(tmp_path: Path) -> None:
+    _package: Path = tmp_path / "demo"
+    _package.mkdir()
+    (_package / "__init__.py").write_text(
+        '# Copyright (c) demo\n"""Demo."""\nfrom .a import *\nfrom .b import *\n'
+    )
+    (_package / "a.py").write_text(
+        "# cython: boundscheck=False\n# License: MIT\nimport os\n\n"
+        "def a() -> str:\n    return os.sep  # type: ignore\n"
+    )
+    (_package / "b.py").write_text(
+        "# cython: boundscheck=False\nimport os; import sys\n\nB = sys.platform\n"
+    )
+    ModuleCombiner.combine(str(_package))
+    _content: str = (tmp_path / "demo.py").read_text()
+    assert _content.startswith("# cython: boundscheck=False\n# Copyright (c) demo\n")
+    assert _content.count("# cython: boundscheck=False") == 1
+    assert "# License: MIT" in _content
+    assert "return os.sep  # type: ignore" in _content
+    _namespace: dict[str, object] = {}
+    exec(compile(_content, "demo.py", "exec"), _namespace)
+    assert _namespace["__doc__"] == "Demo."
+
+
+# Modules that do not agree on the __future__ imports or directives are left as they are
+def test_modules_with_different_headers_are_not_combined(tmp_path: Path) -> None:
+    _package: Path = tmp_path / "demo"
+    _package.mkdir()
+    (_package / "__init__.py").write_text("from .a import *\nfrom .b import *\n")
+    (_package / "a.py").write_text("from __future__ import annotations\nA = 1\n")
+    (_package / "b.py").write_text("# cython: boundscheck=False\nB = 2\n")
+    ModuleCombiner.combine(str(_package))
+    assert sorted(_path.name for _path in _package.iterdir()) == [
+        "__init__.py",
+        "a.py",
+        "b.py",
+    ]
+
+
+# A private name of more than one module is renamed in all but the first one
+def test_colliding_private_names_are_renamed(tmp_path: Path) -> None:
+    _package: Path = tmp_path / "demo"
+    _package.mkdir()
+    (_package / "__init__.py").write_text("from .a import *\nfrom .b import *\n")
+    (_package / "a.py").write_text(
+        '_logger = "a"\n\ndef get_a() -> str:\n    return _logger\n'
+    )
+    (_package / "b.py").write_text(
+        "from .a import get_a as _get_a\n\n"
+        '_logger = "b"\n\n'
+        "def get_b(_logger: str = _logger) -> str:\n"
+        "    return _logger + _get_a()\n\n"
+        "def set_b(value: str) -> None:\n"
+        "    global _logger\n"
+        "    _logger = value\n\n"
+        "def read_b() -> str:\n"
+        "    return [_logger for _ in range(1)][0]\n"
+    )
+    ModuleCombiner.combine(str(_package))
+    _namespace: dict[str, Any] = {}
+    exec((tmp_path / "demo.py").read_text(), _namespace)
+    assert _namespace["get_a"]() == "a"
+    assert _namespace["get_b"]() == "ba"
+    _namespace["set_b"]("c")
+    assert (_namespace["read_b"](), _namespace["get_a"]()) == ("c", "a")
@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox._compile_cache import CompileCache
+
+# Options that the compiler sets up the cache with by default
+_OPTIONS: dict[str, bool] = {"debug_mode": False, "annotate": False, "keep_c": False}
+
+
+# Create a cache that is set up with given options
+def _cache(tmp_path: Path, size_limit_mb: int = 100, **options: bool) -> CompileCache:
+    _compile_cache: CompileCache = CompileCache(str(tmp_path / "cache"), size_limit_mb)
+    _compile_cache.setup(_OPTIONS | options)
+    return _compile_cache
+
+
+# Create the source of a module and the files that compiling it generates
+def _compiled_module(tmp_path: Path, name: str, content: str, size: int = 10) -> str:
+    _path: Path = tmp_path / "demo" / f"{name}.py"
+    _path.parent.mkdir(exist_ok=True)
+    _path.write_text(content)
+    _path.with_name(name + CompileCache.extension_suffix()).write_bytes(b"\0" * size)
+    _path.with_name(name + ".pyi").write_text(content)
+    return str(_path)
+
+
+# Remove the generated files of a module
+def _remove_outputs(path: str) -> None:
+    for _suffix in (CompileCache.extension_suffix(), ".pyi"):
+        os.remove(os.path.splitext(path)[0] + _suffix)
+
+
+# A module that has been stored is restored as long as it has not changed
+def test_restore_hits_unchanged_module_and_misses_changed_one(tmp_path: Path) -> None:
+    _compile_cache: CompileCache = _cache(tmp_path)
+    _path: str = _compiled_module(tmp_path, "a", "VALUE = 1\n")
+    _source_folder: str = str(tmp_path / "demo")
+    _key: str = _compile_cache.key(_source_folder, _path)
+    assert not _compile_cache.restore(_key, _path)
+    _compile_cache.store(_key, _path)
+    _remove_outputs(_path)
+    assert _compile_cache.restore(_compile_cache.key(_source_folder, _path), _path)
+    assert (tmp_path / "demo" / "a.pyi").read_text() == "VALUE = 1\n"
+    assert (tmp_path / "demo" / f"a{CompileCache.extension_suffix()}").exists()
+    # any change of the source is a different module
+    Path(_path).write_text("VALUE = 2\n")
+    assert _compile_cache.key(_source_folder, _path) != _key
+    assert not _compile_cache.restore(_compile_cache.key(_source_folder, _path), _path)
+    assert (_compile_cache.hits, _compile_cache.misses) == (1, 2)
+
+
+# The options that change the compiled output are part of the key
+@pytest.mark.parametrize("option", ["annotate", "debug_mode"])
+def test_key_depends_on_compile_options(tmp_path: Path, option: str) -> None:
+    _path: str = _compiled_module(tmp_path, "a", "VALUE = 1\n")
+    _source_folder: str = str(tmp_path / "demo")
+    _key: str = _cache(tmp_path).key(_source_folder, _path)
+    assert _cache(tmp_path).key(_source_folder, _path) == _key
+    assert _cache(tmp_path, **{option: True}).key(_source_folder, _path) != _key
+    # so do the settings of the build profile that only apply to the module
+    assert (
+        _cache(tmp_path).key(
+            _source_folder, _path, {"directives": {"boundscheck": False}}
+        )
+        != _key
+    )
+
+
+# Eviction removes the least recently used entries until the cache fits in its size limit
+def test_evict_removes_least_recently_used_entries(tmp_path: Path) -> None:
+    _compile_cache: CompileCache = _cache(tmp_path, size_limit_mb=1)
+    _source_folder: str = str(tmp_path / "demo")
+    _keys: dict[str, str] = {}
+    for _name in ("a", "b", "c"):
+        _path: str = _compiled_module(tmp_path, _name, f"NAME = {_name!r}\n", 400000)
+        _keys[_name] = _compile_cache.key(_source_folder, _path)
+        _compile_cache.store(_keys[_name], _path)
+        _remove_outputs(_path)
+    # a and b were used long ago, but a is used again
+    for _time, _name in enumerate(("a", "b"), 1000):
+        _stamp: Path = tmp_path / "cache" / _keys[_name][:2] / _keys[_name] / ".stamp"
+        os.utime(_stamp, (_time, _time))
+    assert _compile_cache.restore(_keys["a"], str(tmp_path / "demo" / "a.py"))
+    _compile_cache.evict()
+    assert [
+        _name
+        for _name, _key in _keys.items()
+        if (tmp_path / "cache" / _key[:2] / _key).exists()
+    ] == ["a", "c"]
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+from linpgtoolbox._compile_history import CompileHistory
+
+
+# Load a history file with given records
+def _load_history(
+    tmp_path: Path, records: dict[str, dict[str, float]]
+) -> CompileHistory:
+    _path: Path = tmp_path / "history.json"
+    _path.write_text(json.dumps(records))
+    return CompileHistory(str(_path))
+
+
+# Create the source file of a module
+def _source(tmp_path: Path, module: str, size: int) -> str:
+    _path: Path = tmp_path / f"{module}.py"
+    _path.write_text("#" * size)
+    return str(_path)
+
+
+# The modules that took the longest in previous builds are estimated to take the longest
+def test_recorded_durations_order_the_jobs_longest_first(tmp_path: Path) -> None:
+    _history: CompileHistory = _load_history(
+        tmp_path,
+        {
+            "demo.fast": {"cythonize": 0.5, "compile": 0.5, "stubgen": 9.0},
+            "demo.slow": {"cythonize": 2.0, "compile": 8.0},
+            "demo.medium": {"compile": 3.0},
+        },
+    )
+    _paths: dict[str, str] = {
+        module: _source(tmp_path, module, 100)
+        for module in ("demo.fast", "demo.slow", "demo.medium", "demo.new")
+    }
+    _estimates: dict[str, float] = _history.estimate(_paths, "cythonize", "compile")
+    assert _estimates["demo.slow"] == 10.0
+    # a module without history is estimated from the size of the known ones
+    assert _estimates["demo.new"] == (10.0 + 1.0 + 3.0) / 300 * 100
+    assert sorted(_estimates, key=_estimates.__getitem__, reverse=True) == [
+        "demo.slow",
+        "demo.new",
+        "demo.medium",
+        "demo.fast",
+    ]
+
+
+# A module that only has other stages recorded is not known to be instant
+def test_module_without_requested_stages_is_unknown(tmp_path: Path) -> None:
+    _history: CompileHistory = _load_history(
+        tmp_path,
+        {
+            "demo.known": {"compile": 4.0},
+            "demo.memory_only": {"c_size": 1000, "peak_memory": 300.0},
+            "demo.stub_only": {"stubgen": 1.0},
+        },
+    )
+    assert _history.get("demo.memory_only", "cythonize", "compile") is None
+    assert _history.get("demo.stub_only", "cythonize", "compile") is None
+    assert _history.get("demo.stub_only", "stubgen") == 1.0
+    assert _history.get("demo.known") == 4.0
+    _estimates: dict[str, float] = _history.estimate(
+        {
+            module: _source(tmp_path, module, 100)
+            for module in ("demo.known", "demo.memory_only", "demo.stub_only")
+        },
+        "cythonize",
+        "compile",
+    )
+    assert _estimates == {
+        "demo.known": 4.0,
+        "demo.memory_only": 4.0,
+        "demo.stub_only": 4.0,
+    }
@@ -0,0 +1,147 @@
+import json
+import multiprocessing
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+from setuptools import Extension, setup
+
+from linpgtoolbox import _compiler
+from linpgtoolbox._compile_cache import ObjectCache
+from linpgtoolbox._compile_history import CompileHistory
+
+# Extension module that returns a value defined by a header it includes
+_MODULE_SOURCE: str = textwrap.dedent("""
+    #include <Python.h>
+    #include "value.h"
+
+    static PyObject *value(PyObject *self, PyObject *args) {
+        return PyLong_FromLong(VALUE);
+    }
+
+    static PyMethodDef methods[] = {
+        {"value", value, METH_NOARGS, NULL},
+        {NULL, NULL, 0, NULL},
+    };
+
+    static struct PyModuleDef module = {PyModuleDef_HEAD_INIT, "valuemod", NULL, -1, methods};
+
+    PyMODINIT_FUNC PyInit_valuemod(void) {
+        return PyModule_Create(&module);
+    }
+    """)
+
+
+# Build the extension module into given folder with the object cache enabled
+def _build(root: Path, build_lib: str) -> int:
+    setup(
+        name="valuemod",
+        ext_modules=[
+            Extension(
+                "valuemod",
+                [str(root / "valuemod.c")],
+                include_dirs=[str(root / "include")],
+            )
+        ],
+        script_args=[
+            "build_ext",
+            "--build-lib",
+            str(root / build_lib),
+            "--build-temp",
+            str(root / f"{build_lib}_temp"),
+        ],
+        cmdclass={"build_ext": _compiler._CachedBuildExt},
+    )
+    return int(
+        subprocess.run(
+            [sys.executable, "-c", "import valuemod; print(valuemod.value())"],
+            cwd=root / build_lib,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    )
+
+
+# The object cache is keyed on the preprocessed code, so it notices changes of the headers
+def test_object_cache_notices_header_changes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "include").mkdir()
+    (tmp_path / "valuemod.c").write_text(_MODULE_SOURCE)
+    (tmp_path / "include" / "value.h").write_text("#define VALUE 1\n")
+    _stats = multiprocessing.Array("i", 3)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(_compiler, "_object_cache_stats", _stats)
+    monkeypatch.setattr(
+        _compiler, "_object_cache", ObjectCache(str(tmp_path / "objects"), 0)
+    )
+    assert _build(tmp_path, "first") == 1
+    assert list(_stats) == [0, 1, 0]
+    # the same code is restored from the cache
+    assert _build(tmp_path, "second") == 1
+    assert list(_stats) == [1, 1, 0]
+    # a changed header under the same include dir must not reuse the cached module
+    (tmp_path / "include" / "value.h").write_text("#define VALUE 2\n")
+    assert _build(tmp_path, "third") == 2
+    assert list(_stats) == [1, 2, 0]
+
+
+# Modules that cannot be preprocessed are built as usual, but never cached
+def test_object_cache_skips_modules_that_cannot_be_preprocessed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # the distutils that setuptools provides, which build_ext uses
+    from distutils.ccompiler import new_compiler
+
+    (tmp_path / "include").mkdir()
+    (tmp_path / "valuemod.c").write_text(_MODULE_SOURCE)
+    (tmp_path / "include" / "value.h").write_text("#define VALUE 3\n")
+    _stats = multiprocessing.Array("i", 3)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(_compiler, "_object_cache_stats", _stats)
+    monkeypatch.setattr(
+        _compiler, "_object_cache", ObjectCache(str(tmp_path / "objects"), 0)
+    )
+    # e.g. msvc, which does nothing when asked to preprocess
+    monkeypatch.setattr(
+        type(new_compiler()), "preprocess", lambda *args, **kwargs: None
+    )
+    assert _build(tmp_path, "first") == 3
+    assert _build(tmp_path, "second") == 3
+    assert list(_stats) == [0, 0, 2]
+    assert not (tmp_path / "objects").exists()
+
+
+# Jobs only start while the estimated memory of all running jobs stays within the budget
+def test_jobs_are_admitted_within_the_memory_budget(tmp_path: Path) -> None:
+    _history_path: Path = tmp_path / "history.json"
+    _history_path.write_text(
+        json.dumps(
+            {
+                "demo.big": {"compile": 9.0, "peak_memory": 700.0},
+                "demo.medium": {"compile": 5.0, "peak_memory": 400.0},
+                "demo.small": {"compile": 1.0, "peak_memory": 200.0},
+                "demo.tiny": {"compile": 0.5, "peak_memory": 100.0},
+            }
+        )
+    )
+    _history: CompileHistory = CompileHistory(str(_history_path))
+    _paths: dict[str, str] = {}
+    for _module in ("demo.tiny", "demo.small", "demo.medium", "demo.big"):
+        (tmp_path / f"{_module}.py").write_text("")
+        _paths[_module] = str(tmp_path / f"{_module}.py")
+    # the jobs are queued from the longest to the shortest
+    _estimates: dict[str, float] = _history.estimate(_paths, "compile")
+    _order: list[str] = sorted(_paths, key=_estimates.__getitem__, reverse=True)
+    assert _order == ["demo.big", "demo.medium", "demo.small", "demo.tiny"]
+    _memory: list[float] = [_history.estimate_memory(_paths)[_m] for _m in _order]
+    # the medium job does not fit next to the big one, but the smaller ones do
+    assert _compiler._admit([0, 1, 2, 3], _memory, [], 1000.0, 4) == [0, 2, 3]
+    assert _compiler._admit([1], _memory, [700.0, 200.0], 1000.0, 4) == []
+    # a job that exceeds the budget on its own still runs once nothing else does
+    assert _compiler._admit([0], _memory, [], 500.0, 4) == [0]
+    # without a budget, only the number of workers limits the jobs
+    assert _compiler._admit([0, 1, 2, 3], _memory, [100.0], None, 3) == [0, 1]
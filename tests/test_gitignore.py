@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox._gitignore import GitIgnore
+
+
+# Create a tree with the given .gitignore files
+def _gitignore(tmp_path: Path, files: dict[str, str]) -> GitIgnore:
+    for _directory, _content in files.items():
+        (tmp_path / _directory).mkdir(parents=True, exist_ok=True)
+        (tmp_path / _directory / GitIgnore.FILE_NAME).write_text(_content)
+    return GitIgnore(str(tmp_path))
+
+
+# A negation re-includes a file, unless one of its parent directories is excluded
+@pytest.mark.parametrize(
+    "path, is_dir, ignored",
+    [
+        ("debug.log", False, True),
+        ("sub/debug.log", False, True),
+        ("keep.log", False, False),
+        ("sub/keep.log", False, False),
+        ("build", True, True),
+        ("build/keep.log", False, True),
+    ],
+)
+def test_negation(tmp_path: Path, path: str, is_dir: bool, ignored: bool) -> None:
+    _matcher: GitIgnore = _gitignore(tmp_path, {".": "*.log\n!keep.log\nbuild/\n"})
+    assert _matcher.is_ignored(path, is_dir) is ignored
+
+
+# A slash at the beginning or in the middle anchors a pattern to the directory of its file
+@pytest.mark.parametrize(
+    "path, ignored",
+    [
+        ("root.txt", True),
+        ("sub/root.txt", False),
+        ("docs/api.txt", True),
+        ("sub/docs/api.txt", False),
+        ("any.txt", True),
+        ("sub/any.txt", True),
+        ("sub/local.txt", True),
+        ("local.txt", False),
+        ("sub/deeper/local.txt", False),
+    ],
+)
+def test_anchoring(tmp_path: Path, path: str, ignored: bool) -> None:
+    _matcher: GitIgnore = _gitignore(
+        tmp_path,
+        {".": "/root.txt\ndocs/api.txt\nany.txt\n", "sub": "/local.txt\n"},
+    )
+    assert _matcher.is_ignored(path, False) is ignored
+
+
+# "**" matches any number of directories
+@pytest.mark.parametrize(
+    "path, ignored",
+    [
+        ("cache/a.bin", True),
+        ("x/y/cache/a.bin", True),
+        ("logs/today.log", True),
+        ("logs/2024/01/today.log", True),
+        ("logs", False),
+        ("assets/a/b/raw", True),
+        ("assets/raw", True),
+        ("assets/a/b/raw.png", False),
+    ],
+)
+def test_double_asterisk(tmp_path: Path, path: str, ignored: bool) -> None:
+    _matcher: GitIgnore = _gitignore(
+        tmp_path, {".": "**/cache\nlogs/**\nassets/**/raw\n"}
+    )
+    assert _matcher.is_ignored(path, False) is ignored
+
+
+# A pattern with a trailing slash only matches directories
+def test_dir_only(tmp_path: Path) -> None:
+    _matcher: GitIgnore = _gitignore(tmp_path, {".": "out/\n"})
+    assert _matcher.is_ignored("out", True)
+    assert _matcher.is_ignored("sub/out", True)
+    assert _matcher.is_ignored("out/module.py", False)
+    assert not _matcher.is_ignored("out", False)
+    assert not _matcher.is_ignored("sub/out", False)
+
+
+# The rules given directly take precedence over all .gitignore files
+def test_extra_rules_take_precedence(tmp_path: Path) -> None:
+    _gitignore(tmp_path, {".": "/demo/data/\n*.json\n"})
+    _matcher: GitIgnore = GitIgnore(
+        str(tmp_path), ["!/demo/data", "!/demo/data/**", "!config.json"]
+    )
+    assert not _matcher.is_ignored("demo/data", True)
+    assert not _matcher.is_ignored("demo/data/table.csv", False)
+    assert not _matcher.is_ignored("config.json", False)
+    assert _matcher.is_ignored("demo/other.json", False)
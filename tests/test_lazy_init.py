@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from linpgtoolbox._lazy_init import LazyInit
+
+
+# Run given code in a new interpreter that can import the packages in given folder
+def _run(cwd: Path, code: str) -> None:
+    subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=cwd, check=True)
+
+
+# The star imports that __init__ itself needs stay eager, the others are loaded on access
+def test_star_imports_used_by_init_stay_eager(tmp_path: Path) -> None:
+    _package: Path = tmp_path / "demo"
+    _package.mkdir()
+    (_package / "__init__.py").write_text(
+        "from .helpers import *\nfrom .other import *\n\nDEFAULT = helper() + 1\n"
+    )
+    (_package / "helpers.py").write_text("def helper() -> int:\n    return 1\n")
+    (_package / "other.py").write_text("VALUE = 2\n")
+    LazyInit.generate(str(_package))
+    assert "from .helpers import *" in (_package / "__init__.py").read_text()
+    _run(
+        tmp_path,
+        """
+        import sys
+        import demo
+        assert demo.DEFAULT == 2
+        assert "demo.other" not in sys.modules
+        assert demo.VALUE == 2
+        assert "demo.other" in sys.modules
+        """,
+    )
+    # the submodules are attributes of the package, even before any name is accessed
+    _run(
+        tmp_path,
+        """
+        import demo
+        assert demo.other.VALUE == 2
+        assert demo.helpers.helper() == 1
+        assert "other" in dir(demo)
+        from demo import *
+        assert helper() == 1 and VALUE == 2
+        """,
+    )
@@ -0,0 +1,158 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox import cli
+from linpgtoolbox._package_index import PackageIndex
+from linpgtoolbox.pkginstaller import PackageInstaller
+
+# Json api document of a package, all the files of 2.0 are yanked
+_DOCUMENT: bytes = json.dumps(
+    {
+        "info": {"version": "1.0"},
+        "releases": {
+            "0.9": [{"yanked": False}],
+            "1.0": [{"yanked": False}, {"yanked": True}],
+            "1.1rc1": [{"yanked": False}],
+            "2.0": [{"yanked": True}],
+        },
+    }
+).encode()
+_ETAG: str = '"v1"'
+
+
+# Stand-in of the json api of an index, which supports conditional requests
+class _Index(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        # status of each response
+        self.responses: list[int] = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Index
+
+    def do_GET(self) -> None:
+        assert self.path == "/pypi/demo/json"
+        if self.headers.get("If-None-Match") == _ETAG:
+            self.server.responses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.server.responses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", _ETAG)
+        self.send_header("Content-Length", str(len(_DOCUMENT)))
+        self.end_headers()
+        self.wfile.write(_DOCUMENT)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[_Index]:
+    _index: _Index = _Index()
+    threading.Thread(target=_index.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        PackageIndex, "URL", f"http://127.0.0.1:{_index.server_address[1]}/pypi"
+    )
+    monkeypatch.setattr(PackageIndex, "TTL", 3600)
+    monkeypatch.setattr(PackageIndex, "_PackageIndex__CACHE_DIR", str(tmp_path))
+    yield _index
+    _index.shutdown()
+    _index.server_close()
+
+
+# The versions are cached within the ttl, and only requested again if they have changed
+def test_versions_are_cached_and_requested_conditionally(
+    index: _Index, tmp_path: Path
+) -> None:
+    # the releases of which all files are yanked are left out
+    assert PackageIndex.versions("demo") == ["0.9", "1.0", "1.1rc1"]
+    assert PackageIndex.latest_version("demo") == "1.0"
+    assert PackageIndex.latest_version("demo", prerelease=True) == "1.1rc1"
+    # the lookups above are answered by the cache
+    assert index.responses == [200]
+    _cache: dict[str, object] = json.loads((tmp_path / "demo.json").read_text())
+    assert _cache["etag"] == _ETAG
+    # once expired, the index answers that nothing has changed
+    _cache["checked"] = 0
+    (tmp_path / "demo.json").write_text(json.dumps(_cache))
+    assert PackageIndex.versions("demo") == ["0.9", "1.0", "1.1rc1"]
+    assert index.responses == [200, 304]
+    _refreshed: dict[str, object] = json.loads((tmp_path / "demo.json").read_text())
+    assert float(str(_refreshed["checked"])) > 0
+    assert _refreshed["versions"] == _cache["versions"]
+    assert _refreshed["etag"] == _ETAG
+    # which counts as checked again, while a ttl of 0 always asks the index
+    assert PackageIndex.versions("demo") == ["0.9", "1.0", "1.1rc1"]
+    assert index.responses == [200, 304]
+    assert PackageIndex.latest_version("demo", ttl=0) == "1.0"
+    assert index.responses == [200, 304, 304]
+    assert [_file.name for _file in tmp_path.iterdir()] == ["demo.json"]
+
+
+# The background lookup only asks the index once the cached versions have expired
+def test_background_lookup_only_runs_once_expired(
+    index: _Index, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(PackageIndex, "_PackageIndex__threads", {})
+    monkeypatch.setattr(PackageIndex, "_PackageIndex__results", {})
+    assert PackageIndex.is_expired("demo")
+    PackageIndex.fetch_in_background("demo")
+    PackageIndex._PackageIndex__threads["demo"].join()  # type: ignore[attr-defined]
+    assert PackageIndex.fetched("demo") == "1.0"
+    assert index.responses == [200]
+    # the cached versions are used right away, without a thread
+    monkeypatch.setattr(PackageIndex, "_PackageIndex__threads", {})
+    monkeypatch.setattr(PackageIndex, "_PackageIndex__results", {})
+    assert not PackageIndex.is_expired("demo")
+    PackageIndex.fetch_in_background("demo", prerelease=True)
+    assert PackageIndex.fetched("demo") == "1.1rc1"
+    assert PackageIndex._PackageIndex__threads == {}  # type: ignore[attr-defined]
+    assert index.responses == [200]
+
+
+# The command line only looks for a newer version if the output is a terminal
+@pytest.mark.parametrize("is_terminal", [True, False])
+def test_cli_only_checks_for_update_in_a_terminal(
+    monkeypatch: pytest.MonkeyPatch, is_terminal: bool
+) -> None:
+    _checks: list[bool] = []
+    monkeypatch.setattr(
+        PackageInstaller,
+        "check_for_update_in_background",
+        classmethod(lambda cls: _checks.append(True)),
+    )
+    monkeypatch.setattr(
+        PackageInstaller, "notify_update", classmethod(lambda cls: None)
+    )
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: is_terminal)
+    monkeypatch.setattr(sys, "argv", ["linpgtb", "--platform"])
+    cli.cli()
+    assert _checks == ([True] if is_terminal else [])
+
+
+# An invalid ttl in the environment never keeps the package from being imported
+def test_invalid_ttl_falls_back_to_default() -> None:
+    _output: str = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from linpgtoolbox._package_index import PackageIndex; print(PackageIndex.TTL)",
+        ],
+        env={**os.environ, "LINPGTOOLBOX_INDEX_TTL": "one day"},
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    ).stdout
+    assert _output.splitlines()[-1] == str(24 * 60 * 60)
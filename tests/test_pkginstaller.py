@@ -0,0 +1,167 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from subprocess import CalledProcessError, CompletedProcess
+
+import pytest
+
+from linpgtoolbox import pkginstaller
+from linpgtoolbox.pkginstaller import PackageInstaller
+
+
+# Record the checked packages in a temporary file instead of the real cache
+@pytest.fixture
+def checked_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    _path: Path = tmp_path / "cache" / "packages.json"
+    monkeypatch.setattr(PackageInstaller, "_PackageInstaller__CHECKED_PATH", str(_path))
+    return _path
+
+
+# Builds that run at the same time never lose the packages the others have checked
+def test_concurrent_saves_keep_all_checked_packages(checked_path: Path) -> None:
+    _save = getattr(PackageInstaller, "_PackageInstaller__save_checked")
+    with ThreadPoolExecutor(max_workers=16) as _executor:
+        for _future in [_executor.submit(_save, [f"pkg{i}"]) for i in range(200)]:
+            _future.result()
+    _checked: dict[str, dict[str, float]] = json.loads(checked_path.read_text())
+    assert sum(len(_names) for _names in _checked.values()) == 200
+    assert [_file.name for _file in checked_path.parent.iterdir()] == ["packages.json"]
+
+
+# Stand-in for the selected python, which upgrades packages without touching the environment
+class _FakePython:
+    def __init__(self) -> None:
+        self.installed: dict[str, str] = {
+            "pip": "1.0",
+            "pka": "1.0",
+            "pkb": "1.0",
+            "pkc": "1.0",
+            "pkd": "1.0",
+        }
+        self.latest: dict[str, str] = {_name: "2.0" for _name in self.installed}
+        # pka requires pkb, so they have to be upgraded together
+        self.requires: dict[str, list[str]] = {"pka": ["pkb"], "pkb": [], "pkc": []}
+        self.failing: set[str] = {"pkd"}
+        self.batches: list[list[str]] = []
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __call__(self, *cmd: str, cwd: str | None = None) -> CompletedProcess[str]:
+        _output: object = None
+        if cmd[:4] == ("-m", "pip", "list", "--outdated"):
+            _output = [
+                {"name": _name, "version": _version, "latest_version": "2.0"}
+                for _name, _version in self.installed.items()
+                if _version != self.latest[_name]
+            ]
+        elif cmd[:3] == ("-m", "pip", "install"):
+            _names: list[str] = [_arg for _arg in cmd[3:] if not _arg.startswith("-")]
+            with self.__lock:
+                self.batches.append(_names)
+            if not self.failing.isdisjoint(_names):
+                raise CalledProcessError(
+                    1, cmd, "", "ERROR: No matching distribution found for pkd"
+                )
+            with self.__lock:
+                for _name in _names:
+                    self.installed[_name] = self.latest[_name]
+            _output = ""
+        elif cmd[0] == "-c" and len(cmd) > 2:
+            _output = {_name: self.installed.get(_name) for _name in json.loads(cmd[2])}
+        elif cmd[0] == "-c":
+            _output = self.requires
+        return CompletedProcess(cmd, 0, json.dumps(_output), "")
+
+
+# Dependent packages are upgraded in the same batch, and a failing package is retried alone
+def test_upgrade_batches_dependent_packages_and_retries_failures(
+    checked_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    _python: _FakePython = _FakePython()
+    monkeypatch.setattr(pkginstaller, "capture_python", _python)
+    monkeypatch.setattr(pkginstaller, "is_current_python", lambda: False)
+    PackageInstaller.upgrade(workers=2)
+    # pip is upgraded on its own before all the others
+    assert _python.batches[0] == ["pip"]
+    _batches: list[set[str]] = [set(_batch) for _batch in _python.batches[1:]]
+    # pka and pkb are never upgraded apart from each other
+    assert all(
+        {"pka", "pkb"} <= _batch or {"pka", "pkb"}.isdisjoint(_batch)
+        for _batch in _batches
+    )
+    assert {"pka", "pkb"} in [_batch & {"pka", "pkb"} for _batch in _batches]
+    # the batch that pkd is in fails, so each of its packages is tried alone
+    assert {"pkd"} in _batches
+    assert len([_batch for _batch in _batches if "pkd" in _batch]) == 2
+    # and the failure of pkd does not keep the others from being upgraded
+    assert _python.installed == {
+        "pip": "2.0",
+        "pka": "2.0",
+        "pkb": "2.0",
+        "pkc": "2.0",
+        "pkd": "1.0",
+    }
+    _output: str = capsys.readouterr().out
+    assert "Failed to upgrade 1 package(s):" in _output
+    assert "pkd: ERROR: No matching distribution found for pkd" in _output
+    # only the packages that have been upgraded are not checked again
+    _checked: dict[str, dict[str, float]] = json.loads(checked_path.read_text())
+    assert sorted(_name for _names in _checked.values() for _name in _names) == [
+        "pip",
+        "pka",
+        "pkb",
+        "pkc",
+    ]
+
+
+# Offline, local projects and the packages in the local folder of distributions are still
+# installed without the package index, and a failure of pip fails the command
+@pytest.mark.parametrize("find_links", [None, "wheels"])
+def test_offline_install_does_not_use_the_index(
+    checked_path: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    find_links: str | None,
+) -> None:
+    (tmp_path / "project").mkdir()
+    (tmp_path / "broken").mkdir()
+    _python: _FakePython = _FakePython()
+    _commands: list[tuple[str, ...]] = []
+
+    def _pip(*cmd: str, cwd: str | None = None) -> None:
+        _commands.append(cmd)
+        if "./broken" in cmd:
+            raise CalledProcessError(1, cmd)
+
+    monkeypatch.setattr(pkginstaller, "capture_python", _python)
+    monkeypatch.setattr(pkginstaller, "is_current_python", lambda: False)
+    monkeypatch.setattr(PackageInstaller, "pip", _pip)
+    _python.installed.pop("pkc")
+    PackageInstaller.set_offline(find_links=find_links)
+    try:
+        PackageInstaller.install("./project", "pka", "pkc", cwd=str(tmp_path))
+        _index_options: list[str] = ["--no-index", "--no-build-isolation"]
+        if find_links is None:
+            assert _commands == [("install", *_index_options, "./project", "--upgrade")]
+            assert '"pkc" is not installed (offline mode)' in capsys.readouterr().out
+        else:
+            assert _commands == [
+                (
+                    "install",
+                    *_index_options,
+                    "--find-links",
+                    find_links,
+                    "./project",
+                    "pkc",
+                    "--upgrade",
+                )
+            ]
+        # nothing is recorded as checked for newer versions
+        assert not checked_path.exists()
+        with pytest.raises(CalledProcessError):
+            PackageInstaller.install("./broken", cwd=str(tmp_path))
+    finally:
+        PackageInstaller.set_offline(False)
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox import _site_installer
+from linpgtoolbox._dist_info import read_record
+from linpgtoolbox._site_installer import SiteInstaller
+
+
+# Write the pyproject.toml of the project with given version
+def _write_pyproject(project: Path, version: str) -> None:
+    (project / "pyproject.toml").write_text(textwrap.dedent(f"""
+            [project]
+            name = "demo"
+            version = "{version}"
+
+            [project.scripts]
+            demo-value = "demo:main"
+            """))
+
+
+# A virtual environment to install into, which the installer uses as the selected python
+@pytest.fixture
+def python(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> str:
+    if sys.platform.startswith("win"):
+        pytest.skip("scripts are not installed on windows")
+    subprocess.run(
+        [sys.executable, "-m", "venv", "--without-pip", str(tmp_path / "venv")],
+        check=True,
+    )
+    _python: str = str(tmp_path / "venv" / "bin" / "python")
+    monkeypatch.setattr(
+        _site_installer,
+        "capture_python",
+        lambda *cmd: subprocess.run(
+            [_python, *cmd], capture_output=True, text=True, check=True
+        ),
+    )
+    return _python
+
+
+# Get the site-packages folder of given python
+def _site_dir(python: str) -> Path:
+    return Path(
+        subprocess.run(
+            [python, "-c", "import sysconfig; print(sysconfig.get_path('platlib'))"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    )
+
+
+# Installing only replaces the changed files, and the ones in the RECORD of the last
+# install that are no longer built are removed, so that pip can still uninstall it
+def test_install_update_and_uninstall(tmp_path: Path, python: str) -> None:
+    _project: Path = tmp_path / "project"
+    _build: Path = _project / "src"
+    (_build / "demo" / "sub").mkdir(parents=True)
+    _write_pyproject(_project, "0.1")
+    (_build / "demo" / "__init__.py").write_text(
+        "from .a import VALUE\n\ndef main() -> None:\n    print(VALUE)\n"
+    )
+    (_build / "demo" / "a.py").write_text("VALUE = 1\n")
+    (_build / "demo" / "sub" / "__init__.py").write_text("")
+    (_build / "demo" / "sub" / "b.py").write_text("VALUE = 2\n")
+    assert SiteInstaller.install(str(_project), str(_build))
+    _site: Path = _site_dir(python)
+    _script: Path = Path(python).parent / "demo-value"
+    _records: dict[str, str] = read_record(str(_site / "demo-0.1.dist-info" / "RECORD"))
+    assert {
+        "demo/__init__.py",
+        "demo/a.py",
+        "demo/sub/__init__.py",
+        "demo/sub/b.py",
+        "../../../bin/demo-value",
+        "demo-0.1.dist-info/METADATA",
+        "demo-0.1.dist-info/RECORD",
+    } <= set(_records)
+    assert _records["demo/a.py"].startswith("sha256=")
+    assert (_site / "demo-0.1.dist-info" / "INSTALLER").read_text() == "linpgtoolbox\n"
+    assert (
+        subprocess.run(
+            [str(_script)], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        == "1"
+    )
+    # write the bytecode of the modules
+    subprocess.run(
+        [python, "-c", "import demo.sub.b"],
+        env={
+            _key: _value
+            for _key, _value in os.environ.items()
+            if _key != "PYTHONDONTWRITEBYTECODE"
+        },
+        check=True,
+    )
+    _unchanged: os.stat_result = (_site / "demo" / "__init__.py").stat()
+    # a new version without the sub package
+    _write_pyproject(_project, "0.2")
+    (_build / "demo" / "sub" / "b.py").unlink()
+    (_build / "demo" / "sub" / "__init__.py").unlink()
+    (_build / "demo" / "sub").rmdir()
+    (_build / "demo" / "a.py").write_text("VALUE = 3\n")
+    assert SiteInstaller.install(str(_project), str(_build))
+    assert (_site / "demo" / "a.py").read_text() == "VALUE = 3\n"
+    # the unchanged module is left as it is, along with its bytecode
+    assert (_site / "demo" / "__init__.py").stat().st_ino == _unchanged.st_ino
+    assert list((_site / "demo" / "__pycache__").glob("__init__.*.pyc")) != []
+    assert list((_site / "demo" / "__pycache__").glob("a.*.pyc")) == []
+    # the removed package is gone, including its bytecode
+    assert not (_site / "demo" / "sub").exists()
+    assert not (_site / "demo-0.1.dist-info").exists()
+    assert "demo/sub/b.py" not in read_record(
+        str(_site / "demo-0.2.dist-info" / "RECORD")
+    )
+    assert (
+        subprocess.run(
+            [str(_script)], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        == "3"
+    )
+    # pip uninstalls everything the RECORD lists
+    subprocess.run(
+        [sys.executable, "-m", "pip", "--python", python, "uninstall", "-y", "demo"],
+        capture_output=True,
+        check=True,
+    )
+    assert not (_site / "demo").exists()
+    assert not (_site / "demo-0.2.dist-info").exists()
+    assert not _script.exists()
@@ -0,0 +1,199 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox._uploader import Uploader
+
+_METADATA: bytes = b"Metadata-Version: 2.1\nName: demo\nVersion: 1.0\n\nThe readme.\n"
+
+
+# Stand-in of the upload API of an index, the responses of each file are given in order,
+# along with the json api of the files (name -> sha256) of each release
+class _Index(ThreadingHTTPServer):
+    def __init__(self, responses: dict[str, list[tuple[int, dict[str, str]]]]) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.responses: dict[str, list[tuple[int, dict[str, str]]]] = responses
+        self.releases: dict[str, dict[str, str]] = {}
+        self.requests: list[str] = []
+        self.lookups: list[str] = []
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/legacy/"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Index
+
+    def do_POST(self) -> None:
+        _body: bytes = self.rfile.read(int(self.headers["Content-Length"]))
+        _match: re.Match[bytes] | None = re.search(rb'filename="([^"]+)"', _body)
+        assert _match is not None
+        _name: str = _match[1].decode()
+        with self.server.lock:
+            self.server.requests.append(_name)
+            _status, _headers = self.server.responses[_name].pop(0)
+        _text: bytes = f"{_status}".encode()
+        self.send_response(_status)
+        for _key, _value in _headers.items():
+            self.send_header(_key, _value)
+        self.send_header("Content-Length", str(len(_text)))
+        self.end_headers()
+        self.wfile.write(_text)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.lookups.append(self.path)
+        if self.path not in self.server.releases:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        _document: bytes = json.dumps(
+            {
+                "urls": [
+                    {"filename": _name, "digests": {"sha256": _sha256}}
+                    for _name, _sha256 in self.server.releases[self.path].items()
+                ]
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(_document)))
+        self.end_headers()
+        self.wfile.write(_document)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+# Create a wheel and a source distribution that only contain their metadata
+def _distributions(dist: Path) -> list[str]:
+    dist.mkdir()
+    for _name in ("demo-1.0-py3-none-any.whl", "demo-1.0-cp311-cp311-linux_x86_64.whl"):
+        with zipfile.ZipFile(dist / _name, "w") as _wheel:
+            _wheel.writestr("demo-1.0.dist-info/METADATA", _METADATA)
+    with tarfile.open(dist / "demo-1.0.tar.gz", "w:gz") as _sdist:
+        _info: tarfile.TarInfo = tarfile.TarInfo("demo-1.0/PKG-INFO")
+        _info.size = len(_METADATA)
+        _sdist.addfile(_info, io.BytesIO(_METADATA))
+    return sorted(str(_file) for _file in dist.iterdir())
+
+
+@pytest.fixture
+def index(monkeypatch: pytest.MonkeyPatch) -> Iterator[_Index]:
+    monkeypatch.setenv("TWINE_USERNAME", "__token__")
+    monkeypatch.setenv("TWINE_PASSWORD", "secret")
+    monkeypatch.setattr(Uploader, "BACKOFF", 0.01)
+    _index: _Index = _Index({})
+    _thread: threading.Thread = threading.Thread(
+        target=_index.serve_forever, daemon=True
+    )
+    _thread.start()
+    yield _index
+    _index.shutdown()
+    _index.server_close()
+
+
+# Server errors are retried, existing files are skipped and a failed upload resumes
+def test_upload_retries_skips_and_resumes(index: _Index, tmp_path: Path) -> None:
+    _files: list[str] = _distributions(tmp_path / "dist")
+    _pure, _sdist, _platform = (
+        "demo-1.0-py3-none-any.whl",
+        "demo-1.0.tar.gz",
+        "demo-1.0-cp311-cp311-linux_x86_64.whl",
+    )
+    index.responses = {
+        # the index is busy at first
+        _pure: [(503, {"Retry-After": "0"}), (200, {})],
+        # the index has the file already
+        _sdist: [(409, {})],
+        # the upload is rejected, and then accepted when it is run again
+        _platform: [(403, {}), (200, {})],
+    }
+    _errors: dict[str, str] = Uploader.upload(_files, index.url, 2)
+    assert list(_errors) == [str(tmp_path / "dist" / _platform)]
+    assert _errors[str(tmp_path / "dist" / _platform)].startswith("403")
+    assert sorted(index.requests) == sorted([_pure, _pure, _sdist, _platform])
+    # the files that are on the index are recorded
+    _state_file: Path = tmp_path / "dist" / ".linpgtoolbox_upload.json"
+    _state: dict[str, dict[str, str]] = json.loads(_state_file.read_text())
+    assert sorted(_state[index.url]) == [_pure, _sdist]
+    # so only the failed file is sent again
+    index.requests.clear()
+    assert Uploader.upload(_files, index.url, 2) == {}
+    assert index.requests == [_platform]
+    _state = json.loads(_state_file.read_text())
+    assert sorted(_state[index.url]) == sorted([_pure, _sdist, _platform])
+    assert not any(
+        _file.name.endswith(".tmp") for _file in (tmp_path / "dist").iterdir()
+    )
+    # and a retry gives up once the index keeps failing
+    index.responses = {_pure: [(503, {})] * (Uploader.RETRIES + 1)}
+    _state_file.unlink()
+    _errors = Uploader.upload([str(tmp_path / "dist" / _pure)], index.url, 1)
+    assert _errors == {
+        str(
+            tmp_path / "dist" / _pure
+        ): f"503 Service Unavailable (after {Uploader.RETRIES} retries)"
+    }
+
+
+# Uploads that run at the same time from the same dist folder keep each other's records
+def test_concurrent_uploads_keep_all_records(index: _Index, tmp_path: Path) -> None:
+    _files: list[str] = _distributions(tmp_path / "dist")
+    index.responses = {os.path.basename(_file): [(200, {})] for _file in _files}
+    _threads: list[threading.Thread] = [
+        threading.Thread(target=Uploader.upload, args=([_file], index.url, 1))
+        for _file in _files
+    ]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    _state: dict[str, dict[str, str]] = json.loads(
+        (tmp_path / "dist" / ".linpgtoolbox_upload.json").read_text()
+    )
+    assert sorted(_state[index.url]) == sorted(os.path.basename(_f) for _f in _files)
+
+
+# The files that the index already has are looked up before they are uploaded
+def test_existing_files_are_not_uploaded(index: _Index, tmp_path: Path) -> None:
+    _files: list[str] = _distributions(tmp_path / "dist")
+    _pure, _sdist, _platform = (
+        str(tmp_path / "dist" / _name)
+        for _name in (
+            "demo-1.0-py3-none-any.whl",
+            "demo-1.0.tar.gz",
+            "demo-1.0-cp311-cp311-linux_x86_64.whl",
+        )
+    )
+    index.releases["/pypi/demo/1.0/json"] = {
+        # the same file is on the index
+        os.path.basename(_sdist): hashlib.sha256(Path(_sdist).read_bytes()).hexdigest(),
+        # a file of the same name but with another content
+        os.path.basename(_platform): "0" * 64,
+    }
+    index.responses = {os.path.basename(_pure): [(200, {})]}
+    _errors: dict[str, str] = Uploader.upload(_files, index.url, 3)
+    assert list(_errors) == [_platform]
+    assert index.requests == [os.path.basename(_pure)]
+    # the release is only looked up once
+    assert index.lookups == ["/pypi/demo/1.0/json"]
+    _state: dict[str, dict[str, str]] = json.loads(
+        (tmp_path / "dist" / ".linpgtoolbox_upload.json").read_text()
+    )
+    assert sorted(_state[index.url]) == sorted(
+        os.path.basename(_file) for _file in (_pure, _sdist)
+    )
@@ -0,0 +1,219 @@
+import base64
+import csv
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import sysconfig
+import textwrap
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from linpgtoolbox._dist_info import load_project
+from linpgtoolbox._wheel import WheelBuilder
+from linpgtoolbox.builder import Builder
+from linpgtoolbox.pkginstaller import PackageInstaller
+
+
+# Create a project with a built package in src and given pyproject.toml
+def _project(tmp_path: Path, pyproject: str) -> Path:
+    _root: Path = tmp_path / "project"
+    (_root / "src" / "demo").mkdir(parents=True)
+    (_root / "pyproject.toml").write_text(textwrap.dedent(pyproject))
+    (_root / "src" / "demo" / "__init__.py").write_text("VALUE: int = 1\n")
+    return _root
+
+
+# Read the METADATA of a wheel
+def _metadata(wheel: str) -> str:
+    with zipfile.ZipFile(wheel) as _zip:
+        return next(
+            _zip.read(_name).decode()
+            for _name in _zip.namelist()
+            if _name.endswith(".dist-info/METADATA")
+        )
+
+
+# The dynamic version and readme are resolved from the directives of setuptools
+def test_dynamic_version_and_readme_are_resolved(tmp_path: Path) -> None:
+    _root: Path = _project(
+        tmp_path,
+        """
+        [project]
+        name = "demo"
+        dynamic = ["version", "readme"]
+
+        [tool.setuptools.dynamic]
+        version = {attr = "demo.version.__version__"}
+        readme = {file = ["README.md", "CHANGES.md"]}
+
+        [tool.setuptools.packages.find]
+        where = ["src"]
+        """,
+    )
+    # the version module has been compiled, so only its source in the project is read
+    (_root / "src" / "demo" / "version.pyi").write_text("__version__: str\n")
+    (_root / "demo").mkdir()
+    (_root / "demo" / "version.py").write_text('__version__: str = "1.2.0"\n')
+    (_root / "README.md").write_text("# Demo\n")
+    (_root / "CHANGES.md").write_text("## 1.2.0\n")
+    assert load_project(str(_root))["dynamic"] == []
+    _wheel: str = WheelBuilder.build(
+        str(_root), str(_root / "src"), str(_root / "dist")
+    )
+    assert Path(_wheel).name == "demo-1.2.0-py3-none-any.whl"
+    _text: str = _metadata(_wheel)
+    assert "Version: 1.2.0\n" in _text
+    assert "Description-Content-Type: text/markdown\n" in _text
+    assert _text.endswith("\n# Demo\n\n## 1.2.0\n")
+    # a version may also be read from a file
+    (_root / "pyproject.toml").write_text(
+        (_root / "pyproject.toml")
+        .read_text()
+        .replace('{attr = "demo.version.__version__"}', '{file = "VERSION"}')
+    )
+    (_root / "VERSION").write_text("1.3.0\n")
+    assert load_project(str(_root))["version"] == "1.3.0"
+
+
+# Metadata that only the build backend can compute is left to python -m build,
+# and the wheel is tagged for the compiled modules afterwards
+def test_unresolved_dynamic_metadata_falls_back_to_build(tmp_path: Path) -> None:
+    _root: Path = _project(
+        tmp_path,
+        """
+        [build-system]
+        requires = ["setuptools"]
+        build-backend = "setuptools.build_meta"
+
+        [project]
+        name = "demo"
+        version = "0.1"
+        dynamic = ["dependencies"]
+
+        [tool.setuptools.dynamic]
+        dependencies = {file = "requirements.txt"}
+
+        [tool.setuptools.packages.find]
+        where = ["src"]
+
+        [tool.setuptools.package-data]
+        demo = ["*.so", "*.pyd"]
+        """,
+    )
+    (_root / "requirements.txt").write_text("tomli\n")
+    (_root / "src" / "demo" / f"a{sysconfig.get_config_var('EXT_SUFFIX')}").write_bytes(
+        b"\0"
+    )
+    assert load_project(str(_root))["dynamic"] == ["dependencies"]
+    PackageInstaller.set_offline()
+    try:
+        Builder.pack(str(_root))
+    finally:
+        PackageInstaller.set_offline(False)
+    _wheels: list[Path] = list((_root / "dist").glob("*.whl"))
+    assert len(_wheels) == 1
+    _tag: str = f"cp{sys.version_info.major}{sys.version_info.minor}"
+    assert _wheels[0].name.startswith(f"demo-0.1-{_tag}-{_tag}-")
+    assert "Requires-Dist: tomli\n" in _metadata(str(_wheels[0]))
+
+
+# A wheel with extension modules is tagged for the abi they are built for, and only
+# gets a manylinux tag once auditwheel has checked it
+def test_tags_of_extension_modules() -> None:
+    _tag: str = f"cp{sys.version_info.major}{sys.version_info.minor}"
+    _suffix: str = str(sysconfig.get_config_var("EXT_SUFFIX"))
+    assert WheelBuilder.tags(["demo/__init__.py", "demo/a.pyi"]) == (
+        "py3",
+        "none",
+        "any",
+    )
+    _python, _abi, _platform = WheelBuilder.tags([f"demo/a{_suffix}", "demo/b.py"])
+    assert (_python, _abi) == (_tag, _tag)
+    assert _platform == sysconfig.get_platform().replace("-", "_").replace(".", "_")
+    assert "manylinux" not in _platform
+    # a module of the stable abi does not change the tags of the others
+    assert WheelBuilder.tags([f"demo/a{_suffix}", "demo/c.abi3.so"])[:2] == (
+        _tag,
+        _tag,
+    )
+    assert WheelBuilder.tags(["demo/c.abi3.so"])[:2] == (_tag, "abi3")
+    # the platform can be given explicitly
+    assert (
+        WheelBuilder.tags([f"demo/a{_suffix}"], "manylinux_2_28_x86_64")[2]
+        == "manylinux_2_28_x86_64"
+    )
+
+
+# Every file is listed in RECORD with its hash, and the same build results in the same
+# wheel no matter when it is packed
+def test_record_and_reproducible_output(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _root: Path = _project(
+        tmp_path,
+        """
+        [project]
+        name = "demo"
+        version = "0.1"
+        """,
+    )
+    (_root / "src" / "demo" / "data.bin").write_bytes(os.urandom(100000))
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    _first: str = WheelBuilder.build(
+        str(_root), str(_root / "src"), str(tmp_path / "first"), workers=1
+    )
+    # the files are written again at another time
+    for _file in (_root / "src" / "demo").iterdir():
+        _file.write_bytes(_file.read_bytes())
+        os.utime(_file, (1800000000, 1800000000))
+    _second: str = WheelBuilder.build(
+        str(_root), str(_root / "src"), str(tmp_path / "second"), workers=4
+    )
+    assert Path(_first).read_bytes() == Path(_second).read_bytes()
+    with zipfile.ZipFile(_first) as _zip:
+        assert _zip.testzip() is None
+        assert {_info.date_time for _info in _zip.infolist()} == {
+            time.gmtime(1700000000)[:5] + (time.gmtime(1700000000)[5] // 2 * 2,)
+        }
+        _names: list[str] = _zip.namelist()
+        assert _names[-1] == "demo-0.1.dist-info/RECORD"
+        _records: dict[str, list[str]] = {
+            _row[0]: _row[1:]
+            for _row in csv.reader(
+                io.StringIO(_zip.read("demo-0.1.dist-info/RECORD").decode())
+            )
+        }
+        assert set(_records) == set(_names)
+        assert _records["demo-0.1.dist-info/RECORD"] == ["", ""]
+        for _name in _names[:-1]:
+            _data: bytes = _zip.read(_name)
+            _digest: str = (
+                base64.urlsafe_b64encode(hashlib.sha256(_data).digest())
+                .decode()
+                .rstrip("=")
+            )
+            assert _records[_name] == [f"sha256={_digest}", str(len(_data))]
+    # and pip accepts it
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--no-deps",
+            "--no-index",
+            "--target",
+            str(tmp_path / "target"),
+            _first,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    assert (tmp_path / "target" / "demo" / "data.bin").read_bytes() == (
+        _root / "src" / "demo" / "data.bin"
+    ).read_bytes()